@@ -2,27 +2,57 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
-from flask_mail import Mail  
+from flask_socketio import SocketIO
 
-app = Flask(__name__)
-app.config.from_object('config')
+from app.database import database_uri, engine_options, configure_engine
 
-# Initialize extensions (without tying to app immediately)
+# Extensions are created here and bound to the app in create_app
 db = SQLAlchemy()
 migrate = Migrate()
 login_manager = LoginManager()
+socketio = SocketIO()
 
-# Bind app to extensions
-db.init_app(app)
-migrate.init_app(app, db)
-login_manager.init_app(app)
+login_manager.login_view = "auth.login"  # Redirects to login page if user isn't logged in
 
-# Initialize Flask-Mail
-mail = Mail(app)
 
-login_manager.login_view = "login"  # Redirects to login page if user isn't logged in
+# Build the app: config, extensions, then the views (imported here, not when the package is imported)
+# config is anything app.config.from_object accepts; settings override single values (tests)
+# The schema is created and upgraded by the migrations (flask db upgrade), not at startup
+def create_app(config="config", **settings):
+    app = Flask(__name__)
+    app.config.from_object(config)
+    app.config.update(settings)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_uri(app.config["SQLALCHEMY_DATABASE_URI"])
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
 
-# Import models and views inside app context
-with app.app_context():
-    from app import models, views
-    db.create_all()  # Ensure tables exist
\ No newline at end of file
+    db.init_app(app)
+    with app.app_context():
+        configure_engine(db.engine, app.config)  # SQLite pragmas, before the first connection
+    migrate.init_app(app, db)
+    login_manager.init_app(app)
+    socketio.init_app(app, message_queue=app.config.get("SOCKETIO_MESSAGE_QUEUE"))
+
+    # models and realtime register their tables, events and socket handlers when imported
+    from app import models, realtime, mailer, geocoding, keyring, profiling, metrics, commands  # noqa: F401
+    from app.location_store import location_store
+    from app.geofence import geofence_engine
+    from app.views import register_blueprints
+    profiling.init_app(app)
+    metrics.init_app(app)
+    keyring.init_app(app)
+    mailer.init_app(app)
+    geocoding.init_app(app)
+    location_store.init_app(app)
+    geofence_engine.init_app(app)
+    register_blueprints(app)
+    app.register_blueprint(commands.bp)
+    return app
+
+
+# `from app import app` (tests, db_create.py) builds a default app the first time it is asked for
+def __getattr__(name):
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,111 @@
+import click
+from time import sleep
+from flask import Blueprint, current_app
+from app import db, keyring
+from app.models import User, publish_ride, SavedCard, DriverWeeklyEarnings, UnreadMessageCount, rebuild_platform_stats
+
+
+# Maintenance commands (flask <command>); they run inside the app context
+bp = Blueprint("commands", __name__, cli_group=None)
+
+
+# Command to promote a user to manager
+@bp.cli.command("make-manager")
+def make_manager():
+    email = input("Enter user email to promote: ")
+    user = User.query.filter_by(email=email).first()
+    if user:
+        user.is_manager = True
+        db.session.commit()
+        print(f"{user.email} is now a manager ")
+    else:
+        print("User not found")
+
+
+# Command to fill a new, empty database with the demo users, rides and bookings (see app/seed.py)
+@bp.cli.command("seed-demo-data")
+def seed_demo_data():
+    from app.seed import seed_demo_data as seed
+    if seed():
+        print("Added the demo users, rides, bookings, payments and chat")
+    else:
+        print("The database already has users, nothing added")
+
+
+# Command to rebuild the drivers' weekly earnings from the payments table
+@bp.cli.command("rebuild-earnings")
+def rebuild_earnings():
+    weeks = DriverWeeklyEarnings.rebuild()
+    print(f"Rebuilt {weeks} driver earnings weeks")
+
+
+# Command to rebuild the manager dashboard stats (counters and daily revenue) from scratch
+@bp.cli.command("rebuild-stats")
+def rebuild_stats():
+    days = rebuild_platform_stats()
+    print(f"Rebuilt platform stats ({days} revenue days)")
+
+
+# Command to run the mail dispatcher as its own process (set MAIL_DISPATCHER_THREAD=0 for the web workers)
+@bp.cli.command("mail-worker")
+def mail_worker():
+    from app.mailer import dispatch_pending
+    print("Sending queued email, press Ctrl+C to stop")
+    while True:
+        try:
+            if not dispatch_pending():
+                sleep(current_app.config.get("MAIL_POLL_INTERVAL", 30))
+        except Exception:
+            # Keep the worker running (e.g. database briefly locked, SMTP down); the emails stay queued
+            current_app.logger.exception("Mail worker error")
+            db.session.rollback()
+            sleep(current_app.config.get("MAIL_POLL_INTERVAL", 30))
+        finally:
+            db.session.remove()
+
+
+# Command to rebuild the per-user unread message counts from the chat messages
+@bp.cli.command("rebuild-unread")
+def rebuild_unread():
+    users = UnreadMessageCount.rebuild()
+    print(f"Rebuilt unread message counts for {users} users")
+
+
+# Command to compare the per-passenger geopy loop with the batched NumPy proximity check
+@bp.cli.command("bench-proximity")
+def bench_proximity():
+    from app.proximity import benchmark
+    print(f"{'passengers':>10}  {'geopy loop':>12}  {'numpy batch':>12}  {'speedup':>8}")
+    for count, loop, batched in benchmark():
+        print(f"{count:>10}  {loop * 1e6:>10.1f}us  {batched * 1e6:>10.1f}us  {loop / batched:>7.1f}x")
+
+
+# Command to rebuild the ride location search index from publish_ride
+@bp.cli.command("rebuild-search-index")
+def rebuild_search_index():
+    from app.search import rebuild_location_index
+    rebuild_location_index()
+    print(f"Indexed {publish_ride.query.count()} rides")
+
+
+# Command to geocode the rides still without coordinates (e.g. published while the geocoder was down)
+@bp.cli.command("geocode-rides")
+def geocode_rides():
+    from app.geocoding import resolve_ride_coordinates
+    print(f"Geocoded {resolve_ride_coordinates()} rides")
+
+
+# Command to re-encrypt the saved cards with the newest card key (see app/keyring.py)
+# --new-key first adds a new key to the key file; restart the web workers so they encrypt with it too
+@bp.cli.command("rotate-card-keys")
+@click.option("--new-key", is_flag=True, help="Add a new first key to the key file before re-encrypting.")
+@click.option("--batch-size", type=int, default=None, help="Cards re-encrypted per transaction.")
+def rotate_card_keys(new_key, batch_size):
+    if new_key:
+        if current_app.config.get("CARD_KEYS"):
+            raise click.UsageError("CARD_KEYS is set: add the new key to it instead of the key file")
+        keys = keyring.add_key_file_key(current_app)
+        keyring.init_app(current_app)
+        print(f"Added a new key to {keyring.key_file_path(current_app)} ({len(keys)} keys)")
+    rotated, failed = SavedCard.rotate_keys(batch_size or current_app.config.get("CARD_ROTATE_BATCH", 500))
+    print(f"Re-encrypted {rotated} saved cards" + (f", {failed} could not be decrypted with any key" if failed else ""))
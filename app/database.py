@@ -0,0 +1,93 @@
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+# Engine settings for the configured database (config.py, DATABASE_URL)
+# SQLite runs in WAL mode, so the payment, chat and tracking endpoints can read while another
+# request writes, and a writer waits SQLITE_BUSY_TIMEOUT for the lock instead of failing with
+# "database is locked". SQLite still allows one writer at a time; PostgreSQL (DATABASE_URL)
+# gets a connection pool sized for several workers and a server-side statement_timeout.
+
+
+# postgres:// (as given by most hosting providers) is not accepted by SQLAlchemy
+def database_uri(uri):
+    if uri.startswith("postgres://"):
+        return "postgresql://" + uri[len("postgres://"):]
+    return uri
+
+
+# SQLALCHEMY_ENGINE_OPTIONS for the configured database
+def engine_options(config):
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+    options = {
+        "pool_pre_ping": config.get("DB_POOL_PRE_PING", True),
+        "pool_recycle": config.get("DB_POOL_RECYCLE", 1800),
+    }
+    if url.get_backend_name() == "sqlite":
+        # In-memory databases live in a single connection (Flask-SQLAlchemy sets that pool up)
+        if url.database in (None, "", ":memory:"):
+            return {}
+        options["connect_args"] = {"timeout": config.get("SQLITE_BUSY_TIMEOUT", 5000) / 1000}
+        return options
+
+    options.update(
+        pool_size=config.get("DB_POOL_SIZE", 10),
+        max_overflow=config.get("DB_MAX_OVERFLOW", 20),
+        pool_timeout=config.get("DB_POOL_TIMEOUT", 30),
+    )
+    statement_timeout = config.get("DB_STATEMENT_TIMEOUT", 0)
+    if url.get_backend_name() == "postgresql" and statement_timeout:
+        options["connect_args"] = {"options": f"-c statement_timeout={int(statement_timeout)}"}
+    return options
+
+
+# Apply the SQLite pragmas on every new connection of the engine
+# SQLite has no statement timeout, so a progress handler interrupts a statement that runs past
+# DB_STATEMENT_TIMEOUT (it fails with OperationalError: interrupted, like a cancelled PostgreSQL query)
+def configure_sqlite(engine, config):
+    journal_mode = config.get("SQLITE_JOURNAL_MODE", "WAL")
+    synchronous = config.get("SQLITE_SYNCHRONOUS", "NORMAL")
+    busy_timeout = int(config.get("SQLITE_BUSY_TIMEOUT", 5000))
+    statement_timeout = config.get("DB_STATEMENT_TIMEOUT", 0) / 1000
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if journal_mode and engine.url.database not in (None, "", ":memory:"):
+            cursor.execute(f"PRAGMA journal_mode={journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+        if statement_timeout:
+            deadline = connection_record.info["statement_deadline"] = [None]
+            dbapi_connection.set_progress_handler(
+                lambda: deadline[0] is not None and time.monotonic() > deadline[0], 10000
+            )
+
+    if statement_timeout:
+        @event.listens_for(engine, "before_cursor_execute")
+        def start_statement_clock(connection, cursor, statement, parameters, context, executemany):
+            deadline = connection.connection.info.get("statement_deadline")
+            if deadline is not None:
+                deadline[0] = time.monotonic() + statement_timeout
+
+        # Also when the statement failed, or the next commit / rollback could be interrupted
+        @event.listens_for(engine, "after_cursor_execute")
+        def stop_statement_clock(connection, *args):
+            deadline = connection.connection.info.get("statement_deadline")
+            if deadline is not None:
+                deadline[0] = None
+
+        @event.listens_for(engine, "handle_error")
+        def stop_statement_clock_on_error(context):
+            connection = context.connection
+            if connection is not None and not connection.invalidated:
+                stop_statement_clock(connection)
+
+
+def configure_engine(engine, config):
+    if engine.dialect.name == "sqlite":
+        configure_sqlite(engine, config)
@@ -0,0 +1,176 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from sqlalchemy.exc import IntegrityError, OperationalError
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models import GeocodeCacheEntry, publish_ride
+
+
+# Upstream geocoder (OpenStreetMap Nominatim)
+# Any object with geocode(address) -> (lat, lon) or None can replace it via set_geocoder()
+class NominatimGeocoder:
+    url = "https://nominatim.openstreetmap.org/search"
+
+    def __init__(self, timeout=5):
+        self.timeout = timeout
+
+    def geocode(self, address):
+        import requests
+        response = requests.get(self.url, params={"q": address, "format": "json", "limit": 1},
+                                headers={"User-Agent": "CatchMyRide/1.0"}, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        if not data:
+            return None
+        return float(data[0]["lat"]), float(data[0]["lon"])
+
+
+# Thread-safe LRU of normalized address -> (lat, lon or None, expires_at)
+class GeocodeLRU:
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, coordinates, ttl):
+        with self.lock:
+            self.entries[key] = (coordinates, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+geocoder = NominatimGeocoder()
+lru_cache = GeocodeLRU(1024)
+
+
+def init_app(app):
+    lru_cache.max_size = app.config.get("GEOCODE_CACHE_SIZE", 1024)
+    lru_cache.clear()
+    if isinstance(geocoder, NominatimGeocoder):
+        geocoder.timeout = app.config.get("GEOCODE_TIMEOUT", 5)
+
+
+def set_geocoder(new_geocoder):
+    global geocoder
+    geocoder = new_geocoder
+    lru_cache.clear()
+
+
+# "  Leeds   Station, LEEDS " -> "leeds station, leeds"
+def normalize_address(address):
+    return re.sub(r"\s+", " ", address or "").strip().lower()[:255]
+
+
+# Resolve an address to (lat, lon), or (None, None) if it can't be found
+# Lookup order: in-process LRU -> geocode_cache table -> upstream geocoder
+# With cached_only the upstream geocoder is skipped: a miss returns (None, None) and isn't cached
+def geocode(address, cached_only=False):
+    key = normalize_address(address)
+    if not key:
+        return None, None
+
+    cached = lru_cache.get(key)
+    if cached is not None:
+        return cached[0] or (None, None)
+
+    ttl = current_app.config.get("GEOCODE_CACHE_TTL", 30 * 24 * 3600)
+    negative_ttl = current_app.config.get("GEOCODE_NEGATIVE_TTL", 24 * 3600)
+    now = datetime.utcnow()
+
+    with db.session.no_autoflush:  # don't flush the caller's pending changes
+        entry = db.session.get(GeocodeCacheEntry, key)
+    if entry:
+        found = entry.lat is not None and entry.lon is not None
+        remaining = (entry.updated_at + timedelta(seconds=ttl if found else negative_ttl) - now).total_seconds()
+        if remaining > 0:
+            coordinates = (entry.lat, entry.lon) if found else None
+            lru_cache.put(key, coordinates, remaining)
+            return coordinates or (None, None)
+    if cached_only:
+        return None, None
+
+    try:
+        coordinates = geocoder.geocode(address)
+    except (OSError, ValueError, KeyError) as e:  # requests' errors are OSErrors
+        # Upstream failures are not cached, the next call tries again
+        print(f"Geocoding failed for {address}: {e}")
+        return None, None
+
+    store_cache_entry(key, coordinates, now)
+    if entry is not None:
+        db.session.expire(entry)  # the caller's session holds the row as it was before
+    lru_cache.put(key, coordinates, ttl if coordinates else negative_ttl)
+    return coordinates or (None, None)
+
+
+# Write a geocode_cache row on its own connection and transaction
+# geocode() is called in the middle of the callers' units of work (routing, geofences), so the
+# cache must not commit or roll back their session. Losing a cache write only costs a lookup later:
+# another worker may have stored the address first, or (SQLite) a writer may hold the lock.
+def store_cache_entry(key, coordinates, now):
+    table = GeocodeCacheEntry.__table__
+    lat, lon = coordinates if coordinates else (None, None)
+    try:
+        with db.engine.begin() as connection:
+            updated = connection.execute(
+                table.update().where(table.c.address_key == key).values(lat=lat, lon=lon, updated_at=now)
+            )
+            if not updated.rowcount:
+                connection.execute(table.insert().values(address_key=key, lat=lat, lon=lon, updated_at=now))
+    except (IntegrityError, OperationalError) as e:
+        print(f"Geocode cache write skipped for {key}: {e}")
+
+
+# Fill in the coordinates of rides published before their addresses were in the cache
+# (all such rides, or just ride_ids); returns the number of rides updated
+def resolve_ride_coordinates(ride_ids=None):
+    query = publish_ride.query.filter(db.or_(publish_ride.from_lat.is_(None), publish_ride.to_lat.is_(None)))
+    if ride_ids is not None:
+        query = query.filter(publish_ride.id.in_(ride_ids))
+    resolved = 0
+    for ride in query.all():
+        if ride.from_lat is None:
+            ride.from_lat, ride.from_lon = geocode(ride.from_location)
+        if ride.to_lat is None:
+            ride.to_lat, ride.to_lon = geocode(ride.to_location)
+        resolved += ride.from_lat is not None and ride.to_lat is not None
+    db.session.commit()
+    return resolved
+
+
+# Geocode a just-published ride after the response, so publishing never waits on the geocoder
+# (GEOCODE_IN_BACKGROUND=0 leaves it to `flask geocode-rides`)
+def resolve_in_background(ride_id):
+    app = current_app._get_current_object()
+    if app.config.get("GEOCODE_IN_BACKGROUND", True):
+        threading.Thread(target=resolve_ride_in_app, args=(app, ride_id), name="geocode-ride", daemon=True).start()
+
+
+def resolve_ride_in_app(app, ride_id):
+    with app.app_context():
+        try:
+            resolve_ride_coordinates([ride_id])
+        except Exception as e:
+            print(f"Geocoding ride {ride_id} failed: {e}")
+            db.session.rollback()
+        finally:
+            db.session.remove()
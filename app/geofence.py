@@ -0,0 +1,194 @@
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from flask import current_app
+from app import db
+from app.models import GeofenceArrival, publish_ride
+from app.geocoding import geocode
+from app.proximity import haversine_many
+
+
+# Pickup / drop-off geofences for the rides being tracked
+# A ride's fences are built once (when tracking or the journey starts) from the coordinates
+# stored at publish time, and indexed in a grid of GEOFENCE_CELL_SIZE degree cells. A location
+# update only measures the fences registered in the cell it falls into, and a participant's
+# state (outside / nearby / arrived) is kept per fence, so "nearby" and "arrived" events fire
+# once, when the state changes, instead of on every poll.
+#
+# Like the memory location store this is per process; every fence can be rebuilt from the database.
+STATES = (None, "nearby", "arrived")
+
+
+class Geofence:
+    def __init__(self, ride_key, name, lat, lon, nearby_radius, arrival_radius):
+        self.ride_key = ride_key
+        self.name = name  # pickup or dropoff
+        self.lat = lat
+        self.lon = lon
+        self.nearby_radius = nearby_radius
+        self.arrival_radius = arrival_radius
+
+    def __repr__(self):
+        return f"<Geofence {self.ride_key} {self.name} ({self.lat}, {self.lon})>"
+
+
+class GeofenceEngine:
+    # A participant only leaves a zone once they are EXIT_MARGIN times its radius away,
+    # so a position jittering on the boundary doesn't fire the same event again and again
+    EXIT_MARGIN = 1.2
+
+    def __init__(self, cell_size, ttl):
+        self.cell_size = cell_size
+        self.ttl = ttl
+        self.fences = {}               # ride_key -> [Geofence]
+        self.built_at = {}             # ride_key -> time.monotonic() of the last build
+        self.grid = defaultdict(list)  # (row, col) -> [Geofence]
+        self.states = {}               # (ride_key, user_id, fence name) -> "nearby" / "arrived"
+        self.lock = threading.Lock()
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_size), math.floor(lon / self.cell_size)
+
+    # Every cell that the fence's exit circle overlaps (its bounding box, in degrees)
+    def _cells(self, fence):
+        reach = fence.nearby_radius * self.EXIT_MARGIN
+        dlat = reach / 111320
+        dlon = reach / (111320 * max(math.cos(math.radians(fence.lat)), 0.01))
+        low = self._cell(fence.lat - dlat, fence.lon - dlon)
+        high = self._cell(fence.lat + dlat, fence.lon + dlon)
+        return [(row, col) for row in range(low[0], high[0] + 1) for col in range(low[1], high[1] + 1)]
+
+    def has_fences(self, ride_key):
+        with self.lock:
+            return ride_key in self.fences
+
+    # Replace the ride's fences (and forget the states measured against the old ones)
+    def set_fences(self, ride_key, fences):
+        with self.lock:
+            self._drop(ride_key)
+            self._expire(time.monotonic())
+            self.fences[ride_key] = fences
+            self.built_at[ride_key] = time.monotonic()
+            for fence in fences:
+                for cell in self._cells(fence):
+                    self.grid[cell].append(fence)
+
+    def drop(self, ride_key):
+        with self.lock:
+            self._drop(ride_key)
+
+    def _drop(self, ride_key):
+        for fence in self.fences.pop(ride_key, []):
+            for cell in self._cells(fence):
+                self.grid[cell].remove(fence)
+                if not self.grid[cell]:
+                    del self.grid[cell]
+        self.built_at.pop(ride_key, None)
+        for key in [key for key in self.states if key[0] == ride_key]:
+            del self.states[key]
+
+    # Rides nobody finished (e.g. the driver closed the page) are dropped after GEOFENCE_TTL
+    def _expire(self, now):
+        for ride_key in [key for key, built in self.built_at.items() if built < now - self.ttl]:
+            self._drop(ride_key)
+
+    def _state(self, fence, distance, previous):
+        margin = self.EXIT_MARGIN if previous else 1
+        if distance <= fence.arrival_radius * (margin if previous == "arrived" else 1):
+            return "arrived"
+        if distance <= fence.nearby_radius * margin:
+            return "nearby"
+        return None
+
+    # Check a participant's new position against the ride's fences
+    # Returns the transitions as [(fence, "nearby" / "arrived", distance)]; nothing while the state is unchanged
+    def update(self, ride_key, user_id, lat, lon):
+        events = []
+        with self.lock:
+            fences = self.fences.get(ride_key)
+            if not fences:
+                return events
+            candidates = [fence for fence in self.grid.get(self._cell(lat, lon), ()) if fence.ride_key == ride_key]
+            distances = {}
+            if candidates:
+                measured = haversine_many((lat, lon), [(fence.lat, fence.lon) for fence in candidates])
+                distances = {fence.name: float(distance) for fence, distance in zip(candidates, measured)}
+
+            for fence in fences:
+                key = (ride_key, user_id, fence.name)
+                previous = self.states.get(key)
+                distance = distances.get(fence.name)
+                state = self._state(fence, distance, previous) if distance is not None else None
+                if state:
+                    self.states[key] = state
+                else:
+                    self.states.pop(key, None)
+                if STATES.index(state) > STATES.index(previous):
+                    events.append((fence, state, distance))
+        return events
+
+    # A participant's current state for one of the ride's fences: None, "nearby" or "arrived"
+    def state(self, ride_key, user_id, fence_name):
+        with self.lock:
+            return self.states.get((ride_key, user_id, fence_name))
+
+    def init_app(self, app):
+        self.clear()
+        self.cell_size = app.config.get("GEOFENCE_CELL_SIZE", 0.01)
+        self.ttl = app.config.get("GEOFENCE_TTL", 12 * 3600)
+
+    def clear(self):
+        with self.lock:
+            self.fences.clear()
+            self.built_at.clear()
+            self.grid.clear()
+            self.states.clear()
+
+
+geofence_engine = GeofenceEngine(0.01, 12 * 3600)
+
+
+# Pickup (ride origin) and drop-off (destination) fences for a ride, from the coordinates
+# stored at publish time; older rides fall back to the geocode cache
+def build_ride_fences(ride, ride_key):
+    nearby_radius = current_app.config.get("GEOFENCE_NEARBY_RADIUS", 250)
+    arrival_radius = current_app.config.get("GEOFENCE_ARRIVAL_RADIUS", 50)
+    fences = []
+    for name, lat, lon, address in (("pickup", ride.from_lat, ride.from_lon, ride.from_location),
+                                    ("dropoff", ride.to_lat, ride.to_lon, ride.to_location)):
+        if lat is None or lon is None:
+            lat, lon = geocode(address)
+        if lat is not None and lon is not None:
+            fences.append(Geofence(ride_key, name, lat, lon, nearby_radius, arrival_radius))
+    if fences:
+        geofence_engine.set_fences(ride_key, fences)
+    else:
+        # Not kept: the next check builds them again, once the ride's coordinates are known
+        geofence_engine.drop(ride_key)
+    return fences
+
+
+# Build the ride's fences unless they are already there (the ride is only loaded when they aren't)
+# Returns the ride's fences, [] if its locations have no coordinates
+def ensure_ride_fences(ride_key, ride=None):
+    if geofence_engine.has_fences(ride_key):
+        return geofence_engine.fences.get(ride_key, [])
+    ride = ride or publish_ride.query.get(ride_key[0])
+    return build_ride_fences(ride, ride_key) if ride else []
+
+
+# Store the arrivals among the events (the first arrival per participant and fence is kept)
+def record_arrivals(ride_key, user_id, role, events):
+    for fence, state, distance in events:
+        if state != "arrived":
+            continue
+        try:
+            db.session.add(GeofenceArrival(ride_id=ride_key[0], ride_date=ride_key[1] or "", user_id=user_id,
+                                           role=role, fence=fence.name, distance=round(distance, 1),
+                                           arrived_at=datetime.utcnow()))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # already arrived there earlier
@@ -0,0 +1,69 @@
+import os
+from cryptography.fernet import Fernet, MultiFernet
+from flask import current_app
+
+
+# Keys for the saved card numbers (SavedCard.encrypted_card_number)
+# Every worker and every restart has to use the same keys, so they come from CARD_KEYS or from a
+# key file rather than being generated per process. The keyring is a MultiFernet: the first key
+# encrypts, every key decrypts. To rotate, put a new key first (`flask rotate-card-keys --new-key`
+# does it for the key file), restart the workers, run `flask rotate-card-keys` to re-encrypt the
+# cards with it, then the old key can be removed.
+
+
+def parse_keys(text):
+    keys = [line.strip() for line in text.replace(",", "\n").splitlines()]
+    return [key for key in keys if key and not key.startswith("#")]
+
+
+def key_file_path(app):
+    return app.config.get("CARD_KEY_FILE") or os.path.join(app.instance_path, "card_keys")
+
+
+# Write the file only if it doesn't exist yet: when several workers start at once, the first one creates it
+def create_key_file(path, keys):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w") as f:
+        f.write("\n".join(keys) + "\n")
+    return True
+
+
+# The app's keys, newest first (a key file is created with one new key when there is none)
+def load_keys(app):
+    if app.config.get("CARD_KEYS"):
+        return parse_keys(app.config["CARD_KEYS"])
+    path = key_file_path(app)
+    create_key_file(path, [Fernet.generate_key().decode()])
+    with open(path) as f:
+        keys = parse_keys(f.read())
+    if not keys:
+        raise RuntimeError(f"No card encryption keys in {path}")
+    return keys
+
+
+def build_keyring(keys):
+    return MultiFernet([Fernet(key) for key in keys])
+
+
+# Add a new primary key to the key file (the old keys stay, so existing cards still decrypt)
+def add_key_file_key(app):
+    path = key_file_path(app)
+    keys = [Fernet.generate_key().decode()] + load_keys(app)
+    replacement = path + ".new"
+    with os.fdopen(os.open(replacement, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+        f.write("\n".join(keys) + "\n")
+    os.replace(replacement, path)
+    return keys
+
+
+def init_app(app):
+    app.extensions["card_keyring"] = build_keyring(load_keys(app))
+
+
+# The keyring built when the app was created, shared by every request
+def card_cipher():
+    return current_app.extensions["card_keyring"]
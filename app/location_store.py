@@ -0,0 +1,198 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+# Live driver / passenger positions for the pickup tracking pages
+# Positions are grouped per ride bucket, keyed by (ride_id, ride_date) (ride_date is None for
+# one-time rides), so reading one ride never touches the others. Passenger fixes carry the
+# passenger's username, so a poll needs no database lookups. Every fix expires after
+# LOCATION_TTL seconds; a ride whose fixes have all expired disappears.
+#
+# Backends:
+#   MemoryLocationStore  - in-process, bounded to LOCATION_MAX_RIDES buckets (least recently updated evicted)
+#   SQLiteLocationStore  - a small SQLite file shared by every worker process on the host
+class MemoryLocationStore:
+    def __init__(self, ttl, max_rides):
+        self.ttl = ttl
+        self.max_rides = max_rides
+        # (ride_id, ride_date) -> {"driver": (lat, lon, t), "passengers": {user_id: (lat, lon, t, username)}}
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _bucket(self, ride_key):
+        bucket = self.buckets.get(ride_key)
+        if bucket is None:
+            bucket = self.buckets[ride_key] = {"driver": None, "passengers": {}}
+        self.buckets.move_to_end(ride_key)
+        return bucket
+
+    def _evict(self, now):
+        # Least recently updated rides first: drop them while they are stale or over the bound
+        while self.buckets:
+            ride_key, bucket = next(iter(self.buckets.items()))
+            if len(self.buckets) <= self.max_rides and self._newest(bucket) >= now - self.ttl:
+                break
+            del self.buckets[ride_key]
+
+    @staticmethod
+    def _newest(bucket):
+        times = [fix[2] for fix in bucket["passengers"].values()]
+        if bucket["driver"]:
+            times.append(bucket["driver"][2])
+        return max(times, default=0)
+
+    def set_driver(self, ride_id, ride_date, lat, lon):
+        now = time.monotonic()
+        with self.lock:
+            self._bucket((ride_id, ride_date))["driver"] = (lat, lon, now)
+            self._evict(now)
+
+    def set_passenger(self, ride_id, ride_date, user_id, username, lat, lon):
+        now = time.monotonic()
+        with self.lock:
+            self._bucket((ride_id, ride_date))["passengers"][user_id] = (lat, lon, now, username)
+            self._evict(now)
+
+    # (driver (lat, lon) or None, {username: (lat, lon)}) with only the fixes that haven't expired
+    def get_ride(self, ride_id, ride_date):
+        oldest = time.monotonic() - self.ttl
+        with self.lock:
+            bucket = self.buckets.get((ride_id, ride_date))
+            if bucket is None:
+                return None, {}
+            driver = bucket["driver"]
+            driver = (driver[0], driver[1]) if driver and driver[2] >= oldest else None
+            passengers = {}
+            for user_id, fix in list(bucket["passengers"].items()):
+                if fix[2] >= oldest:
+                    passengers[fix[3]] = (fix[0], fix[1])
+                else:
+                    del bucket["passengers"][user_id]
+            return driver, passengers
+
+    # Rides with a live position and the number of live positions (drivers and passengers)
+    def stats(self):
+        oldest = time.monotonic() - self.ttl
+        rides = positions = 0
+        with self.lock:
+            for bucket in self.buckets.values():
+                live = sum(fix[2] >= oldest for fix in bucket["passengers"].values())
+                live += bool(bucket["driver"] and bucket["driver"][2] >= oldest)
+                rides += bool(live)
+                positions += live
+        return rides, positions
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class SQLiteLocationStore:
+    # Stale rows are deleted on every CLEANUP_EVERY-th write
+    CLEANUP_EVERY = 500
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self.local = threading.local()
+        self.writes = 0
+        with self._connection() as connection:
+            # Fixes only live for a couple of minutes, so a file from an older layout is simply replaced
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(live_location)")]
+            if columns and "username" not in columns:
+                connection.execute("DROP TABLE live_location")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS live_location ("
+                "ride_id INTEGER NOT NULL, ride_date TEXT NOT NULL, user_id INTEGER NOT NULL, "
+                "username TEXT NOT NULL, lat REAL NOT NULL, lon REAL NOT NULL, updated_at REAL NOT NULL, "
+                "PRIMARY KEY (ride_id, ride_date, user_id))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_live_location_updated_at ON live_location (updated_at)")
+
+    # One connection per thread; WAL lets the workers read while another one writes
+    def _connection(self):
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    # The driver is stored as user_id 0; one-time rides use '' as the date
+    def _set(self, ride_id, ride_date, user_id, username, lat, lon):
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO live_location (ride_id, ride_date, user_id, username, lat, lon, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ride_id, ride_date or "", user_id, username, lat, lon, now)
+            )
+            self.writes += 1
+            if self.writes % self.CLEANUP_EVERY == 0:
+                connection.execute("DELETE FROM live_location WHERE updated_at < ?", (now - self.ttl,))
+
+    def set_driver(self, ride_id, ride_date, lat, lon):
+        self._set(ride_id, ride_date, 0, "", lat, lon)
+
+    def set_passenger(self, ride_id, ride_date, user_id, username, lat, lon):
+        self._set(ride_id, ride_date, user_id, username, lat, lon)
+
+    def get_ride(self, ride_id, ride_date):
+        rows = self._connection().execute(
+            "SELECT user_id, username, lat, lon FROM live_location WHERE ride_id = ? AND ride_date = ? AND updated_at >= ?",
+            (ride_id, ride_date or "", time.time() - self.ttl)
+        ).fetchall()
+        driver = None
+        passengers = {}
+        for user_id, username, lat, lon in rows:
+            if user_id == 0:
+                driver = (lat, lon)
+            else:
+                passengers[username] = (lat, lon)
+        return driver, passengers
+
+    def stats(self):
+        rides, positions = self._connection().execute(
+            "SELECT COUNT(DISTINCT ride_id || '/' || ride_date), COUNT(*) FROM live_location WHERE updated_at >= ?",
+            (time.time() - self.ttl,)
+        ).fetchone()
+        return rides, positions
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM live_location")
+
+
+# ride_date is None for one-time rides; ids arrive as strings from the tracking page
+def location_ride_key(ride_id, ride_date=None):
+    return int(ride_id), (ride_date or None)
+
+
+def create_location_store(app):
+    ttl = app.config.get("LOCATION_TTL", 120)
+    if app.config.get("LOCATION_STORE", "memory") == "sqlite":
+        path = app.config.get("LOCATION_STORE_PATH") or os.path.join(app.instance_path, "live_locations.db")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return SQLiteLocationStore(path, ttl)
+    return MemoryLocationStore(ttl, app.config.get("LOCATION_MAX_RIDES", 10000))
+
+
+# The process's store, picked by LOCATION_STORE when the app is created (create_app calls init_app)
+class LocationStore:
+    def __init__(self):
+        self.backend = None
+
+    def init_app(self, app):
+        self.backend = create_location_store(app)
+
+    def __getattr__(self, name):
+        if self.backend is None:
+            raise RuntimeError("location_store is used before create_app() set it up")
+        return getattr(self.backend, name)
+
+
+location_store = LocationStore()
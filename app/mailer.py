@@ -0,0 +1,214 @@
+import os
+import json
+import smtplib
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy.orm import Session
+from app import db
+from app.models import OutboundEmail
+
+
+# Delivery backends: deliver(emails) sends a batch and returns {email_id: error or None}
+
+# Real delivery through Flask-Mail, one SMTP connection per batch
+class SMTPBackend:
+    def deliver(self, emails):
+        results = {}
+        try:
+            with get_mail().connect() as connection:
+                for email in emails:
+                    try:
+                        connection.send(build_message(email))
+                        results[email.id] = None
+                    except (smtplib.SMTPException, OSError) as e:
+                        results[email.id] = str(e)
+        except (smtplib.SMTPException, OSError) as e:
+            # Could not connect (or the connection dropped): the rest of the batch is retried
+            for email in emails:
+                results.setdefault(email.id, str(e))
+        return results
+
+
+# Writes each email to MAIL_FILE_DIR as an .eml file (local development and tests)
+class FileBackend:
+    def deliver(self, emails):
+        directory = current_app.config["MAIL_FILE_DIR"]
+        os.makedirs(directory, exist_ok=True)
+        results = {}
+        for email in emails:
+            with open(os.path.join(directory, f"{email.id}.eml"), "w") as f:
+                f.write(build_message(email).as_string())
+            results[email.id] = None
+        return results
+
+
+# Prints each email (local development)
+class ConsoleBackend:
+    def deliver(self, emails):
+        for email in emails:
+            print(build_message(email).as_string())
+        return {email.id: None for email in emails}
+
+
+BACKENDS = {
+    "smtp": SMTPBackend,
+    "file": FileBackend,
+    "console": ConsoleBackend,
+}
+
+
+def get_backend():
+    return BACKENDS[current_app.config.get("MAIL_BACKEND", "smtp")]()
+
+
+# Flask-Mail is only set up (and imported) once the app actually sends over SMTP
+def get_mail():
+    from flask_mail import Mail
+    state = current_app.extensions.get("mail")
+    if state is None:
+        state = Mail().init_app(current_app._get_current_object())
+    return state
+
+
+def build_message(email):
+    from flask_mail import Message
+    get_mail()  # Message takes the default sender from the Flask-Mail state
+    return Message(email.subject, recipients=email.get_recipients(), body=email.body)
+
+
+# Add an email to the outbox, in the caller's transaction
+# It is sent once the transaction commits (the commit wakes the dispatcher)
+def queue_email(recipients, subject, body):
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    email = OutboundEmail(recipients=json.dumps(recipients), subject=subject, body=body)
+    db.session.add(email)
+    db.session.info["outbox_pending"] = True
+    return email
+
+
+@db.event.listens_for(Session, "after_commit")
+def wake_dispatcher_after_commit(session):
+    if session.info.pop("outbox_pending", False):
+        dispatcher.wake()
+
+
+@db.event.listens_for(Session, "after_rollback")
+def forget_queued_email(session):
+    session.info.pop("outbox_pending", None)
+
+
+# Seconds to wait before retrying an email that has failed `attempts` times
+def retry_delay(attempts):
+    return current_app.config.get("MAIL_RETRY_BASE", 60) * 2 ** (attempts - 1)
+
+
+# Send one batch of due emails; returns how many were attempted (0 when the outbox is empty)
+# Emails are claimed by pushing next_attempt_at past a lease with a conditional UPDATE,
+# so several workers (threads or `flask mail-worker` processes) never send the same email twice
+def dispatch_pending(backend=None):
+    now = datetime.utcnow()
+    due_ids = [email_id for (email_id,) in db.session.query(OutboundEmail.id).filter(
+        OutboundEmail.status == "pending", OutboundEmail.next_attempt_at <= now
+    ).order_by(OutboundEmail.next_attempt_at, OutboundEmail.id).limit(current_app.config.get("MAIL_BATCH_SIZE", 20))]
+    if not due_ids:
+        db.session.rollback()
+        return 0
+
+    table = OutboundEmail.__table__
+    lease_until = now + timedelta(seconds=current_app.config.get("MAIL_SEND_LEASE", 300))
+    claimed_ids = []
+    for email_id in due_ids:
+        result = db.session.execute(
+            table.update()
+            .where(table.c.id == email_id, table.c.status == "pending", table.c.next_attempt_at <= now)
+            .values(next_attempt_at=lease_until)
+        )
+        if result.rowcount:
+            claimed_ids.append(email_id)
+    db.session.commit()
+    if not claimed_ids:
+        return 0
+
+    emails = OutboundEmail.query.filter(OutboundEmail.id.in_(claimed_ids)).all()
+    results = (backend or get_backend()).deliver(emails)
+
+    finished_at = datetime.utcnow()
+    max_attempts = current_app.config.get("MAIL_MAX_ATTEMPTS", 5)
+    for email in emails:
+        error = results.get(email.id, "not delivered")
+        email.attempts += 1
+        if error is None:
+            email.status = "sent"
+            email.sent_at = finished_at
+            email.last_error = None
+        else:
+            email.last_error = error[:1000]
+            if email.attempts >= max_attempts:
+                email.status = "failed"
+            else:
+                email.next_attempt_at = finished_at + timedelta(seconds=retry_delay(email.attempts))
+    db.session.commit()
+    return len(emails)
+
+
+# Background thread that drains the outbox
+# Woken right after a commit that queued email; also polls every MAIL_POLL_INTERVAL for retries
+class MailDispatcher:
+    def __init__(self):
+        self.app = None  # set by init_app; the thread works in this app's context
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stopping.clear()
+            self.thread = threading.Thread(target=self.run, name="mail-dispatcher", daemon=True)
+            self.thread.start()
+
+    def stop(self, timeout=5):
+        self.stopping.set()
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def wake(self):
+        if self.app is None or not self.app.config.get("MAIL_DISPATCHER_THREAD", True):
+            return
+        self.start()
+        self.wakeup.set()
+
+    def run(self):
+        while not self.stopping.is_set():
+            self.wakeup.clear()
+            with self.app.app_context():
+                try:
+                    while dispatch_pending() and not self.stopping.is_set():
+                        pass
+                except Exception as e:
+                    # Keep the thread alive (e.g. database briefly locked); the emails stay queued
+                    print(f"Mail dispatcher error: {e}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+            self.wakeup.wait(self.app.config.get("MAIL_POLL_INTERVAL", 30))
+
+
+dispatcher = MailDispatcher()
+
+
+# Start the dispatcher with the first request, so emails left queued by a previous run go out too
+def start_mail_dispatcher():
+    if current_app.config.get("MAIL_DISPATCHER_THREAD", True):
+        dispatcher.start()
+
+
+def init_app(app):
+    dispatcher.app = app
+    app.before_request(start_mail_dispatcher)
@@ -0,0 +1,231 @@
+import time
+import hmac
+import threading
+from bisect import bisect_left
+from flask import Blueprint, Response, abort, current_app, has_request_context, request
+from sqlalchemy import event
+
+
+# In-process metrics, served at /metrics in the Prometheus text format (METRICS in config.py)
+# Point a Prometheus scraper at every worker, or just open /metrics in a browser / curl it.
+# Counters and histograms are kept per thread: a thread only ever writes its own shard, so the hot
+# path takes no lock, and /metrics adds the shards up. Shards of finished threads are folded into
+# one retired shard, so servers that start a thread per request don't pile them up. The live
+# tracking gauges are read from the location store when /metrics is scraped.
+
+PREFIX = "catchmyride_"
+
+# name -> (type, help); histograms also get _bucket / _sum / _count series
+METRICS = {
+    "http_requests_total": ("counter", "HTTP requests handled, by endpoint, method and status."),
+    "http_request_duration_seconds": ("histogram", "Time spent handling HTTP requests, by endpoint."),
+    "http_requests_in_progress": ("gauge", "HTTP requests being handled right now."),
+    "db_queries_total": ("counter", "SQL statements run while handling requests, by endpoint."),
+    "bookings_created_total": ("counter", "Ride bookings created (one per booked date)."),
+    "payments_total": ("counter", "Payments recorded, by status."),
+    "cancellations_total": ("counter", "Bookings cancelled, by refund (full or partial)."),
+    "refunded_gbp_total": ("counter", "Amount refunded on cancelled bookings, in GBP."),
+    "chat_messages_total": ("counter", "Chat messages sent."),
+    "live_tracking_rides": ("gauge", "Rides with a live driver or passenger position."),
+    "live_locations": ("gauge", "Live driver and passenger positions in the location store."),
+}
+
+# Upper bounds of the request latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Shards of finished threads are folded once there are more than this many
+SHARDS_BEFORE_FOLD = 64
+
+
+class MetricShard:
+    def __init__(self, thread):
+        self.thread = thread
+        self.counters = {}     # (name, labels) -> value
+        self.histograms = {}   # (name, labels) -> [count per bucket ..., count above the last, sum]
+
+    def merge(self, other):
+        for key, value in other.counters.copy().items():
+            self.counters[key] = self.counters.get(key, 0) + value
+        for key, values in other.histograms.copy().items():
+            totals = self.histograms.setdefault(key, [0] * len(values))
+            for index, value in enumerate(list(values)):
+                totals[index] += value
+
+
+class Metrics:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.local = threading.local()
+        self.shards = []
+        self.retired = MetricShard(None)
+        self.lock = threading.Lock()   # only for adding and folding shards
+
+    def _shard(self):
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            shard = self.local.shard = MetricShard(threading.current_thread())
+            with self.lock:
+                self.shards.append(shard)
+                if len(self.shards) > SHARDS_BEFORE_FOLD:
+                    self._fold_finished()
+        return shard
+
+    # A finished thread can't write to its shard any more, so it is safe to fold (holding self.lock)
+    def _fold_finished(self):
+        running = []
+        for shard in self.shards:
+            if shard.thread.is_alive():
+                running.append(shard)
+            else:
+                self.retired.merge(shard)
+        self.shards = running
+
+    # labels are keyword arguments, e.g. count("payments_total", status="Success")
+    def count(self, name, value=1, **labels):
+        counters = self._shard().counters
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        histograms = self._shard().histograms
+        key = (name, tuple(sorted(labels.items())))
+        values = histograms.get(key)
+        if values is None:
+            values = histograms[key] = [0] * (len(self.buckets) + 2)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    # All shards added up: (counters, histograms)
+    def collect(self):
+        total = MetricShard(None)
+        with self.lock:
+            self._fold_finished()
+            total.merge(self.retired)
+            for shard in self.shards:
+                total.merge(shard)
+        return total.counters, total.histograms
+
+    def reset(self):
+        with self.lock:
+            for shard in self.shards + [self.retired]:
+                shard.counters.clear()
+                shard.histograms.clear()
+
+    def render(self, gauges=()):
+        counters, histograms = self.collect()
+        samples = {}
+        for (name, labels), value in counters.items():
+            samples.setdefault(name, []).append(sample(name, labels, value))
+        for name, labels, value in gauges:
+            samples.setdefault(name, []).append(sample(name, tuple(sorted(labels.items())), value))
+        for (name, labels), values in sorted(histograms.items()):
+            cumulative = 0
+            lines = samples.setdefault(name, [])
+            for bound, count in zip(self.buckets + (float("inf"),), values[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(sample(name + "_bucket", labels + (("le", le),), cumulative))
+            lines.append(sample(name + "_sum", labels, values[-1]))
+            lines.append(sample(name + "_count", labels, cumulative))
+
+        output = []
+        for name, (kind, help_text) in METRICS.items():
+            output.append(f"# HELP {PREFIX}{name} {help_text}")
+            output.append(f"# TYPE {PREFIX}{name} {kind}")
+            lines = samples.get(name, [])
+            output.extend(lines if kind == "histogram" else sorted(lines))
+        return "\n".join(output) + "\n"
+
+
+def sample(name, labels, value):
+    if labels:
+        label_text = ",".join(f'{key}="{escape_label(label)}"' for key, label in labels)
+        return f"{PREFIX}{name}{{{label_text}}} {format_value(value)}"
+    return f"{PREFIX}{name} {format_value(value)}"
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+metrics = Metrics()
+
+
+# Requests: the hooks time every request and count its SQL statements (the engine event below)
+# The numbers are kept in the WSGI environ rather than on g: teardown_request can run after the
+# app context the request shared has already gone (e.g. the test client's preserved contexts)
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.status = 500   # until a response is made
+
+
+def start_request_metrics():
+    request.environ["catchmyride.metrics"] = RequestMetrics()
+    metrics.count("http_requests_in_progress")
+
+
+def record_response_status(response):
+    request_metrics = request.environ.get("catchmyride.metrics")
+    if request_metrics is not None:
+        request_metrics.status = response.status_code
+    return response
+
+
+# Runs after unhandled errors too (status 500), so the in-progress gauge always comes back down
+def finish_request_metrics(error=None):
+    request_metrics = request.environ.pop("catchmyride.metrics", None)
+    if request_metrics is None:
+        return
+    endpoint = request.endpoint or "unmatched"
+    metrics.count("http_requests_in_progress", -1)
+    metrics.count("http_requests_total", endpoint=endpoint, method=request.method, status=request_metrics.status)
+    metrics.observe("http_request_duration_seconds", time.perf_counter() - request_metrics.started, endpoint=endpoint)
+    if request_metrics.queries:
+        metrics.count("db_queries_total", request_metrics.queries, endpoint=endpoint)
+
+
+def count_query(connection, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        request_metrics = request.environ.get("catchmyride.metrics")
+        if request_metrics is not None:
+            request_metrics.queries += 1
+
+
+def live_tracking_gauges():
+    from app.location_store import location_store
+    rides, positions = location_store.stats()
+    return [("live_tracking_rides", {}, rides), ("live_locations", {}, positions)]
+
+
+bp = Blueprint("metrics", __name__)
+
+
+# Route for the Prometheus metrics (Authorization: Bearer <METRICS_TOKEN> when a token is set)
+@bp.route("/metrics")
+def metrics_page():
+    token = current_app.config.get("METRICS_TOKEN")
+    if token and not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        abort(401)
+    return Response(metrics.render(live_tracking_gauges()), mimetype="text/plain; version=0.0.4")
+
+
+# Register the request hooks, the query counter and /metrics, only when METRICS is on
+# The domain counters (bookings, payments, ...) are counted by the views either way
+def init_app(app):
+    if not app.config.get("METRICS"):
+        return
+    from app import db
+    with app.app_context():
+        engine = db.engine
+    if not event.contains(engine, "after_cursor_execute", count_query):
+        event.listen(engine, "after_cursor_execute", count_query)
+    app.before_request(start_request_metrics)
+    app.after_request(record_response_status)
+    app.teardown_request(finish_request_metrics)
+    app.register_blueprint(bp)
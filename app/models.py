@@ -1,10 +1,13 @@
+import json
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from app import app, db
-from datetime import date, datetime
+from sqlalchemy import func
+from app import db
+from app.keyring import card_cipher
+from datetime import date, datetime, timedelta
 from itsdangerous import URLSafeTimedSerializer
 from werkzeug.security import generate_password_hash, check_password_hash
-from cryptography.fernet import Fernet
+from cryptography.fernet import InvalidToken
 
 # Association table to track which passengers booked which rides
 passenger_rides = db.Table(
@@ -76,11 +79,132 @@ class publish_ride(db.Model):
     commute_times = db.Column(db.String(255), nullable=True)  # Stores commute time slots
     is_available = db.Column(db.Boolean, default=True)
     status = db.Column(db.String(20), default="Booked")
+    # Coordinates of the origin and destination, resolved at publish time (used by /api/search_nearby)
+    from_lat = db.Column(db.Float, nullable=True)
+    from_lon = db.Column(db.Float, nullable=True)
+    to_lat = db.Column(db.Float, nullable=True)
+    to_lon = db.Column(db.Float, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_publish_ride_driver_date', 'driver_id', 'date_time'),  # driver dashboard and earnings
+    )
+
+    # Relationship: live seat counts per date (see RideSeatInventory)
+    seat_inventory = db.relationship('RideSeatInventory', backref='ride', lazy=True,
+                                     cascade="all, delete-orphan", order_by='RideSeatInventory.ride_date')
 
     def __repr__(self):
         return f"<Published Ride {self.from_location} to {self.to_location}>"
 
 
+# Table for the seats left on each date of a published ride
+# publish_ride.available_seats_per_date only keeps the seat map the ride was published with,
+# every booking and cancellation updates the rows here instead
+class RideSeatInventory(db.Model):
+    __tablename__ = 'ride_seat_inventory'
+
+    ride_id = db.Column(db.Integer, db.ForeignKey('publish_ride.id'), primary_key=True)
+    ride_date = db.Column(db.Date, primary_key=True)
+    seats_left = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_ride_seat_inventory_date_seats', 'ride_date', 'seats_left'),
+    )
+
+    # Seats left for a ride as {"YYYY-MM-DD": seats}, the format the views and templates use
+    @staticmethod
+    def seats_by_date(ride_id, dates=None):
+        query = RideSeatInventory.query.filter_by(ride_id=ride_id)
+        if dates is not None:
+            query = query.filter(RideSeatInventory.ride_date.in_(dates))
+        return {
+            row.ride_date.strftime("%Y-%m-%d"): row.seats_left
+            for row in query.order_by(RideSeatInventory.ride_date).all()
+        }
+
+    # Seat maps for many rides in a single query: {ride_id: {"YYYY-MM-DD": seats}}
+    @staticmethod
+    def seats_for_rides(ride_ids, from_date=None):
+        seat_maps = {ride_id: {} for ride_id in ride_ids}
+        if not ride_ids:
+            return seat_maps
+        query = RideSeatInventory.query.filter(RideSeatInventory.ride_id.in_(ride_ids))
+        if from_date is not None:
+            query = query.filter(RideSeatInventory.ride_date >= from_date)
+        for row in query.order_by(RideSeatInventory.ride_id, RideSeatInventory.ride_date).all():
+            seat_maps[row.ride_id][row.ride_date.strftime("%Y-%m-%d")] = row.seats_left
+        return seat_maps
+
+    # SQL predicate: the ride has at least `seats` left (on `on_date`, or on/after `from_date`, if given)
+    @staticmethod
+    def has_seats(seats, on_date=None, from_date=None):
+        conditions = [
+            RideSeatInventory.ride_id == publish_ride.id,
+            RideSeatInventory.seats_left >= seats
+        ]
+        if on_date is not None:
+            conditions.append(RideSeatInventory.ride_date == on_date)
+        if from_date is not None:
+            conditions.append(RideSeatInventory.ride_date >= from_date)
+        return db.exists().where(*conditions)
+
+    # Take `seats` from one date with a single conditional UPDATE, in the caller's transaction
+    # The check and the decrement are one statement, so concurrent reservations can't oversell;
+    # returns False (and changes nothing) when fewer than `seats` are left
+    @staticmethod
+    def reserve(ride_id, ride_date, seats):
+        table = RideSeatInventory.__table__
+        result = db.session.execute(
+            table.update()
+            .where(table.c.ride_id == ride_id, table.c.ride_date == ride_date, table.c.seats_left >= seats)
+            .values(seats_left=table.c.seats_left - seats)
+        )
+        return result.rowcount == 1
+
+    # Give `seats` back to one date (cancellations), in the caller's transaction
+    @staticmethod
+    def release(ride_id, ride_date, seats):
+        table = RideSeatInventory.__table__
+        db.session.execute(
+            table.update()
+            .where(table.c.ride_id == ride_id, table.c.ride_date == ride_date)
+            .values(seats_left=table.c.seats_left + seats)
+        )
+
+    def __repr__(self):
+        return f"<RideSeatInventory ride={self.ride_id} {self.ride_date}: {self.seats_left}>"
+
+
+# Parse a publish-time seat map (JSON text or dict) into [(date, seats)], skipping bad entries
+def parse_seat_map(raw_seats):
+    if isinstance(raw_seats, str):
+        try:
+            raw_seats = json.loads(raw_seats)
+        except (json.JSONDecodeError, TypeError):
+            return []
+    if not isinstance(raw_seats, dict):
+        return []
+
+    rows = []
+    for date_str, seats in raw_seats.items():
+        try:
+            rows.append((datetime.strptime(date_str.strip(), "%Y-%m-%d").date(), int(seats)))
+        except (ValueError, TypeError, AttributeError):
+            continue
+    return rows
+
+
+# Seed the inventory rows from the seat map a ride is published with (same transaction as the insert)
+@db.event.listens_for(publish_ride, "after_insert")
+def seed_seat_inventory(mapper, connection, ride):
+    rows = parse_seat_map(ride.available_seats_per_date)
+    if rows:
+        connection.execute(
+            RideSeatInventory.__table__.insert(),
+            [{"ride_id": ride.id, "ride_date": ride_date, "seats_left": seats} for ride_date, seats in rows]
+        )
+
+
 # Table for booking a journey from avaliable journeys (user/passenger)
 class book_ride(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -95,6 +219,18 @@ class book_ride(db.Model):
     
     ride = db.relationship('publish_ride', backref='bookings')
 
+    __table_args__ = (
+        db.Index('ix_book_ride_ride_date', 'ride_id', 'ride_date'),                     # a ride's passengers (on a date)
+        db.Index('ix_book_ride_user_ride_date', 'user_id', 'ride_id', 'ride_date'),    # a user's bookings (of a ride, on a date)
+    )
+
+    # SQL predicate: the booking is on `day` (a date)
+    # A half-open datetime range rather than date(ride_date) == day, so the indexes above can be used
+    @staticmethod
+    def on_date(day):
+        start = datetime.combine(day, datetime.min.time())
+        return db.and_(book_ride.ride_date >= start, book_ride.ride_date < start + timedelta(days=1))
+
     def __repr__(self):
         return f"<Booking for {self.ride.from_location} to {self.ride.to_location}>"
 
@@ -113,8 +249,240 @@ class Payment(db.Model):
 
     booking = db.relationship('book_ride', backref='payment')
 
+    __table_args__ = (
+        db.Index('ix_payment_book_ride', 'book_ride_id'),
+        db.Index('ix_payment_ride_timestamp', 'ride_id', 'timestamp'),
+    )
+
+
+# Default platform fee rate for payments stored without one
+DEFAULT_PLATFORM_FEE = 0.005
+
+
+# Fee rate of a payment; only a missing rate falls back to the default, a 0 fee stays 0
+def payment_fee_rate(payment):
+    return DEFAULT_PLATFORM_FEE if payment.platform_fee is None else payment.platform_fee
+
+
+# What the driver keeps from a payment, after the platform fee and any partial refund
+def driver_earning(payment):
+    fee = payment_fee_rate(payment)
+    if payment.status == "Success":
+        return payment.amount * (1 - fee)
+    if payment.status == "Partially Refunded":
+        # 75% charged (25% refunded), so driver still gets 75%
+        return payment.amount * 0.75 * (1 - fee)
+    return 0.0  # fully refunded or failed
+
+
+# Week bucket used by the earnings charts ("2025-W48", weeks starting on Sunday)
+def earnings_week(timestamp):
+    return timestamp.strftime("%Y-W%U")
+
+
+# Table for each driver's net earnings per week, kept up to date by the Payment events below
+# (rebuilt from Payment with `flask rebuild-earnings`)
+class DriverWeeklyEarnings(db.Model):
+    __tablename__ = 'driver_weekly_earnings'
+
+    driver_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    week = db.Column(db.String(8), primary_key=True)
+    amount = db.Column(db.Float, nullable=False, default=0.0)
+
+    # Add `delta` to the driver's total for the week of `timestamp`, on the flushing connection
+    @staticmethod
+    def apply_change(connection, driver_id, timestamp, delta):
+        if not delta or driver_id is None or timestamp is None:
+            return
+        table = DriverWeeklyEarnings.__table__
+        week = earnings_week(timestamp)
+        updated = connection.execute(
+            table.update()
+            .where(table.c.driver_id == driver_id, table.c.week == week)
+            .values(amount=table.c.amount + delta)
+        )
+        if not updated.rowcount:
+            connection.execute(table.insert().values(driver_id=driver_id, week=week, amount=delta))
+
+    # Recompute every row from the payments table
+    @staticmethod
+    def rebuild():
+        totals = {}
+        rows = db.session.query(Payment, publish_ride.driver_id).join(
+            publish_ride, publish_ride.id == Payment.ride_id
+        ).yield_per(1000)
+        for payment, driver_id in rows:
+            key = (driver_id, earnings_week(payment.timestamp))
+            totals[key] = totals.get(key, 0.0) + driver_earning(payment)
+
+        DriverWeeklyEarnings.query.delete()
+        db.session.add_all([
+            DriverWeeklyEarnings(driver_id=driver_id, week=week, amount=amount)
+            for (driver_id, week), amount in totals.items()
+        ])
+        db.session.commit()
+        return len(totals)
+
+    def __repr__(self):
+        return f"<DriverWeeklyEarnings driver={self.driver_id} {self.week}: {self.amount}>"
+
+
+# Platform revenue from a payment: only successful, unrefunded payments count
+def platform_revenue(payment):
+    if payment.status != "Success" or payment.refunded:
+        return None
+    return payment.amount * payment_fee_rate(payment)
+
+
+# Table for platform-wide counters (bookings, rides published) shown on the manager dashboard
+class PlatformCounter(db.Model):
+    __tablename__ = 'platform_counter'
+
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    # Add `delta` to a counter, on the flushing connection
+    @staticmethod
+    def apply_change(connection, name, delta):
+        table = PlatformCounter.__table__
+        updated = connection.execute(
+            table.update().where(table.c.name == name).values(value=table.c.value + delta)
+        )
+        if not updated.rowcount:
+            connection.execute(table.insert().values(name=name, value=delta))
+
+    @staticmethod
+    def get(name):
+        counter = db.session.get(PlatformCounter, name)
+        return counter.value if counter else 0
+
+    def __repr__(self):
+        return f"<PlatformCounter {self.name}={self.value}>"
+
+
+# Table for platform revenue per day and fee rate (successful, unrefunded payments)
+# Weekly totals, the all-time total and per-fee-rate totals are all small GROUP BYs over it
+class PlatformDailyRevenue(db.Model):
+    __tablename__ = 'platform_daily_revenue'
+
+    day = db.Column(db.Date, primary_key=True)
+    fee_rate = db.Column(db.Float, primary_key=True)
+    payments = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Float, nullable=False, default=0.0)
+    platform_fees = db.Column(db.Float, nullable=False, default=0.0)
+
+    # Add (sign=1) or remove (sign=-1) a payment's revenue, on the flushing connection
+    @staticmethod
+    def apply_change(connection, payment, sign):
+        fees = platform_revenue(payment)
+        if fees is None or payment.timestamp is None:
+            return
+        table = PlatformDailyRevenue.__table__
+        day = payment.timestamp.date()
+        fee_rate = payment_fee_rate(payment)
+        updated = connection.execute(
+            table.update()
+            .where(table.c.day == day, table.c.fee_rate == fee_rate)
+            .values(payments=table.c.payments + sign,
+                    amount=table.c.amount + sign * payment.amount,
+                    platform_fees=table.c.platform_fees + sign * fees)
+        )
+        if not updated.rowcount:
+            connection.execute(table.insert().values(day=day, fee_rate=fee_rate, payments=sign,
+                                                     amount=sign * payment.amount,
+                                                     platform_fees=sign * fees))
+
+    def __repr__(self):
+        return f"<PlatformDailyRevenue {self.day} @{self.fee_rate}: {self.platform_fees}>"
+
+
+# Recompute the platform stats tables from bookings, rides and payments (`flask rebuild-stats`)
+def rebuild_platform_stats():
+    PlatformCounter.query.delete()
+    PlatformDailyRevenue.query.delete()
+    db.session.add(PlatformCounter(name="bookings", value=book_ride.query.count()))
+    db.session.add(PlatformCounter(name="rides_published", value=publish_ride.query.count()))
+
+    fees = func.coalesce(Payment.platform_fee, DEFAULT_PLATFORM_FEE)
+    day = func.date(Payment.timestamp)
+    rows = db.session.query(
+        day, fees, func.count(Payment.id), func.sum(Payment.amount), func.sum(Payment.amount * fees)
+    ).filter(Payment.status == "Success", Payment.refunded == False).group_by(day, fees).all()
+
+    db.session.add_all([
+        PlatformDailyRevenue(day=datetime.strptime(str(row_day), "%Y-%m-%d").date(), fee_rate=fee_rate,
+                             payments=payments, amount=amount, platform_fees=platform_fees)
+        for row_day, fee_rate, payments, amount, platform_fees in rows
+    ])
+    db.session.commit()
+    return len(rows)
+
+
+# Keep the payment rollups (DriverWeeklyEarnings, PlatformDailyRevenue) in step with payments
+# (same transaction as the payment write)
+def payment_driver_id(connection, payment):
+    return connection.execute(
+        db.select(publish_ride.driver_id).where(publish_ride.id == payment.ride_id)
+    ).scalar()
+
+
+@db.event.listens_for(Payment, "after_insert")
+def add_payment_rollups(mapper, connection, payment):
+    DriverWeeklyEarnings.apply_change(connection, payment_driver_id(connection, payment),
+                                      payment.timestamp, driver_earning(payment))
+    PlatformDailyRevenue.apply_change(connection, payment, 1)
+
+
+@db.event.listens_for(Payment, "before_update")
+def update_payment_rollups(mapper, connection, payment):
+    state = db.inspect(payment)
+    tracked = ("amount", "status", "platform_fee", "timestamp", "ride_id", "refunded")
+    if not any(state.attrs[name].history.has_changes() for name in tracked):
+        return
+
+    # The row still holds the values from before this flush
+    table = Payment.__table__
+    row = connection.execute(
+        db.select(*[table.c[name] for name in tracked]).where(table.c.id == payment.id)
+    ).mappings().first()
+    if row is None:
+        return
+    previous = Payment(**row)
 
-cipher = Fernet(app.config["ENCRYPTION_KEY"])
+    DriverWeeklyEarnings.apply_change(connection, payment_driver_id(connection, previous),
+                                      previous.timestamp, -driver_earning(previous))
+    DriverWeeklyEarnings.apply_change(connection, payment_driver_id(connection, payment),
+                                      payment.timestamp, driver_earning(payment))
+    PlatformDailyRevenue.apply_change(connection, previous, -1)
+    PlatformDailyRevenue.apply_change(connection, payment, 1)
+
+
+@db.event.listens_for(Payment, "after_delete")
+def remove_payment_rollups(mapper, connection, payment):
+    DriverWeeklyEarnings.apply_change(connection, payment_driver_id(connection, payment),
+                                      payment.timestamp, -driver_earning(payment))
+    PlatformDailyRevenue.apply_change(connection, payment, -1)
+
+
+# Keep the booking and ride counters in step
+@db.event.listens_for(book_ride, "after_insert")
+def count_booking(mapper, connection, booking):
+    PlatformCounter.apply_change(connection, "bookings", 1)
+
+
+@db.event.listens_for(book_ride, "after_delete")
+def uncount_booking(mapper, connection, booking):
+    PlatformCounter.apply_change(connection, "bookings", -1)
+
+
+@db.event.listens_for(publish_ride, "after_insert")
+def count_ride(mapper, connection, ride):
+    PlatformCounter.apply_change(connection, "rides_published", 1)
+
+
+@db.event.listens_for(publish_ride, "after_delete")
+def uncount_ride(mapper, connection, ride):
+    PlatformCounter.apply_change(connection, "rides_published", -1)
 
 
 # Table for save card
@@ -131,12 +499,43 @@ class SavedCard(db.Model):
 
     # Method to encrypt card number
     def set_card_number(self, card_number):
-        self.encrypted_card_number = cipher.encrypt(card_number.encode()).decode()
+        self.encrypted_card_number = card_cipher().encrypt(card_number.encode()).decode()
         self.last_four_digits = card_number[-4:]  # Store last 4 digits separately
 
     # Method to decrypt card number
     def get_card_number(self):
-        return cipher.decrypt(self.encrypted_card_number.encode()).decode()
+        return card_cipher().decrypt(self.encrypted_card_number.encode()).decode()
+
+    # Re-encrypt every card with the keyring's first key (`flask rotate-card-keys`)
+    # Cards are read batch_size at a time by id and each batch is committed, so memory and lock
+    # time stay flat. A card changed meanwhile is left alone (its new number already uses a current
+    # key); one that no key decrypts is counted as failed. Returns (rotated, failed).
+    @staticmethod
+    def rotate_keys(batch_size=500):
+        cipher = card_cipher()
+        table = SavedCard.__table__
+        rotated = failed = 0
+        last_id = 0
+        while True:
+            rows = db.session.query(SavedCard.id, SavedCard.encrypted_card_number).filter(
+                SavedCard.id > last_id
+            ).order_by(SavedCard.id).limit(batch_size).all()
+            if not rows:
+                return rotated, failed
+            for card_id, token in rows:
+                try:
+                    new_token = cipher.rotate(token.encode()).decode()
+                except InvalidToken:
+                    failed += 1
+                    continue
+                result = db.session.execute(
+                    table.update()
+                    .where(table.c.id == card_id, table.c.encrypted_card_number == token)
+                    .values(encrypted_card_number=new_token)
+                )
+                rotated += result.rowcount
+            db.session.commit()
+            last_id = rows[-1].id
 
 
 # Table for chat 
@@ -148,6 +547,39 @@ class ChatMessage(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     seen_by_receiver = db.Column(db.Boolean, default=False)
 
+    __table_args__ = (
+        db.Index('ix_chat_message_booking_timestamp', 'booking_id', 'timestamp'),
+    )
+
+    # SQL predicate: not seen by the receiver yet
+    @staticmethod
+    def unseen():
+        return db.or_(ChatMessage.seen_by_receiver == False, ChatMessage.seen_by_receiver.is_(None))
+
+    # SQL predicate: messages `user` received (sent by the other party of one of their bookings)
+    @staticmethod
+    def received_by(user):
+        user_bookings = db.select(book_ride.id).join(publish_ride, publish_ride.id == book_ride.ride_id).where(
+            db.or_(book_ride.user_id == user.id, publish_ride.driver_id == user.id)
+        )
+        return db.and_(ChatMessage.booking_id.in_(user_bookings), ChatMessage.sender_username != user.username)
+
+    # Mark the unread messages `user` received as seen, in one UPDATE, and lower their unread count
+    # Limited to `message_ids` and/or one booking if given; returns how many messages changed
+    @staticmethod
+    def mark_seen(user, message_ids=None, booking_id=None):
+        conditions = [ChatMessage.received_by(user), ChatMessage.unseen()]
+        if message_ids is not None:
+            conditions.append(ChatMessage.id.in_(message_ids))
+        if booking_id is not None:
+            conditions.append(ChatMessage.booking_id == booking_id)
+        result = db.session.execute(
+            db.update(ChatMessage).where(*conditions).values(seen_by_receiver=True)
+            .execution_options(synchronize_session=False)
+        )
+        UnreadMessageCount.apply_change(db.session.connection(), user.id, -result.rowcount)
+        return result.rowcount
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -156,6 +588,144 @@ class ChatMessage(db.Model):
             "timestamp": self.timestamp.strftime("%H:%M")
         }
 
+    # Item format of the chat history (get_messages) and the chat WebSocket
+    def to_chat_item(self):
+        return {
+            "type": "message",
+            "id": self.id,
+            "sender": self.sender_username,
+            "message": self.message,
+            "timestamp": self.timestamp.strftime('%Y-%m-%d %H:%M'),
+            "ts": self.timestamp.isoformat()  # exact time, for the since/before cursors
+        }
+
+
+# Table for each user's number of unread chat messages (check_new_messages)
+# Kept up to date when a message is sent (ChatMessage insert) and when messages are marked seen
+# (ChatMessage.mark_seen); `version` changes on every update and is used as the ETag
+class UnreadMessageCount(db.Model):
+    __tablename__ = 'unread_messages'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    # Add `delta` to a user's count, on the given connection
+    @staticmethod
+    def apply_change(connection, user_id, delta):
+        if not delta or user_id is None:
+            return
+        table = UnreadMessageCount.__table__
+        updated = connection.execute(
+            table.update()
+            .where(table.c.user_id == user_id)
+            .values(unread_count=table.c.unread_count + delta, version=table.c.version + 1)
+        )
+        if not updated.rowcount:
+            connection.execute(table.insert().values(user_id=user_id, unread_count=max(delta, 0), version=1))
+
+    # (unread count, version) for a user
+    @staticmethod
+    def get(user_id):
+        row = db.session.get(UnreadMessageCount, user_id)
+        return (row.unread_count, row.version) if row else (0, 0)
+
+    # Recompute every count from the chat_message table
+    @staticmethod
+    def rebuild():
+        passenger = db.aliased(User)
+        recipient = db.case(
+            (ChatMessage.sender_username == passenger.username, publish_ride.driver_id),
+            else_=book_ride.user_id
+        )
+        counts = db.session.query(recipient, func.count(ChatMessage.id)).select_from(ChatMessage).join(
+            book_ride, book_ride.id == ChatMessage.booking_id
+        ).join(publish_ride, publish_ride.id == book_ride.ride_id).join(
+            passenger, passenger.id == book_ride.user_id
+        ).filter(ChatMessage.unseen()).group_by(recipient).all()
+
+        # Bump versions past the old ones so cached ETags don't match the rebuilt counts
+        versions = dict(db.session.query(UnreadMessageCount.user_id, UnreadMessageCount.version).all())
+        UnreadMessageCount.query.delete()
+        db.session.add_all([
+            UnreadMessageCount(user_id=user_id, unread_count=count, version=versions.get(user_id, 0) + 1)
+            for user_id, count in counts
+        ])
+        db.session.commit()
+        return len(counts)
+
+
+# The participant of a booking who receives a message from `sender_username`
+def chat_recipient_id(connection, booking_id, sender_username):
+    row = connection.execute(
+        db.select(book_ride.user_id, publish_ride.driver_id, User.username)
+        .join(publish_ride, publish_ride.id == book_ride.ride_id)
+        .join(User, User.id == book_ride.user_id)
+        .where(book_ride.id == booking_id)
+    ).first()
+    if row is None:
+        return None
+    passenger_id, driver_id, passenger_username = row
+    return driver_id if sender_username == passenger_username else passenger_id
+
+
+@db.event.listens_for(ChatMessage, "after_insert")
+def count_unread_message(mapper, connection, message):
+    if not message.seen_by_receiver:
+        UnreadMessageCount.apply_change(
+            connection, chat_recipient_id(connection, message.booking_id, message.sender_username), 1
+        )
+
+
+# Table for outgoing emails (outbox), sent in the background by app/mailer.py
+# Rows are written in the same transaction as the booking / reset token they belong to
+class OutboundEmail(db.Model):
+    __tablename__ = 'outbound_email'
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipients = db.Column(db.Text, nullable=False)  # JSON list of addresses
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="pending")  # pending, sent, failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_outbound_email_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def get_recipients(self):
+        return json.loads(self.recipients)
+
+    def __repr__(self):
+        return f"<OutboundEmail {self.id} {self.status}: {self.subject}>"
+
+
+# Table for geofence arrivals recorded by app/geofence.py (driver or passenger reaching the pickup / drop-off point)
+# One row per participant and fence for each tracked ride date, kept for analytics
+class GeofenceArrival(db.Model):
+    __tablename__ = 'geofence_arrival'
+
+    id = db.Column(db.Integer, primary_key=True)
+    ride_id = db.Column(db.Integer, db.ForeignKey('publish_ride.id'), nullable=False)
+    ride_date = db.Column(db.String(10), nullable=False, default="")  # YYYY-MM-DD, '' for one-time rides
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    role = db.Column(db.String(20), nullable=False)   # driver or passenger
+    fence = db.Column(db.String(20), nullable=False)  # pickup or dropoff
+    distance = db.Column(db.Float, nullable=False)    # metres from the fence centre when the arrival was detected
+    arrived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('ride_id', 'ride_date', 'user_id', 'fence', name='uq_geofence_arrival'),
+        db.Index('ix_geofence_arrival_arrived_at', 'arrived_at'),
+    )
+
+    def __repr__(self):
+        return f"<GeofenceArrival ride {self.ride_id} {self.ride_date} user {self.user_id} at {self.fence}>"
+
 
 # Table for editing ride details
 class EditProposal(db.Model):
@@ -168,6 +738,70 @@ class EditProposal(db.Model):
     status = db.Column(db.String(20), default='pending')  # pending, accepted, rejected
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_edit_proposal_booking_timestamp', 'booking_id', 'timestamp'),
+    )
+
+    # Item format of the chat history (get_messages) and the chat WebSocket
+    def to_chat_item(self):
+        return {
+            "type": "proposal",
+            "id": self.id,
+            "sender": self.sender,
+            "pickup": self.proposed_pickup,
+            "time": self.proposed_time,
+            "cost": self.proposed_cost,
+            "status": self.status,
+            "timestamp": self.timestamp.strftime('%Y-%m-%d %H:%M'),
+            "ts": self.timestamp.isoformat()  # exact time, for the since/before cursors
+        }
+
+
+# Table for the cached pickup order of a ride on one date (computed by app/routing.py)
+# Rows are deleted in the same transaction as any change to the ride, its bookings or their
+# edit proposals, and recomputed the next time the driver opens the pickup page
+class PickupRoute(db.Model):
+    __tablename__ = 'pickup_route'
+
+    ride_id = db.Column(db.Integer, db.ForeignKey('publish_ride.id'), primary_key=True)
+    ride_date = db.Column(db.String(10), primary_key=True)  # YYYY-MM-DD
+    stops = db.Column(db.Text, nullable=False)  # JSON list of stops in pickup order
+    total_distance = db.Column(db.Float, nullable=False)  # metres from the origin, through every stop, to the destination
+    computed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def get_stops(self):
+        return json.loads(self.stops)
+
+    @staticmethod
+    def invalidate(connection, ride_id):
+        connection.execute(PickupRoute.__table__.delete().where(PickupRoute.ride_id == ride_id))
+
+    def __repr__(self):
+        return f"<PickupRoute ride {self.ride_id} on {self.ride_date}: {self.total_distance:.0f} m>"
+
+
+@db.event.listens_for(book_ride, "after_insert")
+@db.event.listens_for(book_ride, "after_update")
+@db.event.listens_for(book_ride, "after_delete")
+def invalidate_route_for_booking(mapper, connection, booking):
+    PickupRoute.invalidate(connection, booking.ride_id)
+
+
+@db.event.listens_for(publish_ride, "after_update")
+@db.event.listens_for(publish_ride, "after_delete")
+def invalidate_route_for_ride(mapper, connection, ride):
+    PickupRoute.invalidate(connection, ride.id)
+
+
+@db.event.listens_for(EditProposal, "after_insert")
+@db.event.listens_for(EditProposal, "after_update")
+def invalidate_route_for_proposal(mapper, connection, proposal):
+    ride_id = connection.execute(
+        db.select(book_ride.ride_id).where(book_ride.id == proposal.booking_id)
+    ).scalar()
+    if ride_id is not None:
+        PickupRoute.invalidate(connection, ride_id)
+
 
 # Table for rating
 class RideRating(db.Model):
@@ -183,6 +817,20 @@ class RideRating(db.Model):
     )
 
 
+# Table for geocoding results, keyed by normalized address (see app/geocoding.py)
+# lat/lon are NULL for addresses the geocoder could not find (negative cache)
+class GeocodeCacheEntry(db.Model):
+    __tablename__ = 'geocode_cache'
+
+    address_key = db.Column(db.String(255), primary_key=True)
+    lat = db.Column(db.Float, nullable=True)
+    lon = db.Column(db.Float, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<GeocodeCacheEntry {self.address_key}: {self.lat}, {self.lon}>"
+
+
 # Table for management view
 class PlatformSetting(db.Model):
     id = db.Column(db.Integer, primary_key=True)
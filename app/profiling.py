@@ -0,0 +1,146 @@
+import os
+import random
+import re
+import time
+import cProfile
+from collections import Counter
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+
+
+# Per-request profiling (PROFILING=1 in config.py / the environment)
+# Every SQL statement run while a request is handled is counted and timed through the engine's
+# cursor events. The response gets a Server-Timing header (shown per request in the browser's
+# network panel), and a request over PROFILING_SLOW_MS or PROFILING_MAX_QUERIES is logged with its
+# slowest and most repeated statements. PROFILING_SAMPLE_RATE of the requests are also run under
+# cProfile and their stats written to PROFILING_DIR (open them with `python -m pstats` or snakeviz).
+# When PROFILING is off nothing is registered, so requests and queries run exactly as before.
+
+STATEMENTS_KEPT = 500          # statements remembered per request for the slow request log
+STATEMENTS_LOGGED = 5          # slowest / most repeated statements shown in the log
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_time = 0.0
+        self.statements = []   # (seconds, statement), the first STATEMENTS_KEPT of the request
+        self.profiler = None
+
+    def record(self, statement, duration):
+        self.queries += 1
+        self.query_time += duration
+        if len(self.statements) < STATEMENTS_KEPT:
+            self.statements.append((duration, statement))
+
+
+def current_profile():
+    return g.get("request_profile") if has_request_context() else None
+
+
+# Engine events: the start time is kept on the connection, so nested and failed statements don't mix
+def before_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    if current_profile() is not None:
+        connection.info.setdefault("profile_query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(connection, cursor, statement, parameters, context, executemany):
+    profile = current_profile()
+    starts = connection.info.get("profile_query_start")
+    if profile is not None and starts:
+        profile.record(statement, time.perf_counter() - starts.pop())
+
+
+def handle_error(context):
+    starts = context.connection.info.get("profile_query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def start_request_profile():
+    profile = g.request_profile = RequestProfile()
+    if random.random() < current_app.config.get("PROFILING_SAMPLE_RATE", 0.0):
+        profile.profiler = cProfile.Profile()
+        try:
+            profile.profiler.enable()
+        except ValueError:
+            # Python 3.12+ allows one profiler at a time; another request's is running
+            profile.profiler = None
+
+
+def finish_request_profile(response):
+    profile = g.pop("request_profile", None)
+    if profile is None:
+        return response
+    if profile.profiler is not None:
+        profile.profiler.disable()
+    total = time.perf_counter() - profile.started
+
+    response.headers["Server-Timing"] = server_timing(profile, total)
+    config = profiling_config()
+    if total * 1000 > config["slow_ms"] or profile.queries > config["max_queries"]:
+        log_slow_request(profile, total, response)
+    if profile.profiler is not None:
+        dump_profile(profile.profiler, total)
+    return response
+
+
+def server_timing(profile, total):
+    return (
+        f'db;desc="{profile.queries} queries";dur={profile.query_time * 1000:.1f}, '
+        f"app;dur={(total - profile.query_time) * 1000:.1f}, "
+        f"total;dur={total * 1000:.1f}"
+    )
+
+
+def log_slow_request(profile, total, response):
+    lines = [
+        f"Slow request {request.method} {request.full_path.rstrip('?')} -> {response.status_code}: "
+        f"{total * 1000:.1f} ms, {profile.queries} queries in {profile.query_time * 1000:.1f} ms"
+    ]
+    for duration, statement in sorted(profile.statements, key=lambda item: item[0], reverse=True)[:STATEMENTS_LOGGED]:
+        lines.append(f"  {duration * 1000:8.1f} ms  {one_line(statement)}")
+    repeated = Counter(one_line(statement) for _, statement in profile.statements).most_common(STATEMENTS_LOGGED)
+    for statement, count in repeated:
+        if count > 1:
+            lines.append(f"  {count:>5} x     {statement}")
+    current_app.logger.warning("\n".join(lines))
+
+
+def one_line(statement):
+    return re.sub(r"\s+", " ", statement).strip()
+
+
+def dump_profile(profiler, total):
+    config = profiling_config()
+    os.makedirs(config["dir"], exist_ok=True)
+    name = re.sub(r"[^A-Za-z0-9_.-]+", "_", request.endpoint or request.path).strip("_") or "root"
+    path = os.path.join(config["dir"], f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{name}-{total * 1000:.0f}ms.prof")
+    profiler.dump_stats(path)
+
+
+def profiling_config():
+    config = current_app.config
+    return {
+        "slow_ms": config.get("PROFILING_SLOW_MS", 500),
+        "max_queries": config.get("PROFILING_MAX_QUERIES", 30),
+        "dir": config.get("PROFILING_DIR") or os.path.join(current_app.instance_path, "profiles"),
+    }
+
+
+# Register the request hooks and the engine events, only when PROFILING is on
+# Called first in create_app, so the request clock starts before the other before_request hooks
+def init_app(app):
+    if not app.config.get("PROFILING"):
+        return
+    from app import db
+    with app.app_context():
+        engine = db.engine
+    for name, listener in (("before_cursor_execute", before_cursor_execute),
+                           ("after_cursor_execute", after_cursor_execute),
+                           ("handle_error", handle_error)):
+        if not event.contains(engine, name, listener):
+            event.listen(engine, name, listener)
+    app.before_request(start_request_profile)
+    app.after_request(finish_request_profile)
@@ -0,0 +1,68 @@
+import timeit
+import numpy as np
+from app.utils import config_value
+
+
+# Driver-to-passenger distances for the pickup tracking pages
+# All passengers of a ride are measured in one vectorized haversine call. The sphere differs
+# from the WGS-84 ellipsoid by at most ~0.5%, so only the distances that close to the nearby
+# radius (where the flag could flip) are recomputed with geopy's geodesic.
+EARTH_RADIUS = 6371008.8   # metres, mean radius
+SPHERE_ERROR = 0.0056      # worst-case relative error of the haversine distance
+
+
+# Great-circle distances in metres from origin (lat, lon) to every row of points ((n, 2) degrees)
+def haversine_many(origin, points):
+    points = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    lat1, lon1 = np.radians(origin[0]), np.radians(origin[1])
+    lat2, lon2 = points[:, 0], points[:, 1]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+# {username: {"distance": metres, "eta": seconds, "nearby": bool}} for every passenger with a position
+# passengers is {username: (lat, lon)}; nothing is returned without a driver position
+def proximity(driver, passengers, radius=None, speed_kmh=None):
+    radius = config_value("PROXIMITY_RADIUS", 100) if radius is None else radius
+    speed_kmh = config_value("PICKUP_SPEED_KMH", 30) if speed_kmh is None else speed_kmh
+    located = [(username, loc) for username, loc in passengers.items() if loc]
+    if not driver or not located:
+        return {}
+
+    coords = np.asarray([loc for _, loc in located], dtype=float)
+    distances = haversine_many(driver, coords)
+    for index in np.flatnonzero(np.abs(distances - radius) <= radius * SPHERE_ERROR):
+        from geopy.distance import geodesic  # geopy is only loaded once a passenger is this close to the radius
+        distances[index] = geodesic(tuple(coords[index]), driver).meters
+    etas = distances / (speed_kmh / 3.6)
+
+    return {
+        username: {"distance": round(float(distance), 1), "eta": int(round(eta)), "nearby": bool(distance <= radius)}
+        for (username, _), distance, eta in zip(located, distances, etas)
+    }
+
+
+# Usernames of the passengers within the nearby radius of the driver
+def passengers_nearby(driver, passengers, radius=None):
+    return [username for username, result in proximity(driver, passengers, radius).items() if result["nearby"]]
+
+
+# The per-passenger geopy loop this module replaces, kept for comparison
+def geodesic_nearby(driver, passengers, radius=100):
+    from geopy.distance import geodesic
+    return [username for username, loc in passengers.items() if loc and geodesic(loc, driver).meters <= radius]
+
+
+# Microbenchmark: seconds per call of the geopy loop and of proximity() for each passenger count
+# Passengers are scattered within ~2 km of the driver, so a few fall inside the radius
+def benchmark(counts=(1, 4, 16, 64, 256, 1024), repeats=20, seed=0):
+    rng = np.random.default_rng(seed)
+    driver = (53.8008, -1.5491)
+    results = []
+    for count in counts:
+        offsets = rng.normal(scale=0.006, size=(count, 2))
+        passengers = {f"passenger_{i}": (driver[0] + dlat, driver[1] + dlon) for i, (dlat, dlon) in enumerate(offsets)}
+        loop = timeit.timeit(lambda: geodesic_nearby(driver, passengers), number=repeats) / repeats
+        batched = timeit.timeit(lambda: passengers_nearby(driver, passengers), number=repeats) / repeats
+        results.append((count, loop, batched))
+    return results
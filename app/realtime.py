@@ -0,0 +1,200 @@
+from datetime import datetime
+from flask import session
+from flask_login import current_user
+from flask_socketio import join_room, leave_room
+from app import socketio
+from app.models import book_ride, publish_ride
+from app.location_store import location_store, location_ride_key
+from app.proximity import proximity
+from app.geofence import geofence_engine, ensure_ride_fences, record_arrivals
+
+
+# Room names: one per booking chat, one per user (new-message notifications on any page)
+# and one per tracked ride (ride_date is None for one-time rides)
+def chat_room(booking_id):
+    return f"booking:{booking_id}"
+
+
+def tracking_room(ride_id, ride_date):
+    return f"ride:{ride_id}:{ride_date or ''}"
+
+
+def user_room(user_id):
+    return f"user:{user_id}"
+
+
+# Only the passenger and the driver of a booking may join its chat
+def can_join_chat(booking_id):
+    booking = book_ride.query.get(booking_id)
+    return booking is not None and current_user.id in [booking.user_id, booking.ride.driver_id]
+
+
+@socketio.on("connect")
+def connect(auth=None):
+    if not current_user.is_authenticated:
+        return False  # rejects the connection
+    join_room(user_room(current_user.id))
+
+
+@socketio.on("join_chat")
+def join_chat(data):
+    try:
+        booking_id = int((data or {}).get("booking_id"))
+    except (TypeError, ValueError):
+        return {"success": False, "error": "Invalid booking"}
+    if not can_join_chat(booking_id):
+        return {"success": False, "error": "Unauthorized"}
+    join_room(chat_room(booking_id))
+    return {"success": True}
+
+
+@socketio.on("leave_chat")
+def leave_chat(data):
+    try:
+        leave_room(chat_room(int((data or {}).get("booking_id"))))
+    except (TypeError, ValueError):
+        pass
+
+
+# Push a chat history item (ChatMessage / EditProposal .to_chat_item()) to the booking's chat room
+# New items and updates (e.g. an accepted proposal) use the same event; clients replace by type and id
+def push_chat_item(booking, item):
+    socketio.emit("chat_item", item, to=chat_room(booking.id))
+
+
+# Tell the receiver of a message about it, wherever they are on the site
+def notify_new_message(user_id, message):
+    socketio.emit("new_message", {
+        "sender": message.sender_username,
+        "booking_id": message.booking_id,
+        "message_id": message.id
+    }, to=user_room(user_id))
+
+
+# Live tracking: the driver and the passengers of a ride (on one date for commuting rides)
+# join its room, send their positions with "location_update" and receive "location" deltas
+# and "ride_status" changes, instead of polling the HTTP endpoints
+def tracking_role(ride, ride_date):
+    if ride is None:
+        return None
+    ride_id = ride.id
+    if ride.driver_id == current_user.id:
+        return "driver"
+    bookings = book_ride.query.filter(book_ride.ride_id == ride_id, book_ride.user_id == current_user.id,
+                                      book_ride.status != "Canceled")
+    if ride.category == "commuting":
+        try:
+            day = datetime.strptime(ride_date or "", "%Y-%m-%d").date()
+        except ValueError:
+            return None
+        bookings = bookings.filter(book_ride.on_date(day))
+    return "passenger" if bookings.first() else None
+
+
+# Nearby flag and per-passenger distance / ETA for the ride, as in the HTTP live location endpoints
+def ride_proximity(ride_key):
+    driver, passengers = location_store.get_ride(*ride_key)
+    distances = proximity(driver, passengers)
+    return driver, passengers, {"nearby": any(result["nearby"] for result in distances.values()), "proximity": distances}
+
+
+def tracking_snapshot(ride_key):
+    driver, passengers, summary = ride_proximity(ride_key)
+    return dict(summary, driver=driver, passenger=passengers)
+
+
+@socketio.on("join_tracking")
+def join_tracking(data):
+    data = data or {}
+    try:
+        ride_key = location_ride_key(data.get("ride_id"), data.get("ride_date"))
+    except (TypeError, ValueError):
+        return {"success": False, "error": "Invalid ride"}
+    ride = publish_ride.query.get(ride_key[0])
+    role = tracking_role(ride, ride_key[1])
+    if role is None:
+        return {"success": False, "error": "Unauthorized"}
+    ensure_ride_fences(ride_key, ride)
+    room = tracking_room(*ride_key)
+    # The role is kept in the socket's session; a passenger's is checked again on each update (see location_update)
+    session.setdefault("tracking", {})[room] = role
+    join_room(room)
+    return dict(tracking_snapshot(ride_key), success=True, role=role)
+
+
+@socketio.on("leave_tracking")
+def leave_tracking(data):
+    data = data or {}
+    try:
+        room = tracking_room(*location_ride_key(data.get("ride_id"), data.get("ride_date")))
+    except (TypeError, ValueError):
+        return
+    session.get("tracking", {}).pop(room, None)
+    leave_room(room)
+
+
+@socketio.on("location_update")
+def location_update(data):
+    data = data or {}
+    try:
+        ride_key = location_ride_key(data.get("ride_id"), data.get("ride_date"))
+        lat, lon = float(data["latitude"]), float(data["longitude"])
+    except (KeyError, TypeError, ValueError):
+        return {"success": False, "error": "Invalid data"}
+    room = tracking_room(*ride_key)
+    role = session.get("tracking", {}).get(room)
+    if role is None:
+        return {"success": False, "error": "Join the ride first"}
+    # A passenger can cancel (possibly on another server process) while the socket stays open
+    if role == "passenger" and tracking_role(publish_ride.query.get(ride_key[0]), ride_key[1]) is None:
+        session["tracking"].pop(room, None)
+        leave_room(room)
+        return {"success": False, "error": "Unauthorized"}
+
+    if role == "driver":
+        location_store.set_driver(*ride_key, lat, lon)
+        push_location(ride_key, {"driver": [lat, lon]})
+    else:
+        location_store.set_passenger(*ride_key, current_user.id, current_user.username, lat, lon)
+        push_location(ride_key, {"passenger": {current_user.username: [lat, lon]}})
+    check_geofences(ride_key, role, lat, lon)
+    return {"success": True}
+
+
+# Take a user's sockets out of a ride's tracking room, e.g. when they cancel their booking for that date
+# Only sockets connected to this process are found; the others are taken out at their next location_update
+def remove_from_tracking(user_id, ride_id, ride_date):
+    rooms = {tracking_room(ride_id, None), tracking_room(ride_id, ride_date)}  # one-time rides are joined either way
+    for sid, _ in list(socketio.server.manager.get_participants("/", user_room(user_id))):
+        for room in rooms:
+            socketio.server.leave_room(sid, room, namespace="/")
+
+
+# Send one participant's new position (and the ride's nearby flag and distances) to everyone tracking the ride
+def push_location(ride_key, update):
+    update.update(ride_proximity(ride_key)[2])
+    socketio.emit("location", update, to=tracking_room(*ride_key))
+
+
+# start_journey / finish_journey: tell everyone tracking the ride that its status changed
+def push_ride_status(ride_key, status):
+    socketio.emit("ride_status", {"status": status}, to=tracking_room(*ride_key))
+
+
+# Check the current user's new position against the ride's pickup / drop-off fences
+# Transitions are pushed to the ride's room as "geofence" events and arrivals are recorded
+def check_geofences(ride_key, role, lat, lon):
+    ensure_ride_fences(ride_key)
+    events = geofence_engine.update(ride_key, current_user.id, float(lat), float(lon))
+    if not events:
+        return events
+    record_arrivals(ride_key, current_user.id, role, events)
+    for fence, state, distance in events:
+        socketio.emit("geofence", {
+            "fence": fence.name,
+            "event": state,
+            "role": role,
+            "username": current_user.username,
+            "distance": round(distance, 1)
+        }, to=tracking_room(*ride_key))
+    return events
@@ -0,0 +1,179 @@
+import json
+import numpy as np
+from datetime import datetime
+from sqlalchemy import not_
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models import User, book_ride, EditProposal, PickupRoute
+from app.geocoding import geocode
+from app.proximity import EARTH_RADIUS
+from app.utils import config_value
+
+
+# Pickup order for the passengers of a commuting ride on one date
+# The driver starts at the ride's origin, picks every passenger up at their pickup point (the
+# ride's origin, or the pickup of their latest accepted edit proposal) and ends at the
+# destination. Up to ROUTE_EXACT_LIMIT stops the shortest order is found exactly (Held-Karp);
+# above that a nearest-neighbour tour is improved with 2-opt. Orders are cached in the
+# pickup_route table until the ride, a booking or a proposal changes (see app/models.py).
+
+
+# Great-circle distances in metres between every pair of points ((n, 2) degrees -> (n, n))
+def haversine_matrix(points):
+    points = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    lat, lon = points[:, 0:1], points[:, 1:2]
+    a = np.sin((lat.T - lat) / 2) ** 2 + np.cos(lat) * np.cos(lat.T) * np.sin((lon.T - lon) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+# Distances between start (node 0), the stops (1..n) and end (n + 1)
+# A missing start or end is free to reach, which leaves that end of the path open
+def route_matrix(start, stops, end):
+    points = [start or stops[0]] + list(stops) + [end or stops[-1]]
+    distances = haversine_matrix(points)
+    if start is None:
+        distances[0, :] = distances[:, 0] = 0
+    if end is None:
+        distances[-1, :] = distances[:, -1] = 0
+    return distances.tolist()
+
+
+def path_length(distances, path):
+    return sum(distances[a][b] for a, b in zip(path, path[1:]))
+
+
+# Shortest start -> every stop -> end path by dynamic programming over subsets, O(n^2 2^n)
+def exact_order(distances, n):
+    end = n + 1
+    inf = float("inf")
+    cost = [[inf] * n for _ in range(1 << n)]
+    parent = [[-1] * n for _ in range(1 << n)]
+    for j in range(n):
+        cost[1 << j][j] = distances[0][j + 1]
+
+    for mask in range(1, 1 << n):
+        row = cost[mask]
+        for j in range(n):
+            if row[j] == inf:
+                continue
+            from_j = distances[j + 1]
+            for k in range(n):
+                if mask & (1 << k):
+                    continue
+                candidate = row[j] + from_j[k + 1]
+                if candidate < cost[mask | (1 << k)][k]:
+                    cost[mask | (1 << k)][k] = candidate
+                    parent[mask | (1 << k)][k] = j
+
+    mask = (1 << n) - 1
+    last = min(range(n), key=lambda j: cost[mask][j] + distances[j + 1][end])
+    order = []
+    while last != -1:
+        order.append(last + 1)
+        last, mask = parent[mask][last], mask & ~(1 << last)
+    return order[::-1]
+
+
+# Nearest-neighbour path, then 2-opt segment reversals until none shortens it (start and end stay fixed)
+def heuristic_order(distances, n):
+    remaining = set(range(1, n + 1))
+    path = [0]
+    while remaining:
+        nearest = min(remaining, key=lambda stop: distances[path[-1]][stop])
+        path.append(nearest)
+        remaining.remove(nearest)
+    path.append(n + 1)
+
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n):
+            for k in range(i + 1, n + 1):
+                a, b, c, d = path[i - 1], path[i], path[k], path[k + 1]
+                if distances[a][c] + distances[b][d] < distances[a][b] + distances[c][d] - 1e-9:
+                    path[i:k + 1] = reversed(path[i:k + 1])
+                    improved = True
+    return path[1:-1]
+
+
+# Best order of the stops ((lat, lon) each) as indexes into stops, and its length in metres
+def optimize_order(start, stops, end=None, exact_limit=None):
+    exact_limit = config_value("ROUTE_EXACT_LIMIT", 8) if exact_limit is None else exact_limit
+    n = len(stops)
+    if n == 0:
+        return [], 0.0
+    distances = route_matrix(start, stops, end)
+    order = exact_order(distances, n) if n <= exact_limit else heuristic_order(distances, n)
+    return [stop - 1 for stop in order], path_length(distances, [0] + order + [n + 1])
+
+
+def ride_point(lat, lon, address):
+    if lat is not None and lon is not None:
+        return lat, lon
+    lat, lon = geocode(address)
+    return (lat, lon) if lat is not None and lon is not None else None
+
+
+# The passengers booked on the date and where each of them is picked up
+def pickup_stops(ride, ride_date):
+    day = datetime.strptime(ride_date, "%Y-%m-%d").date()
+    bookings = db.session.query(book_ride.id, User.username).join(User, User.id == book_ride.user_id).filter(
+        book_ride.ride_id == ride.id,
+        book_ride.on_date(day),
+        not_(book_ride.status == "Canceled")
+    ).order_by(book_ride.id).all()
+
+    # Latest accepted pickup change per booking
+    pickups = {}
+    if bookings:
+        proposals = EditProposal.query.filter(
+            EditProposal.booking_id.in_([booking_id for booking_id, _ in bookings]),
+            EditProposal.status == "accepted",
+            EditProposal.proposed_pickup.isnot(None)
+        ).order_by(EditProposal.timestamp).all()
+        pickups = {proposal.booking_id: proposal.proposed_pickup for proposal in proposals}
+
+    origin = ride_point(ride.from_lat, ride.from_lon, ride.from_location)
+    stops = []
+    for booking_id, username in bookings:
+        if booking_id in pickups:
+            pickup, point = pickups[booking_id], ride_point(None, None, pickups[booking_id])
+        else:
+            pickup, point = ride.from_location, origin
+        stops.append({"username": username, "pickup": pickup, "point": point})
+    return origin, stops
+
+
+# Compute the pickup order for the ride on ride_date ("YYYY-MM-DD")
+# Stops whose pickup can't be located come last, in booking order
+def compute_pickup_route(ride, ride_date):
+    origin, stops = pickup_stops(ride, ride_date)
+    destination = ride_point(ride.to_lat, ride.to_lon, ride.to_location)
+    located = [stop for stop in stops if stop["point"]]
+    order, total = optimize_order(origin, [stop["point"] for stop in located], destination)
+
+    route = []
+    previous = origin
+    for stop in [located[index] for index in order] + [stop for stop in stops if not stop["point"]]:
+        point = stop["point"]
+        leg = None
+        if point and previous:
+            leg = round(float(haversine_matrix([previous, point])[0, 1]), 1)
+        route.append({"username": stop["username"], "pickup": stop["pickup"],
+                      "lat": point[0] if point else None, "lon": point[1] if point else None, "leg": leg})
+        previous = point or previous
+    return route, round(total, 1)
+
+
+# Cached pickup order: {"stops": [...], "total_distance": metres}
+def get_pickup_route(ride, ride_date):
+    cached = db.session.get(PickupRoute, (ride.id, ride_date))
+    if cached is None:
+        stops, total = compute_pickup_route(ride, ride_date)
+        cached = PickupRoute(ride_id=ride.id, ride_date=ride_date, stops=json.dumps(stops), total_distance=total)
+        try:
+            db.session.add(cached)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # computed by another request at the same time
+    return {"stops": cached.get_stops(), "total_distance": cached.total_distance}
@@ -0,0 +1,232 @@
+import re
+import math
+from sqlalchemy import text
+from app import db
+from app.models import publish_ride
+
+
+# Full-text index over publish_ride.from_location / to_location (SQLite FTS5)
+# The index rowid is the ride id; prefix indexes keep typeahead queries cheap
+LOCATION_INDEX = "ride_location_fts"
+
+# Number of typeahead suggestions returned for the search banner
+SUGGESTION_LIMIT = 8
+
+# Spatial index over ride (origin, destination) pairs (SQLite R*Tree, 4 dimensions)
+# Each ride is a point (from_lat, from_lon, to_lat, to_lon), so one box query
+# matches origin and destination radius at the same time
+ROUTE_INDEX = "ride_route_rtree"
+
+# Metres per degree of latitude, used to turn a radius into a bounding box
+METRES_PER_DEGREE = 111320.0
+
+
+def location_index_supported(bind):
+    return bind.dialect.name == "sqlite"
+
+
+# Create the FTS table together with the other tables (db.create_all)
+@db.event.listens_for(db.metadata, "after_create")
+def create_location_index(target, connection, **kw):
+    if not location_index_supported(connection):
+        return
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {LOCATION_INDEX} "
+        "USING fts5(from_location, to_location, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+    ))
+
+
+@db.event.listens_for(db.metadata, "after_create")
+def create_route_index(target, connection, **kw):
+    if not location_index_supported(connection):
+        return
+    connection.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {ROUTE_INDEX} USING rtree("
+        "id, min_from_lat, max_from_lat, min_from_lon, max_from_lon, "
+        "min_to_lat, max_to_lat, min_to_lon, max_to_lon)"
+    ))
+
+
+@db.event.listens_for(db.metadata, "before_drop")
+def drop_location_index(target, connection, **kw):
+    if location_index_supported(connection):
+        connection.execute(text(f"DROP TABLE IF EXISTS {LOCATION_INDEX}"))
+        connection.execute(text(f"DROP TABLE IF EXISTS {ROUTE_INDEX}"))
+
+
+# Keep the index in step with publish_ride (same transaction as the ride write)
+@db.event.listens_for(publish_ride, "after_insert")
+def index_ride_locations(mapper, connection, ride):
+    if location_index_supported(connection):
+        connection.execute(
+            text(f"INSERT INTO {LOCATION_INDEX} (rowid, from_location, to_location) VALUES (:id, :from_location, :to_location)"),
+            {"id": ride.id, "from_location": ride.from_location, "to_location": ride.to_location}
+        )
+
+
+@db.event.listens_for(publish_ride, "after_insert")
+def index_ride_route(mapper, connection, ride):
+    coordinates = (ride.from_lat, ride.from_lon, ride.to_lat, ride.to_lon)
+    if None in coordinates or not location_index_supported(connection):
+        return
+    connection.execute(
+        text(f"INSERT OR REPLACE INTO {ROUTE_INDEX} VALUES "
+             "(:id, :from_lat, :from_lat, :from_lon, :from_lon, :to_lat, :to_lat, :to_lon, :to_lon)"),
+        {"id": ride.id, "from_lat": ride.from_lat, "from_lon": ride.from_lon,
+         "to_lat": ride.to_lat, "to_lon": ride.to_lon}
+    )
+
+
+@db.event.listens_for(publish_ride, "after_update")
+def reindex_ride_locations(mapper, connection, ride):
+    if not location_index_supported(connection):
+        return
+    state = db.inspect(ride)
+
+    if state.attrs.from_location.history.has_changes() or state.attrs.to_location.history.has_changes():
+        connection.execute(text(f"DELETE FROM {LOCATION_INDEX} WHERE rowid = :id"), {"id": ride.id})
+        index_ride_locations(mapper, connection, ride)
+
+    if any(state.attrs[name].history.has_changes() for name in ("from_lat", "from_lon", "to_lat", "to_lon")):
+        connection.execute(text(f"DELETE FROM {ROUTE_INDEX} WHERE id = :id"), {"id": ride.id})
+        index_ride_route(mapper, connection, ride)
+
+
+@db.event.listens_for(publish_ride, "after_delete")
+def unindex_ride_locations(mapper, connection, ride):
+    if location_index_supported(connection):
+        connection.execute(text(f"DELETE FROM {LOCATION_INDEX} WHERE rowid = :id"), {"id": ride.id})
+        connection.execute(text(f"DELETE FROM {ROUTE_INDEX} WHERE id = :id"), {"id": ride.id})
+
+
+# Rebuild the location and route indexes from publish_ride (existing databases, or after a bulk import)
+def rebuild_location_index():
+    connection = db.session.connection()
+    create_location_index(None, connection)
+    create_route_index(None, connection)
+    connection.execute(text(f"DELETE FROM {LOCATION_INDEX}"))
+    connection.execute(text(
+        f"INSERT INTO {LOCATION_INDEX} (rowid, from_location, to_location) "
+        "SELECT id, from_location, to_location FROM publish_ride"
+    ))
+    connection.execute(text(f"DELETE FROM {ROUTE_INDEX}"))
+    connection.execute(text(
+        f"INSERT INTO {ROUTE_INDEX} "
+        "SELECT id, from_lat, from_lat, from_lon, from_lon, to_lat, to_lat, to_lon, to_lon FROM publish_ride "
+        "WHERE from_lat IS NOT NULL AND from_lon IS NOT NULL AND to_lat IS NOT NULL AND to_lon IS NOT NULL"
+    ))
+    db.session.commit()
+
+
+# Turn user input into an FTS5 prefix query on one column: "leeds st" -> from_location : ("leeds"* "st"*)
+def build_match(column, search_text):
+    terms = re.findall(r"\w+", search_text.lower())
+    if not terms:
+        return None
+    return f"{column} : (" + " ".join(f'"{term}"*' for term in terms) + ")"
+
+
+# Ride ids matching the from/to text, best match first (bm25 rank)
+# Returns None when the database has no location index, so callers can fall back to ILIKE
+def search_ride_ids(from_text="", to_text="", limit=None):
+    if not location_index_supported(db.session.get_bind()):
+        return None
+
+    clauses = [clause for clause in (
+        build_match("from_location", from_text) if from_text else None,
+        build_match("to_location", to_text) if to_text else None
+    ) if clause]
+    if not clauses:
+        return None
+
+    sql = f"SELECT rowid FROM {LOCATION_INDEX} WHERE {LOCATION_INDEX} MATCH :match ORDER BY rank"
+    params = {"match": " AND ".join(clauses)}
+    if limit:
+        sql += " LIMIT :limit"
+        params["limit"] = limit
+    return [row[0] for row in db.session.execute(text(sql), params)]
+
+
+# Distinct published locations matching the typed words, for the search banner typeahead
+def suggest_locations(search_text, field="from", limit=SUGGESTION_LIMIT):
+    column = publish_ride.to_location if field == "to" else publish_ride.from_location
+    if field == "to":
+        ride_ids = search_ride_ids(to_text=search_text, limit=limit * 5)
+    else:
+        ride_ids = search_ride_ids(from_text=search_text, limit=limit * 5)
+
+    # No index on this database: plain prefix match
+    if ride_ids is None:
+        rows = db.session.query(column).filter(column.ilike(f"{search_text}%")).distinct().limit(limit).all()
+        return [location for (location,) in rows]
+
+    locations = dict(db.session.query(publish_ride.id, column).filter(publish_ride.id.in_(ride_ids)).all())
+    suggestions = []
+    for ride_id in ride_ids:  # keep the rank order
+        location = locations.get(ride_id)
+        if location and location not in suggestions:
+            suggestions.append(location)
+            if len(suggestions) == limit:
+                break
+    return suggestions
+
+
+# Bounding box (min_lat, max_lat, min_lon, max_lon) around a point, at least radius_m wide on each side
+def bounding_box(lat, lon, radius_m):
+    lat_delta = radius_m / METRES_PER_DEGREE
+    lon_delta = radius_m / (METRES_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+    return lat - lat_delta, lat + lat_delta, lon - lon_delta, lon + lon_delta
+
+
+# Ids of rides whose origin and destination fall inside the boxes around from_point / to_point
+def nearby_ride_candidates(from_point, to_point, radius_m):
+    from_box = bounding_box(from_point[0], from_point[1], radius_m)
+    to_box = bounding_box(to_point[0], to_point[1], radius_m)
+
+    if location_index_supported(db.session.get_bind()):
+        rows = db.session.execute(text(
+            f"SELECT id FROM {ROUTE_INDEX} "
+            "WHERE max_from_lat >= :from_min_lat AND min_from_lat <= :from_max_lat "
+            "AND max_from_lon >= :from_min_lon AND min_from_lon <= :from_max_lon "
+            "AND max_to_lat >= :to_min_lat AND min_to_lat <= :to_max_lat "
+            "AND max_to_lon >= :to_min_lon AND min_to_lon <= :to_max_lon"
+        ), {
+            "from_min_lat": from_box[0], "from_max_lat": from_box[1],
+            "from_min_lon": from_box[2], "from_max_lon": from_box[3],
+            "to_min_lat": to_box[0], "to_max_lat": to_box[1],
+            "to_min_lon": to_box[2], "to_max_lon": to_box[3]
+        })
+        return [row[0] for row in rows]
+
+    # No R*Tree on this database: the same boxes as plain column ranges
+    rows = db.session.query(publish_ride.id).filter(
+        publish_ride.from_lat.between(from_box[0], from_box[1]),
+        publish_ride.from_lon.between(from_box[2], from_box[3]),
+        publish_ride.to_lat.between(to_box[0], to_box[1]),
+        publish_ride.to_lon.between(to_box[2], to_box[3])
+    )
+    return [ride_id for (ride_id,) in rows]
+
+
+# Rides starting within radius_m of from_point and ending within radius_m of to_point,
+# as [(ride, pickup_m, dropoff_m)] with the smallest combined detour first
+# The index only shortlists candidates; geodesic distances are computed for the shortlist only
+def search_nearby_rides(from_point, to_point, radius_m, query_filters=()):
+    from geopy.distance import geodesic
+    candidate_ids = nearby_ride_candidates(from_point, to_point, radius_m)
+    if not candidate_ids:
+        return []
+
+    matches = []
+    for ride in publish_ride.query.filter(publish_ride.id.in_(candidate_ids), *query_filters).all():
+        pickup_m = geodesic(from_point, (ride.from_lat, ride.from_lon)).meters
+        if pickup_m > radius_m:
+            continue
+        dropoff_m = geodesic(to_point, (ride.to_lat, ride.to_lon)).meters
+        if dropoff_m > radius_m:
+            continue
+        matches.append((ride, pickup_m, dropoff_m))
+
+    matches.sort(key=lambda match: match[1] + match[2])
+    return matches
@@ -0,0 +1,101 @@
+from datetime import datetime
+from app import db
+from app.models import User, publish_ride, book_ride, Payment, SavedCard, ChatMessage, EditProposal, RideRating
+
+
+# Demo data for a new database (`flask seed-demo-data`, after `flask db upgrade`)
+# A manager, a driver with a commuting and a one-time ride around Leeds, and a passenger with
+# bookings, payments, a rating, a chat and two accepted edit proposals on them.
+# Rows go in through the models, so the seat inventory, search index, dashboard counters,
+# earnings and unread counts are filled in by the usual events.
+
+# Passwords are kept as the hashes the demo accounts were created with
+USERS = [
+    {"username": "Manager", "email": "manager@gmail.com", "is_manager": True,
+     "password_hash": "pbkdf2:sha256:1000000$HzDgHnWjxMbJ94iW$cc012b8b8aace01905ed4a7e4814970729f9918144a56a83c8536ac1f759f959"},
+    {"username": "Sinjini-driver", "email": "sinjini.brampton@gmail.com", "is_manager": False,
+     "password_hash": "pbkdf2:sha256:1000000$wL6e6VL9zGKcyPOS$3036a2ee232cb0e923827da4a783abb2396941495dbc000c4e47ebefe9a497ce"},
+    {"username": "Sreeja-passenger", "email": "sreeja@gmail.com", "is_manager": False,
+     "password_hash": "pbkdf2:sha256:1000000$j9MQ9dTQsW6NQWE1$4eec162ae16c0ef3ef52b68688f4b16157220d3ed137c8a5e35de4374bdfff9a"},
+]
+
+DEMO_CARD_NUMBER = "4000000000001234"
+
+
+def at(text):
+    return datetime.strptime(text, "%Y-%m-%d %H:%M:%S")
+
+
+# Add the demo rows in one transaction; returns False (and adds nothing) when there are users already
+def seed_demo_data():
+    if User.query.first() is not None:
+        return False
+
+    manager, driver, passenger = [User(is_active=True, **user) for user in USERS]
+    db.session.add_all([manager, driver, passenger])
+    db.session.flush()
+
+    commute = publish_ride(
+        driver_id=driver.id, driver_name=driver.username, category="commuting", price_per_seat=20.0,
+        from_location="Central Village Block D, Inner Ring Road, Leeds, LS2 3AE, United Kingdom",
+        to_location="Edward Boyle Library, Beech Grove Plaza, Leeds, LS2 9JT, United Kingdom",
+        available_seats_per_date={"2025-04-28": 3, "2025-04-29": 3, "2025-04-30": 3},
+        recurrence_dates="2025-04-28, 2025-04-29, 2025-04-30", commute_times="10:00"
+    )
+    one_time = publish_ride(
+        driver_id=driver.id, driver_name=driver.username, category="one-time", price_per_seat=10.0,
+        from_location="Beech Grove Plaza, Leeds, LS2 9JT, United Kingdom",
+        to_location="Laidlaw Library, Leeds, LS2 9HJ, United Kingdom",
+        date_time=at("2025-04-29 11:00:00"), available_seats_per_date={"2025-04-29": 4}
+    )
+    db.session.add_all([commute, one_time])
+    db.session.flush()
+
+    canceled = book_ride(user_id=passenger.id, ride_id=one_time.id, status="Canceled", total_price=10.0,
+                         seats_selected=1, confirmation_email=passenger.email, ride_date=at("2025-04-29 11:00:00"),
+                         cancellation_timestamp=at("2025-04-28 01:32:03"))
+    commute_bookings = [
+        book_ride(user_id=passenger.id, ride_id=commute.id, status=status, total_price=60.0, seats_selected=1,
+                  confirmation_email=driver.email, ride_date=at(f"{day} 10:00:00"))
+        for day, status in [("2025-04-28", "done"), ("2025-04-29", "Booked"), ("2025-04-30", "Booked")]
+    ]
+    db.session.add_all([canceled] + commute_bookings)
+    db.session.flush()
+
+    paid_at = at("2025-04-28 01:33:34")
+    db.session.add(Payment(user_id=passenger.id, ride_id=one_time.id, book_ride_id=canceled.id, amount=10.0,
+                           platform_fee=0.005, status="Refunded", timestamp=at("2025-04-28 01:31:22"), refunded=True))
+    db.session.add_all([
+        Payment(user_id=passenger.id, ride_id=commute.id, book_ride_id=booking.id, amount=amount,
+                platform_fee=0.005, status="Success", timestamp=paid_at, refunded=False)
+        for booking, amount in zip(commute_bookings, [20.0, 10.0, 20.0])
+    ])
+
+    card = SavedCard(user_id=passenger.id, expiry_date="11/25", cardholder_name="Sreeja", is_default=False)
+    card.set_card_number(DEMO_CARD_NUMBER)
+    db.session.add(card)
+    db.session.add(RideRating(ride_id=commute.id, passenger_id=passenger.id, rating=5,
+                              timestamp=at("2025-04-28 00:34:55"), ride_date=at("2025-04-28 00:00:00").date()))
+
+    chat_booking = commute_bookings[1]
+    db.session.add_all([
+        ChatMessage(booking_id=chat_booking.id, sender_username=sender, message=message,
+                    timestamp=at(timestamp), seen_by_receiver=True)
+        for sender, message, timestamp in [
+            (driver.username, "hi", "2025-04-28 04:32:58"),
+            (driver.username, "i want to change the location is it possible?", "2025-04-28 04:34:56"),
+            (driver.username, "thank you", "2025-04-28 04:35:10"),
+            (passenger.username, "no problem", "2025-04-28 04:35:22"),
+            (passenger.username, "can i change the price then?", "2025-04-28 04:35:59"),
+            (driver.username, "sure", "2025-04-28 04:36:11"),
+        ]
+    ])
+    db.session.add_all([
+        EditProposal(booking_id=chat_booking.id, sender=driver.username, status="accepted",
+                     proposed_pickup="Laidlaw Library, Leeds, LS2 9HJ, United Kingdom",
+                     timestamp=at("2025-04-28 04:34:44")),
+        EditProposal(booking_id=chat_booking.id, sender=passenger.username, status="accepted",
+                     proposed_cost=10.0, timestamp=at("2025-04-28 04:36:23")),
+    ])
+    db.session.commit()
+    return True
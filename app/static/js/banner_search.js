@@ -8,6 +8,44 @@ document.addEventListener("DOMContentLoaded", function () {
         disableMobile: true
     });
 
+    // Typeahead from published ride locations (served by the location search index)
+    const setupLocationTypeahead = (inputId, field) => {
+        const input = document.getElementById(inputId);
+        if (!input) return;
+
+        const datalist = document.createElement("datalist");
+        datalist.id = `${inputId}Suggestions`;
+        input.parentNode.appendChild(datalist);
+        input.setAttribute("list", datalist.id);
+
+        let debounceTimer = null;
+        input.addEventListener("input", () => {
+            clearTimeout(debounceTimer);
+            const query = input.value.trim();
+            if (query.length < 2) {
+                datalist.innerHTML = "";
+                return;
+            }
+            debounceTimer = setTimeout(() => {
+                const params = new URLSearchParams({ q: query, field: field });
+                fetch(`/api/location_suggestions?${params.toString()}`)
+                    .then(response => response.json())
+                    .then(data => {
+                        datalist.innerHTML = "";
+                        data.suggestions.forEach(location => {
+                            const option = document.createElement("option");
+                            option.value = location;
+                            datalist.appendChild(option);
+                        });
+                    })
+                    .catch(error => console.error("Location suggestions failed:", error));
+            }, 150);
+        });
+    };
+
+    setupLocationTypeahead("bannerSearchFrom", "from");
+    setupLocationTypeahead("bannerSearchTo", "to");
+
     if (searchButton) {
         searchButton.addEventListener("click", function () {
             const fromLocation = document.getElementById("bannerSearchFrom").value.trim();
@@ -1,63 +1,102 @@
+// Real-time channel (Socket.IO): chat items and new-message notifications are pushed by the server
+// If the socket can't connect, the page falls back to polling the HTTP endpoints
+let chatSocket = null;
+let notificationPoll = null;
+
 // Notification Logic
 let dismissedMessageIds = new Set();
+let dismissedBookingIds = new Set();
+
+function showMessageNotification(msg) {
+    const stack = document.getElementById('chat-notification-stack');
+    if (!stack) return;
+
+    // If already dismissed then skip
+    if (dismissedMessageIds.has(msg.message_id)) return;
+
+    // If already shown then skip
+    if (document.getElementById(`notif-${msg.message_id}`)) return;
+
+    // No banner for the chat that is open on this page
+    const openChat = document.getElementById("chat-box");
+    if (openChat && window.location.pathname === `/chat/${msg.booking_id}`) return;
+
+    const banner = document.createElement("div");
+    banner.id = `notif-${msg.message_id}`;
+    banner.className = "chat-banner shadow-sm rounded p-2 bg-light border mb-2";
+    banner.style.backgroundColor = "#f8f9fa";
+    banner.style.color = "#212529";
+    banner.style.minWidth = "250px";
+
+    banner.innerHTML = `
+        <div class="d-flex justify-content-between align-items-center">
+            <div>
+                New message from <strong>${msg.sender}</strong><br>
+                <a href="/chat/${msg.booking_id}" class="open-chat" data-bid="${msg.booking_id}" data-mid="${msg.message_id}">Open Chat</a>
+            </div>
+            <i class="fas fa-xmark close-icon" style="cursor: pointer; margin-left: 10px;"></i>
+        </div>
+    `;
+
+    banner.querySelector(".close-icon").addEventListener("click", () => {
+        banner.remove();
+
+        // Send a POST request to mark the message as seen in the database
+        fetch(`/mark_message_seen/${msg.message_id}`, {
+            method: "POST"
+        }).then(() => {
+            banner.remove();
+            dismissedMessageIds.add(msg.message_id);
+        });
+
+        dismissedBookingIds.add(msg.booking_id);
+    });
+
+    stack.appendChild(banner);
+}
+
+// The server sends an ETag, so unchanged polls are answered with an empty 304
 function checkForNewMessages() {
-    fetch('/check_new_messages')
+    fetch('/check_new_messages', { cache: "no-cache" })
         .then(response => response.json())
         .then(data => {
             if (data.new && Array.isArray(data.messages)) {
-                const stack = document.getElementById('chat-notification-stack');
-
-                data.messages.forEach(msg => {
-                    // If already dismissed then skip
-                    if (dismissedMessageIds.has(msg.message_id)) return;
-
-                    // If already shown then skip
-                    if (document.getElementById(`notif-${msg.message_id}`)) return;
-
-                    const banner = document.createElement("div");
-                    banner.id = `notif-${msg.message_id}`;
-                    banner.className = "chat-banner shadow-sm rounded p-2 bg-light border mb-2";
-                    banner.style.backgroundColor = "#f8f9fa";
-                    banner.style.color = "#212529";
-                    banner.style.minWidth = "250px";
-
-                    banner.innerHTML = `
-                        <div class="d-flex justify-content-between align-items-center">
-                            <div>
-                                New message from <strong>${msg.sender}</strong><br>
-                                <a href="/chat/${msg.booking_id}" class="open-chat" data-bid="${msg.booking_id}" data-mid="${msg.message_id}">Open Chat</a>
-                            </div>
-                            <i class="fas fa-xmark close-icon" style="cursor: pointer; margin-left: 10px;"></i>
-                        </div>
-                    `;
-
-                    banner.querySelector(".close-icon").addEventListener("click", () => {
-                        banner.remove();
-                    
-                        // Send a POST request to mark the message as seen in the database
-                        fetch(`/mark_message_seen/${msg.message_id}`, {
-                            method: "POST"
-                        }).then(() => {
-                            banner.remove();
-                            dismissedMessageIds.add(msg.message_id);
-                        });
-                    
-                        dismissedBookingIds.add(msg.booking_id);  
-                    });
-
-                    stack.appendChild(banner);
-                });
+                data.messages.forEach(showMessageNotification);
             }
         })
         .catch(error => console.error('Error checking new messages:', error));
 }
+
+function startNotificationPolling() {
+    if (!notificationPoll) {
+        notificationPoll = setInterval(checkForNewMessages, 10000);
+    }
+}
+
+function stopNotificationPolling() {
+    clearInterval(notificationPoll);
+    notificationPoll = null;
+}
+
 // no messages will be checked when the user is not logged in
 fetch('/api/is_logged_in')
   .then(res => res.json())
   .then(data => {
-    if (data.logged_in) {
-      setInterval(checkForNewMessages, 10000);
+    if (!data.logged_in) return;
+
+    // Show anything that arrived before this page was opened
+    checkForNewMessages();
+
+    if (typeof io === "undefined") {
+        startNotificationPolling();
+        return;
     }
+    chatSocket = io();
+    chatSocket.on("connect", stopNotificationPolling);
+    chatSocket.on("connect_error", startNotificationPolling);
+    chatSocket.on("disconnect", startNotificationPolling);
+    chatSocket.on("new_message", showMessageNotification);
+    document.dispatchEvent(new Event("chat-socket-ready"));
   })
   .catch(err => console.error('Login check failed:', err));
 
@@ -71,19 +110,18 @@ document.addEventListener("click", function (e) {
         dismissedBookingIds.add(bid);
 
         // Mark message seen in the database
-        fetch(`/mark_message_seen/${msg.message_id}`, {
+        fetch(`/mark_message_seen/${mid}`, {
             method: "POST"
         }).then(() => {
-            banner.remove();
-            dismissedMessageIds.add(msg.message_id);
+            dismissedMessageIds.add(mid);
         });
 
-        const banner = document.getElementById(`notif-${bid}`);
+        const banner = document.getElementById(`notif-${mid}`);
         if (banner) banner.remove();
     }
 });
 
-// Chat Page Logic 
+// Chat Page Logic
 document.addEventListener("DOMContentLoaded", () => {
     // Extract bookingId and currentUser from HTML data attributes
     const chatBox = document.getElementById("chat-box");
@@ -100,71 +138,180 @@ document.addEventListener("DOMContentLoaded", () => {
     // You can store this in a hidden element via Jinja in future
     const currentUser = document.querySelector("meta[name='current-user']").content;
 
-    // Load existing messages
-    function loadMessages() {
-        fetch(`/get_messages/${bookingId}`)
+    let messagePoll = null;
+    let pollCount = 0;
+
+    // Cursors: the newest and oldest item shown, as (ts, type, id) like the server orders them
+    const pageSize = 50;
+    let newestItem = null;
+    let oldestItem = null;
+    let hasOlder = false;
+
+    function compareItems(a, b) {
+        if (a.ts !== b.ts) return a.ts < b.ts ? -1 : 1;
+        if (a.type !== b.type) return a.type < b.type ? -1 : 1;
+        return a.id - b.id;
+    }
+
+    function cursorParams(prefix, item) {
+        return `${prefix}_ts=${encodeURIComponent(item.ts)}&${prefix}_type=${item.type}&${prefix}_id=${item.id}`;
+    }
+
+    // Add a message or proposal to the chat, or update it in place if it is already shown
+    function renderItem(item, prepend = false) {
+        const elementId = `chat-${item.type}-${item.id}`;
+        const existing = document.getElementById(elementId);
+        const messageDiv = document.createElement("div");
+        messageDiv.id = elementId;
+        messageDiv.classList.add("mb-2");
+
+        if (item.type === "message") {
+            const isSender = item.sender === currentUser;
+            const wrapperClass = isSender ? "justify-content-end" : "justify-content-start";
+
+            messageDiv.className = `d-flex ${wrapperClass} mb-3`;
+
+            messageDiv.innerHTML = `
+                <div class="message-bubble ${isSender ? 'sent-message' : 'received-message'}">
+                    <div>${item.message}</div>
+                    <div class="timestamp">${item.timestamp}</div>
+                </div>
+            `;
+        } else if (item.type === "proposal") {
+            const isSender = item.sender === currentUser;
+            const borderClass = isSender ? "border-primary" : "border-warning";
+
+            let proposalHTML = `
+                <div class="p-2 border ${borderClass} rounded bg-white">
+                    <strong>📌 Edit Proposal from ${item.sender}</strong><br>
+                    <ul style="margin-bottom: 4px;">
+                        ${item.pickup ? `<li>Pickup Point: ${item.pickup}</li>` : ""}
+                        ${item.time ? `<li>Time: ${item.time}</li>` : ""}
+                        ${item.cost ? `<li>Cost: £${item.cost}</li>` : ""}
+                    </ul>
+                    <div class="small text-muted">${item.timestamp}</div>
+            `;
+
+            if (!isSender && item.status === "pending") {
+                proposalHTML += `
+                    <button class="btn btn-sm btn-success mt-1 me-1 accept-proposal" data-id="${item.id}">Accept</button>
+                    <button class="btn btn-sm btn-danger mt-1 reject-proposal" data-id="${item.id}">Reject</button>
+                `;
+            } else {
+                proposalHTML += `<span class="badge bg-secondary">${item.status.toUpperCase()}</span>`;
+            }
+
+            proposalHTML += `</div>`;
+            messageDiv.innerHTML = proposalHTML;
+        }
+
+        if (!newestItem || compareItems(item, newestItem) > 0) newestItem = item;
+        if (!oldestItem || compareItems(item, oldestItem) < 0) oldestItem = item;
+
+        if (existing) {
+            existing.replaceWith(messageDiv);
+        } else {
+            if (prepend) {
+                chatBox.prepend(messageDiv);
+            } else {
+                chatBox.appendChild(messageDiv);
+            }
+
+            // auto-mark messages as seen when they are shown
+            if (item.type === "message" && item.sender !== currentUser) {
+                markChatSeen();
+            }
+        }
+    }
+
+    // One request marks everything received in this chat as seen (batched while items render)
+    let markSeenTimer = null;
+    function markChatSeen() {
+        if (markSeenTimer) return;
+        markSeenTimer = setTimeout(() => {
+            markSeenTimer = null;
+            fetch("/mark_messages_seen", {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ booking_id: bookingId }),
+            });
+        }, 200);
+    }
+
+    // Load the latest page, or only what is new since the newest item shown
+    function loadMessages(full = false) {
+        const url = (newestItem && !full)
+            ? `/get_messages/${bookingId}?${cursorParams("since", newestItem)}`
+            : `/get_messages/${bookingId}?limit=${pageSize}`;
+        fetch(url)
+            .then(res => res.json())
+            .then(data => {
+                if (!newestItem) hasOlder = data.length === pageSize;
+                const atBottom = chatBox.scrollTop + chatBox.clientHeight >= chatBox.scrollHeight - 10;
+                data.forEach(item => renderItem(item));
+                if (data.length && (atBottom || full)) chatBox.scrollTop = chatBox.scrollHeight;
+            });
+    }
+
+    // Scrolled to the top: load the page before the oldest item shown
+    function loadOlderMessages() {
+        if (!hasOlder || !oldestItem) return;
+        hasOlder = false;  // one request at a time
+        fetch(`/get_messages/${bookingId}?${cursorParams("before", oldestItem)}&limit=${pageSize}`)
             .then(res => res.json())
             .then(data => {
-                chatBox.innerHTML = "";
-    
-                data.forEach(item => {
-                    const messageDiv = document.createElement("div");
-                    messageDiv.classList.add("mb-2");
-    
-                    if (item.type === "message") {
-                        const isSender = item.sender === currentUser;
-                        const wrapperClass = isSender ? "justify-content-end" : "justify-content-start";
-                    
-                        messageDiv.className = `d-flex ${wrapperClass} mb-3`;
-                    
-                        messageDiv.innerHTML = `
-                            <div class="message-bubble ${isSender ? 'sent-message' : 'received-message'}">
-                                <div>${item.message}</div>
-                                <div class="timestamp">${item.timestamp}</div>
-                            </div>
-                        `;
-                    } else if (item.type === "proposal") {
-                        const isSender = item.sender === currentUser;
-                        const borderClass = isSender ? "border-primary" : "border-warning";
-    
-                        let proposalHTML = `
-                            <div class="p-2 border ${borderClass} rounded bg-white">
-                                <strong>📌 Edit Proposal from ${item.sender}</strong><br>
-                                <ul style="margin-bottom: 4px;">
-                                    ${item.pickup ? `<li>Pickup Point: ${item.pickup}</li>` : ""}
-                                    ${item.time ? `<li>Time: ${item.time}</li>` : ""}
-                                    ${item.cost ? `<li>Cost: £${item.cost}</li>` : ""}
-                                </ul>
-                                <div class="small text-muted">${item.timestamp}</div>
-                        `;
-    
-                        if (!isSender && item.status === "pending") {
-                            proposalHTML += `
-                                <button class="btn btn-sm btn-success mt-1 me-1 accept-proposal" data-id="${item.id}">Accept</button>
-                                <button class="btn btn-sm btn-danger mt-1 reject-proposal" data-id="${item.id}">Reject</button>
-                            `;
-                        } else {
-                            proposalHTML += `<span class="badge bg-secondary">${item.status.toUpperCase()}</span>`;
-                        }
-    
-                        proposalHTML += `</div>`;
-                        messageDiv.innerHTML = proposalHTML;
-                    }
-    
-                    chatBox.appendChild(messageDiv);
-
-                    // auto-mark messages as seen when loading chat
-                    if (item.type === "message" && item.sender !== currentUser) {
-                        fetch(`/mark_message_seen/${item.id}`, {
-                            method: "POST"
-                        });
-                    }
-                });
-    
-                chatBox.scrollTop = chatBox.scrollHeight;
+                const previousHeight = chatBox.scrollHeight;
+                data.reverse().forEach(item => renderItem(item, true));
+                chatBox.scrollTop = chatBox.scrollHeight - previousHeight;
+                hasOlder = data.length === pageSize;
             });
     }
 
+    chatBox.addEventListener("scroll", () => {
+        if (chatBox.scrollTop === 0) loadOlderMessages();
+    });
+
+    // Polling fallback: new items every 5 seconds, and the latest page every 30 seconds
+    // so proposal answers show up too
+    function pollMessages() {
+        pollCount += 1;
+        loadMessages(pollCount % 6 === 0);
+    }
+
+    function startMessagePolling() {
+        if (!messagePoll) {
+            messagePoll = setInterval(pollMessages, 5000);
+        }
+    }
+
+    function stopMessagePolling() {
+        clearInterval(messagePoll);
+        messagePoll = null;
+    }
+
+    // Join this booking's chat room; items are pushed as they are created, so no polling is needed
+    function joinChat() {
+        chatSocket.emit("join_chat", { booking_id: bookingId }, (reply) => {
+            if (reply && reply.success) {
+                stopMessagePolling();
+                loadMessages();  // catch up on anything sent while disconnected
+            } else {
+                startMessagePolling();
+            }
+        });
+    }
+
+    function useSocket() {
+        chatSocket.on("chat_item", (item) => {
+            renderItem(item);
+            chatBox.scrollTop = chatBox.scrollHeight;
+        });
+        chatSocket.on("connect", joinChat);
+        chatSocket.on("connect_error", startMessagePolling);
+        chatSocket.on("disconnect", startMessagePolling);
+        if (chatSocket.connected) joinChat();
+    }
+
     // Send new message
     chatForm.addEventListener("submit", (e) => {
         e.preventDefault();
@@ -181,11 +328,11 @@ document.addEventListener("DOMContentLoaded", () => {
             .then(res => res.json())
             .then(() => {
                 messageInput.value = "";
-                loadMessages();
+                if (messagePoll || !chatSocket) loadMessages();
             });
     });
 
-    // Handle Accept/Reject of Proposals 
+    // Handle Accept/Reject of Proposals
     document.addEventListener("click", (e) => {
         if (e.target.classList.contains("accept-proposal") || e.target.classList.contains("reject-proposal")) {
             const proposalId = e.target.getAttribute("data-id");
@@ -199,7 +346,7 @@ document.addEventListener("DOMContentLoaded", () => {
             .then(res => res.json())
             .then(data => {
                 if (data.success) {
-                    loadMessages();  // Refresh to update status
+                    if (messagePoll || !chatSocket) loadMessages(true);  // Refresh to update status
                 } else {
                     alert("Error processing proposal.");
                 }
@@ -207,8 +354,12 @@ document.addEventListener("DOMContentLoaded", () => {
         }
     });
 
-    // Refresh messages every few seconds
-    loadMessages();
-    setInterval(loadMessages, 5000);
+    // Load the history, then follow the chat over the socket (or poll until it connects)
+    loadMessages(true);
+    startMessagePolling();
+    if (chatSocket) {
+        useSocket();
+    } else {
+        document.addEventListener("chat-socket-ready", useSocket, { once: true });
+    }
 });
-
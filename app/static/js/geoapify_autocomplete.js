@@ -8,8 +8,17 @@ const setupAutocomplete = (inputId) => {
     suggestionsContainer.classList.add('autocomplete-suggestions');
     input.parentNode.appendChild(suggestionsContainer);
 
+    // Optional hidden fields (e.g. from_location_lat / from_location_lon) that receive the picked coordinates
+    const latInput = document.getElementById(`${inputId}_lat`);
+    const lonInput = document.getElementById(`${inputId}_lon`);
+    const setCoordinates = (lat, lon) => {
+        if (latInput) latInput.value = lat;
+        if (lonInput) lonInput.value = lon;
+    };
+
     input.addEventListener('input', () => {
         const query = input.value;
+        setCoordinates('', '');  // typed text no longer matches the picked place
         if (query.length > 2) {
             fetch(`https://api.geoapify.com/v1/geocode/autocomplete?text=${encodeURIComponent(query)}&apiKey=${apiKey}`)
                 .then(response => response.json())
@@ -21,6 +30,7 @@ const setupAutocomplete = (inputId) => {
                         suggestion.textContent = feature.properties.formatted;
                         suggestion.addEventListener('click', () => {
                             input.value = feature.properties.formatted;
+                            setCoordinates(feature.properties.lat, feature.properties.lon);
                             suggestionsContainer.innerHTML = '';
                         });
                         suggestionsContainer.appendChild(suggestion);
@@ -179,332 +179,336 @@ document.addEventListener("DOMContentLoaded", function () {
     
     // Function to fetch and display both driver & passenger live locations
     function fetchLiveLocations() {
-        markerClusterGroup.clearLayers();
         const endpoint = rideDate 
             ? `/api/get_commute_live_locations/${rideId}/${rideDate}`
             : `/api/get_live_locations/${rideId}`;
         fetch(endpoint)
             .then(response => response.json())
-            .then(data => {
-                console.log("Live locations response:", data);
-
-                // Modal functionality (For commuting only) 
-                if (userType === "driver" && typeof data.passenger === "object") {
-
-                    const driverLoc = data.driver;
-                    const passengers = data.passenger;
-
-                    const usernames = Object.keys(passengers);
-
-                    usernames.forEach(username => {
-                        const [pLat, pLon] = passengers[username];
-
-                        // Skip if already dismissed
-                        if (dismissed.has(username)) return;
-
-                        const distance = getDistanceFromLatLonInMeters(pLat, pLon, driverLoc[0], driverLoc[1]);
-                        if (
-                            distance <= 100 &&
-                            !modalActive &&
-                            !dismissedPassengers.has(username) &&
-                            !startedPassengers.has(username) &&
-                            !journeyStarted
-                        ) {
-                            modalActive = true;
-
-                            // Update modal content
-                            const modal = document.getElementById("startJourneyModal");
-                            const closeBtn = document.getElementById("closeModalBtn");
-                            const startBtn = document.getElementById("startJourneyBtn");
-                            modal.querySelector("h4").innerText = `${username} is nearby`;
-                            modal.style.display = "block";
-
-                            // Close logic
-                            closeBtn.onclick = () => {
-                                dismissedPassengers.add(username);
-                                modal.style.display = "none";
-                                reminderMap[username] = [pLat, pLon];
-                                modalActive = false;
-
-                                // Create a reminder bar for this passenger
-                                let reminderBar = document.createElement("div");
-                                reminderBar.className = "alert alert-warning mt-2";
-                                reminderBar.style.cursor = "pointer";
-                                reminderBar.innerHTML = `${username} is still nearby. <u>Click to start journey</u>`;
-                                reminderBar.id = `reminder-${username}`;
-                                document.getElementById("reminder-container").appendChild(reminderBar);
-
-                                // On click, start journey for that passenger
-                                reminderBar.addEventListener("click", () => {
-                                    startedPassengers.add(username);
-                                    if (startedPassengers.size === usernames.length) {
-                                        const finishBtn = document.getElementById("finishJourneyBtn");
-                                        if (finishBtn) finishBtn.style.display = "inline-block";
-                                        journeyStarted = true;
-                                    }
-                                    
-                                    reminderBar.remove();
-                                    console.log("Sending to /api/start_journey:", {
-                                        ride_id: rideId,
-                                        ride_date: rideDate
-                                    });
-                                    
-
-                                    fetch("/api/start_journey", {
-                                        method: "POST",
-                                        headers: { "Content-Type": "application/json" },
-                                        body: JSON.stringify({ ride_id: rideId, ride_date: rideDate })
-                                    })
-                                    .then(res => res.json())
-                                    .then(data => {
-                                        document.getElementById("status-message").innerText = data.message || "Location updated.";
-
-                                    });
-                                });
-                            };
-
-                            // Start logic (modal)
-                            startBtn.onclick = () => {
-                                startedPassengers.add(username);
-                                modal.style.display = "none";
-                                modalActive = false;
-                                // journeyStarted = true;
-                                console.log("Sending to /api/start_journey:", {
-                                    ride_id: rideId,
-                                    ride_date: rideDate
-                                });
+            .then(renderLiveLocations)
+            .catch(error => console.error("Error fetching live locations:", error));
+    }
 
-                                fetch("/api/start_journey", {
-                                    method: "POST",
-                                    headers: { "Content-Type": "application/json" },
-                                    body: JSON.stringify({ ride_id: rideId, ride_date: rideDate })
-                                })
-                                .then(res => res.json())
-                                .then(data => {
-                                    document.getElementById("status-message").innerText = data.message || "Location updated.";
-                                    const multiReminder = document.getElementById("multi-reminder");
-                                    if (multiReminder) {
-                                        multiReminder.style.display = "none";
-                                    }
-                                });
-                            };
-                        }
-                    });
-                }
-                // Clear old markers 
-                if (passengerMarker) {
-                    map.removeLayer(passengerMarker);
-                    passengerMarker = null;
-                }
-                if (driverMarker) {
-                    map.removeLayer(driverMarker);
-                    driverMarker = null;
-                }
-    
-                let driverLatLng = null;
-                let allMarkers = [];
-
-                if (data.passenger) {
-                    if (Array.isArray(data.passenger)) {
-                        console.log("One-time ride detected");
-                    } else {
-                        console.log("Commuting ride detected");
-                    }
-                }
+    // Draw the driver and passenger markers and handle the nearby / pickup prompts
+    // data: {driver: [lat, lon], passenger: {username: [lat, lon]}, nearby}
+    function renderLiveLocations(data) {
+        markerClusterGroup.clearLayers();
+        console.log("Live locations:", data);
 
-                // Multiple Passenger Markers (for both one time and commuting)
-                if (data.passenger && typeof data.passenger === "object" && !Array.isArray(data.passenger)) {
-                    console.log("Detected commuting ride mode: rendering multiple passenger markers");
-                    const passengerCount = Object.keys(data.passenger).length;
-                    console.log(`👥 Number of passengers found: ${passengerCount}`);
-    
-                    for (const [passengerKey, coords] of Object.entries(data.passenger)) {
-                        let [pLat, pLon] = coords;
-
-                        // Don't show other passengers to a passenger
-                        if (userType === "passenger" && passengerKey !== currentUsername) continue;
-
-                        // Check if overlapping with driver
-                        if (data.driver && Math.abs(pLat - data.driver[0]) < 0.00001 && Math.abs(pLon - data.driver[1]) < 0.00001) {
-                            pLat += 0.00005;
-                            pLon += 0.00005;
-                        }
-
-                        const marker = L.marker([pLat, pLon], { icon: passengerIcon })
-                        .bindPopup(userType === "passenger" ? "Your location" : `Passenger: ${passengerKey}`);
-                    
-                        markerClusterGroup.addLayer(marker);
-                        allMarkers.push(marker);
-                    }
-                }
+        // Modal functionality (For commuting only) 
+        if (userType === "driver" && data.driver && typeof data.passenger === "object") {
 
-                // Add driver marker to allMarkers array if it exists
-                if (driverMarker) {
-                    allMarkers.push(driverMarker);
-                }
+            const driverLoc = data.driver;
+            const passengers = data.passenger;
 
-                // Fit all markers on the map
-                if (allMarkers.length > 0) {
-                    const group = new L.featureGroup(allMarkers);
-                    map.fitBounds(group.getBounds().pad(0.3));
-                }
-    
-                // Driver Marker
-                if (data.driver) {
-                    const [dLat, dLon] = data.driver;
-                    driverLatLng = [dLat, dLon];
-                    const driverPopup = userType === "driver" ? "Your location" : "Driver's location";
-                    driverMarker = L.marker(driverLatLng, { icon: driverIcon })
-                        .addTo(map)
-                        .bindPopup(driverPopup)
-                        .openPopup();
-                }
-    
-                // Fit both markers in view
-                if (driverMarker && passengerMarker) {
-                    const group = new L.featureGroup([driverMarker, passengerMarker]);
-                    map.fitBounds(group.getBounds().pad(0.3));
-                }
-    
-                // Show modal if driver and passenger are nearby (driver only)
-                const rideStatus = document.getElementById("ride-status")?.value;
-                journeyStarted = (rideStatus === "ongoing");
-                if (data.nearby && userType === "driver" && !journeyStarted && !journeyFinished) {
+            const usernames = Object.keys(passengers);
+
+            usernames.forEach(username => {
+                const [pLat, pLon] = passengers[username];
+
+                // Skip if already dismissed
+                if (dismissed.has(username)) return;
+
+                const distance = getDistanceFromLatLonInMeters(pLat, pLon, driverLoc[0], driverLoc[1]);
+                if (
+                    distance <= 100 &&
+                    !modalActive &&
+                    !dismissedPassengers.has(username) &&
+                    !startedPassengers.has(username) &&
+                    !journeyStarted
+                ) {
+                    modalActive = true;
+
+                    // Update modal content
                     const modal = document.getElementById("startJourneyModal");
                     const closeBtn = document.getElementById("closeModalBtn");
                     const startBtn = document.getElementById("startJourneyBtn");
-                    const reminder = document.getElementById("reminder-message");
-                
-                    if (!modalShown) {
-                        console.log("👀 Passenger is nearby. Showing modal...");
-                        modal.style.display = "block";
-                        modalShown = true;
-                    }
-                
-                    if (closeBtn && !closeBtn.dataset.bound) {
-                        closeBtn.dataset.bound = true;
-                        closeBtn.addEventListener("click", () => {
-                            modal.style.display = "none";
-                            if (reminder) {
-                                reminder.style.display = "block";
+                    modal.querySelector("h4").innerText = `${username} is nearby`;
+                    modal.style.display = "block";
+
+                    // Close logic
+                    closeBtn.onclick = () => {
+                        dismissedPassengers.add(username);
+                        modal.style.display = "none";
+                        reminderMap[username] = [pLat, pLon];
+                        modalActive = false;
+
+                        // Create a reminder bar for this passenger
+                        let reminderBar = document.createElement("div");
+                        reminderBar.className = "alert alert-warning mt-2";
+                        reminderBar.style.cursor = "pointer";
+                        reminderBar.innerHTML = `${username} is still nearby. <u>Click to start journey</u>`;
+                        reminderBar.id = `reminder-${username}`;
+                        document.getElementById("reminder-container").appendChild(reminderBar);
+
+                        // On click, start journey for that passenger
+                        reminderBar.addEventListener("click", () => {
+                            startedPassengers.add(username);
+                            if (startedPassengers.size === usernames.length) {
+                                const finishBtn = document.getElementById("finishJourneyBtn");
+                                if (finishBtn) finishBtn.style.display = "inline-block";
+                                journeyStarted = true;
                             }
+                            
+                            reminderBar.remove();
+                            console.log("Sending to /api/start_journey:", {
+                                ride_id: rideId,
+                                ride_date: rideDate
+                            });
+                            
+
+                            fetch("/api/start_journey", {
+                                method: "POST",
+                                headers: { "Content-Type": "application/json" },
+                                body: JSON.stringify({ ride_id: rideId, ride_date: rideDate })
+                            })
+                            .then(res => res.json())
+                            .then(data => {
+                                document.getElementById("status-message").innerText = data.message || "Location updated.";
+
+                            });
                         });
-                    }
-                
-                    if (startBtn && !startBtn.dataset.bound) {
-                        startBtn.dataset.bound = true;
-                        startBtn.addEventListener("click", () => {
-                            console.log("Start Journey clicked (modal)");
-                            startJourney();
-                            modal.style.display = "none";
+                    };
+
+                    // Start logic (modal)
+                    startBtn.onclick = () => {
+                        startedPassengers.add(username);
+                        modal.style.display = "none";
+                        modalActive = false;
+                        // journeyStarted = true;
+                        console.log("Sending to /api/start_journey:", {
+                            ride_id: rideId,
+                            ride_date: rideDate
                         });
-                    }
-                
-                    // Handle reminder click (start journey)
-                    if (reminder && !reminder.dataset.bound) {
-                        reminder.dataset.bound = true;
-                        reminder.addEventListener("click", () => {
-                            console.log("Start Journey clicked (reminder)");
-                            startJourney();
-                            reminder.style.display = "none";
+
+                        fetch("/api/start_journey", {
+                            method: "POST",
+                            headers: { "Content-Type": "application/json" },
+                            body: JSON.stringify({ ride_id: rideId, ride_date: rideDate })
+                        })
+                        .then(res => res.json())
+                        .then(data => {
+                            document.getElementById("status-message").innerText = data.message || "Location updated.";
+                            const multiReminder = document.getElementById("multi-reminder");
+                            if (multiReminder) {
+                                multiReminder.style.display = "none";
+                            }
                         });
-                    }
-                } else {
-                    // Hide the reminder if user moves away
-                    const reminder = document.getElementById("reminder-message");
+                    };
+                }
+            });
+        }
+        // Clear old markers 
+        if (passengerMarker) {
+            map.removeLayer(passengerMarker);
+            passengerMarker = null;
+        }
+        if (driverMarker) {
+            map.removeLayer(driverMarker);
+            driverMarker = null;
+        }
+
+        let driverLatLng = null;
+        let allMarkers = [];
+
+        if (data.passenger) {
+            if (Array.isArray(data.passenger)) {
+                console.log("One-time ride detected");
+            } else {
+                console.log("Commuting ride detected");
+            }
+        }
+
+        // Multiple Passenger Markers (for both one time and commuting)
+        if (data.passenger && typeof data.passenger === "object" && !Array.isArray(data.passenger)) {
+            console.log("Detected commuting ride mode: rendering multiple passenger markers");
+            const passengerCount = Object.keys(data.passenger).length;
+            console.log(`👥 Number of passengers found: ${passengerCount}`);
+
+            for (const [passengerKey, coords] of Object.entries(data.passenger)) {
+                let [pLat, pLon] = coords;
+
+                // Don't show other passengers to a passenger
+                if (userType === "passenger" && passengerKey !== currentUsername) continue;
+
+                // Check if overlapping with driver
+                if (data.driver && Math.abs(pLat - data.driver[0]) < 0.00001 && Math.abs(pLon - data.driver[1]) < 0.00001) {
+                    pLat += 0.00005;
+                    pLon += 0.00005;
+                }
+
+                const marker = L.marker([pLat, pLon], { icon: passengerIcon })
+                .bindPopup(userType === "passenger" ? "Your location" : `Passenger: ${passengerKey}`);
+            
+                markerClusterGroup.addLayer(marker);
+                allMarkers.push(marker);
+            }
+        }
+
+        // Add driver marker to allMarkers array if it exists
+        if (driverMarker) {
+            allMarkers.push(driverMarker);
+        }
+
+        // Fit all markers on the map
+        if (allMarkers.length > 0) {
+            const group = new L.featureGroup(allMarkers);
+            map.fitBounds(group.getBounds().pad(0.3));
+        }
+
+        // Driver Marker
+        if (data.driver) {
+            const [dLat, dLon] = data.driver;
+            driverLatLng = [dLat, dLon];
+            const driverPopup = userType === "driver" ? "Your location" : "Driver's location";
+            driverMarker = L.marker(driverLatLng, { icon: driverIcon })
+                .addTo(map)
+                .bindPopup(driverPopup)
+                .openPopup();
+        }
+
+        // Fit both markers in view
+        if (driverMarker && passengerMarker) {
+            const group = new L.featureGroup([driverMarker, passengerMarker]);
+            map.fitBounds(group.getBounds().pad(0.3));
+        }
+
+        // Show modal if driver and passenger are nearby (driver only)
+        const rideStatus = document.getElementById("ride-status")?.value;
+        journeyStarted = (rideStatus === "ongoing");
+        if (data.nearby && userType === "driver" && !journeyStarted && !journeyFinished) {
+            const modal = document.getElementById("startJourneyModal");
+            const closeBtn = document.getElementById("closeModalBtn");
+            const startBtn = document.getElementById("startJourneyBtn");
+            const reminder = document.getElementById("reminder-message");
+        
+            if (!modalShown) {
+                console.log("👀 Passenger is nearby. Showing modal...");
+                modal.style.display = "block";
+                modalShown = true;
+            }
+        
+            if (closeBtn && !closeBtn.dataset.bound) {
+                closeBtn.dataset.bound = true;
+                closeBtn.addEventListener("click", () => {
+                    modal.style.display = "none";
                     if (reminder) {
-                        reminder.style.display = "none";
+                        reminder.style.display = "block";
                     }
-                }
+                });
+            }
+        
+            if (startBtn && !startBtn.dataset.bound) {
+                startBtn.dataset.bound = true;
+                startBtn.addEventListener("click", () => {
+                    console.log("Start Journey clicked (modal)");
+                    startJourney();
+                    modal.style.display = "none";
+                });
+            }
+        
+            // Handle reminder click (start journey)
+            if (reminder && !reminder.dataset.bound) {
+                reminder.dataset.bound = true;
+                reminder.addEventListener("click", () => {
+                    console.log("Start Journey clicked (reminder)");
+                    startJourney();
+                    reminder.style.display = "none";
+                });
+            }
+        } else {
+            // Hide the reminder if user moves away
+            const reminder = document.getElementById("reminder-message");
+            if (reminder) {
+                reminder.style.display = "none";
+            }
+        }
 
-                // Show pickup adjust modal if driver is FAR and user is passenger
-                if (
-                    userType === "passenger" &&
-                    data.passenger &&
-                    data.driver &&
-                    !pickupAdjusted &&
-                    !modalShown
-                ) {
-                    const [passLat, passLon] = data.passenger[currentUsername] || [];
-                    const [driverLat, driverLon] = data.driver;
-                
-                    if (passLat && passLon && driverLat && driverLon) {
-                        const distance = getDistanceFromLatLonInMeters(passLat, passLon, driverLat, driverLon);
-                        console.log(`Distance to driver: ${Math.round(distance)} meters`);
-                
-                        if (distance > 250) {
-                            console.log("Showing pickup adjust modal based on distance...");
-                            modalShown = true;
-                
-                            const adjustModal = document.getElementById("adjustPickupModal");
-                            const adjustBtn = document.getElementById("adjustPickupBtn");
-                            const closeBtn = document.getElementById("closeAdjustModal");
-                
-                            adjustModal.style.display = "block";
-                
-                            if (closeBtn) {
-                                closeBtn.addEventListener("click", () => {
-                                    adjustModal.style.display = "none";
+        // Show pickup adjust modal if driver is FAR and user is passenger
+        if (
+            userType === "passenger" &&
+            data.passenger &&
+            data.driver &&
+            !pickupAdjusted &&
+            !modalShown
+        ) {
+            const [passLat, passLon] = data.passenger[currentUsername] || [];
+            const [driverLat, driverLon] = data.driver;
+        
+            if (passLat && passLon && driverLat && driverLon) {
+                const distance = getDistanceFromLatLonInMeters(passLat, passLon, driverLat, driverLon);
+                console.log(`Distance to driver: ${Math.round(distance)} meters`);
+        
+                if (distance > 250) {
+                    console.log("Showing pickup adjust modal based on distance...");
+                    modalShown = true;
+        
+                    const adjustModal = document.getElementById("adjustPickupModal");
+                    const adjustBtn = document.getElementById("adjustPickupBtn");
+                    const closeBtn = document.getElementById("closeAdjustModal");
+        
+                    adjustModal.style.display = "block";
+        
+                    if (closeBtn) {
+                        closeBtn.addEventListener("click", () => {
+                            adjustModal.style.display = "none";
+                        });
+                    }
+        
+                    if (adjustBtn) {
+                        adjustBtn.addEventListener("click", () => {
+                            adjustModal.style.display = "none";
+        
+                            alert("Click on the map to set your pickup location.");
+                            let tempMarker;
+                            let adjusting = true;
+        
+                            map.on("click", function (e) {
+                                if (!adjusting) return;
+        
+                                if (tempMarker) {
+                                    map.removeLayer(tempMarker);
+                                }
+        
+                                const { lat, lng } = e.latlng;
+                                const newPickupIcon = L.icon({
+                                    iconUrl: "https://cdn-icons-png.flaticon.com/512/854/854878.png",
+                                    iconSize: [30, 30]
                                 });
-                            }
-                
-                            if (adjustBtn) {
-                                adjustBtn.addEventListener("click", () => {
-                                    adjustModal.style.display = "none";
-                
-                                    alert("Click on the map to set your pickup location.");
-                                    let tempMarker;
-                                    let adjusting = true;
-                
-                                    map.on("click", function (e) {
-                                        if (!adjusting) return;
-                
-                                        if (tempMarker) {
-                                            map.removeLayer(tempMarker);
-                                        }
-                
-                                        const { lat, lng } = e.latlng;
-                                        const newPickupIcon = L.icon({
-                                            iconUrl: "https://cdn-icons-png.flaticon.com/512/854/854878.png",
-                                            iconSize: [30, 30]
-                                        });
-                
-                                        tempMarker = L.marker([lat, lng], {
-                                            icon: newPickupIcon,
-                                            draggable: true
-                                        }).addTo(map).bindPopup("New Pickup: drag and double-click to confirm").openPopup();
-                
-                                        tempMarker.on("dblclick", () => {
-                                            const newCoords = tempMarker.getLatLng();
-                                            sendUpdatedPickup(newCoords.lat, newCoords.lng);
-                                            adjusting = false;
-                                            map.off("click");
-                                        });
-                                    });
-                
-                                    function sendUpdatedPickup(lat, lon) {
-                                        fetch("/api/update_passenger_pickup_location", {
-                                            method: "POST",
-                                            headers: { "Content-Type": "application/json" },
-                                            body: JSON.stringify({ ride_id: rideId, latitude: lat, longitude: lon })
-                                        })
-                                        .then(res => res.json())
-                                        .then(data => {
-                                            alert(data.message || "Pickup location updated.");
-                                            pickupAdjusted = true;
-                                        })
-                                        .catch(err => {
-                                            alert("Error updating pickup location.");
-                                            console.error(err);
-                                        });
-                                    }
+        
+                                tempMarker = L.marker([lat, lng], {
+                                    icon: newPickupIcon,
+                                    draggable: true
+                                }).addTo(map).bindPopup("New Pickup: drag and double-click to confirm").openPopup();
+        
+                                tempMarker.on("dblclick", () => {
+                                    const newCoords = tempMarker.getLatLng();
+                                    sendUpdatedPickup(newCoords.lat, newCoords.lng);
+                                    adjusting = false;
+                                    map.off("click");
+                                });
+                            });
+        
+                            function sendUpdatedPickup(lat, lon) {
+                                fetch("/api/update_passenger_pickup_location", {
+                                    method: "POST",
+                                    headers: { "Content-Type": "application/json" },
+                                    body: JSON.stringify({ ride_id: rideId, latitude: lat, longitude: lon })
+                                })
+                                .then(res => res.json())
+                                .then(data => {
+                                    alert(data.message || "Pickup location updated.");
+                                    pickupAdjusted = true;
+                                })
+                                .catch(err => {
+                                    alert("Error updating pickup location.");
+                                    console.error(err);
                                 });
                             }
-                        }
+                        });
                     }
                 }
-            })
-            .catch(error => console.error("Error fetching live locations:", error));
+            }
+        }
     }
 
     // Leaflet map rendering issue
@@ -512,57 +516,137 @@ document.addEventListener("DOMContentLoaded", function () {
         map.invalidateSize();
     }, 500);
 
-    if (userType === "passenger") {
-        updateLocation("passenger");
-        setTimeout(fetchLiveLocations, 1500); 
-    
-        setInterval(() => {
-            updateLocation("passenger");
+    // Journey finished: show the banner and the rating button to the passenger
+    function showJourneyFinished() {
+        if (journeyFinished) return;
+        journeyFinished = true;
+        document.getElementById("ride-status").value = "done";
+        const banner = document.getElementById("journeyFinishedBanner");
+        const text = document.getElementById("journeyBannerText");
+        text.innerText = "Journey finished. Thank you for riding with Catch My Ride. Please rate your driver.";
+
+        const rateBtn = document.createElement("button");
+        rateBtn.innerText = "Rate Driver";
+        rateBtn.className = "btn btn-light mt-4 rate-btn";
+        rateBtn.style.fontSize = "1.2rem";
+        rateBtn.onclick = function () {
+            showRatingModal(rideId, rideDate);
+        };
+
+        if (!banner.querySelector(".rate-btn")) {
+            banner.appendChild(rateBtn);
+        }
+
+        banner.style.display = "block";
+    }
+
+    function checkRideStatus() {
+        fetch('/api/ride_status', {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ ride_id: rideId, ride_date: rideDate })
+        })
+        .then(res => res.json())
+        .then(data => {
+            if (data.status === "done") showJourneyFinished();
+        });
+    }
+
+    // Live tracking channel (Socket.IO, shared with the chat): positions, the nearby flag and
+    // journey status changes are pushed to everyone on the ride, and our own position is sent
+    // on the same socket. Until it connects (or if it can't) the page polls the HTTP endpoints.
+    let trackingPolls = [];
+    let trackingJoined = false;
+    let lastLocationSent = 0;
+    const liveState = { driver: null, passenger: {}, nearby: false };
+
+    function startTrackingPolling() {
+        trackingJoined = false;
+        if (trackingPolls.length) return;
+        trackingPolls.push(setInterval(() => {
+            updateLocation(userType);
             fetchLiveLocations();
-        }, 10000);
-    
-        // Polling for journey status to trigger rating banner
-        setInterval(() => {
-            fetch('/api/ride_status', {
-                method: "POST",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({ ride_id: rideId, ride_date: rideDate })
-            })
-            .then(res => res.json())
-            .then(data => {
-                if (data.status === "done" && !journeyFinished) {
-                    journeyFinished = true;
-                    document.getElementById("ride-status").value = "done";
-                    const banner = document.getElementById("journeyFinishedBanner");
-                    const text = document.getElementById("journeyBannerText");
-                    text.innerText = "Journey finished. Thank you for riding with Catch My Ride. Please rate your driver.";
-    
-                    const rateBtn = document.createElement("button");
-                    rateBtn.innerText = "Rate Driver";
-                    rateBtn.className = "btn btn-light mt-4 rate-btn";
-                    rateBtn.style.fontSize = "1.2rem";
-                    rateBtn.onclick = function () {
-                        showRatingModal(rideId, rideDate);
-                    };
-    
-                    if (!banner.querySelector(".rate-btn")) {
-                        banner.appendChild(rateBtn);
-                    }
-    
-                    banner.style.display = "block";
-                }
+        }, 10000));
+        if (userType === "passenger") {
+            trackingPolls.push(setInterval(checkRideStatus, 5000)); // check every 5 seconds
+        }
+    }
+
+    function stopTrackingPolling() {
+        trackingPolls.forEach(clearInterval);
+        trackingPolls = [];
+    }
+
+    function joinTracking() {
+        chatSocket.emit("join_tracking", { ride_id: rideId, ride_date: rideDate }, (reply) => {
+            if (!reply || !reply.success) {
+                startTrackingPolling();
+                return;
+            }
+            stopTrackingPolling();
+            trackingJoined = true;
+            liveState.driver = reply.driver;
+            liveState.passenger = reply.passenger;
+            liveState.nearby = reply.nearby;
+            renderLiveLocations(liveState);
+        });
+    }
+
+    // Send our position over the socket as it changes, at most every 3 seconds
+    function watchLocation() {
+        if (!navigator.geolocation) return;
+        navigator.geolocation.watchPosition(position => {
+            if (!trackingJoined || Date.now() - lastLocationSent < 3000) return;
+            lastLocationSent = Date.now();
+            chatSocket.emit("location_update", {
+                ride_id: rideId,
+                ride_date: rideDate,
+                latitude: position.coords.latitude,
+                longitude: position.coords.longitude
             });
-        }, 5000); // check every 5 seconds
+        });
+    }
+
+    function useTrackingSocket() {
+        // Deltas: {driver: [lat, lon], nearby} or {passenger: {username: [lat, lon]}, nearby}
+        chatSocket.on("location", (update) => {
+            if (update.driver) liveState.driver = update.driver;
+            if (update.passenger) Object.assign(liveState.passenger, update.passenger);
+            liveState.nearby = update.nearby;
+            renderLiveLocations(liveState);
+        });
+        chatSocket.on("ride_status", (update) => {
+            if (update.status === "done" && userType === "passenger") {
+                showJourneyFinished();
+            } else {
+                document.getElementById("ride-status").value = update.status;
+            }
+        });
+        // Sent once when someone comes near or arrives at the pickup / drop-off point
+        chatSocket.on("geofence", (event) => {
+            const who = event.username === currentUsername ? "You" : event.username;
+            const place = event.fence === "pickup" ? "the pickup point" : "the drop-off point";
+            document.getElementById("status-message").innerText =
+                event.event === "arrived" ? `${who} arrived at ${place}` : `${who} is near ${place}`;
+        });
+        chatSocket.on("connect", joinTracking);
+        chatSocket.on("connect_error", startTrackingPolling);
+        chatSocket.on("disconnect", startTrackingPolling);
+        if (chatSocket.connected) joinTracking();
+        watchLocation();
     }
-     else if (userType === "driver") {
-        console.log("Driver detected");
-        updateLocation("driver");
+
+    if (userType === "passenger" || userType === "driver") {
+        console.log(`${userType} detected`);
+        updateLocation(userType);
         setTimeout(fetchLiveLocations, 1500); // Delay to allow backend to store location
-    
-        setInterval(() => {
-            updateLocation("driver");
-            fetchLiveLocations();
-        }, 10000);
+        startTrackingPolling();
+
+        if (typeof chatSocket !== "undefined" && chatSocket) {
+            useTrackingSocket();
+        } else {
+            document.addEventListener("chat-socket-ready", useTrackingSocket, { once: true });
+        }
     }
 
     // Finish Journey Button Handler
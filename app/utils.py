@@ -1,6 +1,7 @@
-from flask import redirect, url_for, flash
+from flask import current_app, has_app_context, redirect, url_for, flash
 from flask_login import current_user
 from functools import wraps
+from datetime import datetime, timedelta
 from app.models import PlatformSetting
 
 
@@ -8,14 +9,31 @@ def manager_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if not current_user.is_authenticated:
-            return redirect(url_for('login'))
+            return redirect(url_for('auth.login'))
         if not current_user.is_manager:
             flash("Access restricted to managers only.", "warning")
-            return redirect(url_for('home'))
+            return redirect(url_for('rides.home'))
         return f(*args, **kwargs)
     return decorated_function
 
 
+# A config value of the current app, or the default outside an app (scripts, benchmarks)
+def config_value(name, default):
+    return current_app.config.get(name, default) if has_app_context() else default
+
+
 def get_platform_fee(default=0.005):
     setting = PlatformSetting.query.filter_by(key="platform_fee").first()
-    return float(setting.value) if setting else default
\ No newline at end of file
+    return float(setting.value) if setting else default
+
+# Helper function for /dashboard to get week start and end dates
+def get_week_dates(year, week_num):
+    start = datetime.strptime(f'{year}-W{int(week_num):02d}-1', "%Y-W%W-%w").date()
+    end = start + timedelta(days=6)
+    return start, end
+
+
+# Rides are published and shown in UK time (pytz is only loaded once a page needs it)
+def london_timezone():
+    import pytz
+    return pytz.timezone("Europe/London")
@@ -0,0 +1,11 @@
+from importlib import import_module
+
+
+# The site's pages and JSON endpoints, one blueprint per area
+# Each module is only imported when an app registers it (create_app)
+BLUEPRINTS = ("auth", "rides", "booking", "tracking", "chat", "manager")
+
+
+def register_blueprints(app):
+    for name in BLUEPRINTS:
+        app.register_blueprint(import_module(f"app.views.{name}").bp)
@@ -0,0 +1,239 @@
+import os, re
+from flask import Blueprint, current_app, render_template, redirect, url_for, request, jsonify, session
+from flask_login import login_user, logout_user, login_required, current_user
+from werkzeug.security import check_password_hash, generate_password_hash
+from app import db, login_manager
+from app.models import User
+from app.mailer import queue_email
+
+
+# Sign up, log in / out and password reset
+bp = Blueprint("auth", __name__)
+
+
+# Redirection to the appropriate booking page from the search functionality when the user hasn't logged in
+# check login status for the search functionality
+@bp.route('/check_login_status', methods=['GET'])
+def check_login_status():
+    if not current_user.is_authenticated:
+        return jsonify({"is_logged_in": False, "message": "You need to log in before booking a ride."})
+    return jsonify({"is_logged_in": True})
+
+
+@bp.before_app_request
+def check_redirect_after_login():
+    if 'redirect_after_login' in session and current_user.is_authenticated:
+        redirect_path = session.pop('redirect_after_login')
+        return redirect(redirect_path)
+
+
+# check the redirect path
+@bp.route('/set_redirect_path', methods=['POST'])
+def set_redirect_path():
+    data = request.get_json()
+    path = data.get('path')
+    if path:
+        session['redirect_after_login'] = path
+        return jsonify({"message": "Redirect path set successfully."}), 200
+    return jsonify({"message": "No path provided."}), 400
+
+
+# Route for User Registration (Signup)
+@bp.route("/register", methods=["POST"])
+def register():
+    data = request.json  
+    username = data.get("username")
+    email = data.get("email")
+    password = data.get("password")
+    confirm_password = data.get("confirm_password")
+    
+    # Email converted to lower case
+    email = email.lower() if email else None
+
+    # Validate email format
+    if not email or not email.endswith("@gmail.com"):
+        return jsonify({"error": "Invalid email format. Email must be a valid '@gmail.com' address."}), 400
+    
+    # Check if user already exists (case insensitive)
+    if User.query.filter_by(email=email).first():        
+        return jsonify({"message": "Email already registered"}), 400
+
+    # Checks if the 'username' is empty
+    if not data.get('username'):
+        return jsonify({"error": "Username is required"}), 400
+
+    # Checks for username duplication
+    if User.query.filter_by(username=username).first():
+        return jsonify({"message": "Username already exists"}), 400
+    
+    # Check if 'email' is empty 
+    if not data.get('email'):
+        return jsonify({"error": "Email is required"}), 400
+
+    # Strong password Validation
+    if len(password) < 8 or not re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
+        return jsonify({"error": "Password must be at least 8 characters long and contain at least one special character."}), 400
+
+    # Check if passwords match
+    if password != confirm_password:
+        return jsonify({"message": "Passwords do not match"}), 400
+
+    # Hash password and create new user
+    hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+    new_user = User(username=username, email=email, password_hash=hashed_password)
+    db.session.add(new_user)
+    db.session.commit()
+    return jsonify({"message": "User registered successfully"}), 201
+
+
+# Route for User Login 
+@bp.route("/login", methods=["POST"])
+def login():
+    data = request.json
+    email = data.get("email")
+    password = data.get("password")
+
+    # Email is converted to lowercase for case insensitivity
+    email = email.lower() if email else None
+    
+    # Validate email
+    if not email or not password:
+        return jsonify({"error": "Email and password are required"}), 400
+
+    # Find the user by email (case insensitive)
+    user = User.query.filter_by(email=email).first()
+    if not user or not check_password_hash(user.password_hash, password):
+        return jsonify({"message": "Invalid email or password"}), 401
+    login_user(user)
+
+    # Send role-based redirect path under the key expected by auth.js
+    redirect_path = url_for('manager.manager_dashboard') if user.is_manager else url_for('rides.home')
+
+    return jsonify({
+        "message": "Login successful",
+        "redirect_url": redirect_path
+        }), 200
+
+
+# Route for User Logout
+@bp.route("/logout", methods=["POST"])
+@login_required
+def logout():
+    logout_user()
+    return jsonify({"message": "Logged out successfully!"}), 200
+
+
+# Route to Load User for Flask-Login
+@login_manager.user_loader
+def load_user(user_id):
+    return User.query.get(int(user_id))
+
+
+@bp.app_context_processor
+def inject_user():
+    return dict(user=current_user)
+
+
+def get_base_url():
+    """ Automatically detects and returns the correct base URL. """
+    # If running in GitHub Codespaces
+    if "CODESPACE_NAME" in os.environ:
+        return f"https://{os.getenv('CODESPACE_NAME')}-5000.githubpreview.dev"
+
+    # If running in production (detect custom domain)
+    if "PRODUCTION_DOMAIN" in os.environ:
+        return f"https://{os.getenv('PRODUCTION_DOMAIN')}"
+
+    # Otherwise, use whatever Flask detects
+    return request.host_url.rstrip('/')
+
+
+# Route for forgot password 
+@bp.route('/forgot-password', methods=['GET', 'POST'])
+def forgot_password():
+    if request.method == 'GET':
+        return render_template('forgot_password.html')
+
+    # Handle both JSON and form data
+    if request.is_json:
+        data = request.get_json()
+    else:
+        data = request.form  # Handle form submissions
+
+    email = data.get('email')
+    user = User.query.filter_by(email=email).first()
+    
+    if user:
+        token = user.generate_reset_password_token(secret_key=current_app.config['SECRET_KEY'])
+        # Check if running in GitHub Codespaces
+        codespace_url = os.getenv("CODESPACE_NAME")
+        if codespace_url:
+            base_url = f"https://{codespace_url}-5000.app.github.dev"
+        else:
+            base_url = request.url_root.rstrip('/')  # Fallback for local use
+
+        reset_url = f"{base_url}{url_for('auth.reset_password', token=token, user_id=user.id)}"
+        print("Generated Reset URL:", reset_url)
+
+
+        subject = 'Password Reset Request'
+        queue_email(email, subject, f"""
+To reset your password, visit the following link: {reset_url}
+If you did not request this, please ignore this email. The link expires in 10 minutes.
+        """)
+        db.session.commit()
+
+        return jsonify({"success": True, "message": "Password reset link sent to your email."})
+    else:
+        return jsonify({"success": False, "message": "No account found with that email address."}), 404
+
+
+# Route to reset password
+@bp.route('/reset-password/<token>/<int:user_id>', methods=['GET', 'POST'])
+def reset_password(token, user_id):
+    if request.method == 'GET':
+        # Validate token before showing reset page
+        user = User.validate_reset_password_token(token, secret_key=current_app.config['SECRET_KEY'], user_id=user_id)
+
+        if not user:
+            return jsonify({"success": False, "message": "Invalid or expired reset link!"}), 400
+
+        # Render the reset password HTML page (you already have it)
+        return render_template("reset_password.html", token=token, user_id=user_id)
+
+    # If it's a POST request, process password reset
+    if request.method == 'POST':
+        # Handle both JSON and form data
+        if request.is_json:
+            data = request.get_json()
+        else:
+            data = request.form
+
+        new_password = data.get('password')
+
+        print("Received Token:", token)
+        print("Received User ID:", user_id)
+
+        user = User.validate_reset_password_token(token, secret_key=current_app.config['SECRET_KEY'], user_id=user_id)
+
+        if not user:
+            return redirect(url_for('rides.home', expired_reset=True))
+
+        # Strong password validation (same as registration)
+        if not new_password or len(new_password) < 8 or not re.search(r"[!@#$%^&*(),.?\":{}|<>]", new_password):
+            return jsonify({"success": False, "message": "Password must be at least 8 characters long and contain at least one special character."}), 400
+
+        # Save new password
+        user.set_password(new_password)
+        db.session.commit()
+        return jsonify({"success": True, "message": "Your password has been updated! You can now log in."})
+
+
+        return jsonify({"success": False, "message": "Password update failed!"}), 400
+
+
+# ID 17: chat option between driver and passenger
+# route to check if the user is not logged in for chat polling
+@bp.route('/api/is_logged_in')
+def is_logged_in():
+    return jsonify({"logged_in": current_user.is_authenticated})
@@ -0,0 +1,614 @@
+import re
+from flask import Blueprint, render_template, redirect, url_for, request, jsonify
+from flask_login import login_required, current_user
+from app import db
+from app.models import User, publish_ride, book_ride, Payment, SavedCard, EditProposal, RideRating, RideSeatInventory, DriverWeeklyEarnings, PickupRoute
+from datetime import datetime
+from sqlalchemy import and_
+from sqlalchemy.orm import joinedload
+from collections import defaultdict
+from app.utils import get_platform_fee, get_week_dates, london_timezone
+from app.mailer import queue_email
+from app.metrics import metrics
+from app.realtime import remove_from_tracking
+
+
+# Booking rides, payments, cancellations, ratings and the user dashboard
+bp = Blueprint("booking", __name__)
+
+
+# Route for booking a joureny by teh user/passenger
+@bp.route('/book_onetime/<int:ride_id>', methods=['GET', 'POST'])
+@login_required
+def book_onetime(ride_id):
+    if not current_user.is_authenticated:
+        return jsonify({"error": "You need to log in before booking a ride."}), 403
+
+    ride = publish_ride.query.filter_by(id=ride_id).first()
+    # Load latest seat tracking data
+    seat_tracking = RideSeatInventory.seats_by_date(ride.id)
+    # Get available commuting dates
+    available_dates = []
+    
+    # Ensure selected_date is always valid
+    selected_date = request.args.get("selected_date") or request.form.get("selected_date")
+    if not selected_date:
+        if ride.category == "one-time":
+            selected_date = ride.date_time.strftime("%Y-%m-%d")
+        elif available_dates:
+            selected_date = available_dates[0]
+        else:
+            selected_date = ""
+    selected_date = selected_date.strip()
+    
+    # Get available seats
+    current_available_seats = seat_tracking.get(selected_date, 0)
+    if request.method == 'POST':
+        num_seats = request.form.get('seats')
+        confirmation_email = request.form.get('email')
+
+        # Validation messages for testing 
+        if not num_seats:
+            return jsonify({"error": "Number of seats is required"}), 400
+        try:
+            num_seats = int(num_seats)
+
+        except ValueError:
+            return jsonify({"error": "Invalid seat number"}), 400
+
+        if num_seats < 1:
+            return jsonify({"error": "Invalid seat number"}), 400
+        
+        if not confirmation_email:
+            return jsonify({"error": "Email is required"}), 400
+        
+
+        if selected_date not in seat_tracking or seat_tracking[selected_date] < num_seats:
+            return jsonify({"error": f"Not enough seats available on {selected_date}"}), 400
+        
+        total_price = num_seats * ride.price_per_seat
+        # Redirect to Payment Page with selected_date included
+        return redirect(url_for('booking.payment_page', ride_id=ride.id, seats=num_seats, total_price=total_price, selected_dates=selected_date, email=confirmation_email))
+    
+    return render_template(
+        'book_onetime.html', 
+        ride=ride, 
+        available_dates=available_dates, 
+        seat_tracking=seat_tracking,
+        current_available_seats=current_available_seats, 
+        seat_data=seat_tracking,
+        selected_date=selected_date,
+        user=current_user
+    )
+
+
+# Route for booking a commuting journey
+@bp.route('/book_commuting/<int:ride_id>', methods=['GET', 'POST'])
+@login_required
+def book_commuting(ride_id):
+
+    # get current UK time (timezone-aware)
+    london = london_timezone()
+    aware_now = datetime.now(london)
+    now = aware_now.replace(tzinfo=None)
+
+    ride = publish_ride.query.get_or_404(ride_id)
+    
+    # Load seat data from DB
+    raw_seat_tracking = RideSeatInventory.seats_by_date(ride.id)
+
+    # Filter seat_tracking to only include future dates
+    seat_tracking = {
+        date: seats for date, seats in raw_seat_tracking.items()
+        if datetime.strptime(date, "%Y-%m-%d") >= now
+    }
+
+    # Also filter available_dates (for calendar display)
+    available_dates = [
+        date.strip() for date in (ride.recurrence_dates.split(",") if ride.recurrence_dates else [])
+        if datetime.strptime(date.strip(), "%Y-%m-%d") >= now
+    ]
+
+    seat_data = seat_tracking
+    
+    if request.method == 'POST':
+        num_seats = request.form.get('seats')
+        selected_dates = request.form.getlist("selected_dates")
+        confirmation_email = request.form.get('email')
+
+        # Validation messages for testing
+        if not num_seats or not selected_dates:
+            return jsonify({"error": "Required fields are missing"}), 400
+        try:
+            num_seats = int(num_seats)
+        except ValueError:
+            return jsonify({"error": "Invalid seat number"}), 400
+        if num_seats < 1:
+            return jsonify({"error": "Invalid seat number"}), 400
+
+        if not confirmation_email:
+            return jsonify({"error": "Email is required"}), 400
+        
+        if not confirmation_email or not re.match(r"[^@]+@[^@]+\.[^@]+", confirmation_email):
+            return jsonify({"error": "Invalid email format"}), 400
+        
+        # Check seat availability for each date
+        for date in selected_dates:
+            if seat_tracking.get(date.strip(), 0) < num_seats:
+                return jsonify({"error": f"Not enough seats available on {date}"}), 400
+                
+        total_price=request.form.get('total_price')
+        
+        return redirect(url_for('booking.payment_page', ride_id=ride.id, seats=num_seats, total_price=total_price, selected_date=",".join(selected_dates), email=confirmation_email))
+    
+    return render_template(
+        'book_commuting.html', 
+        ride=ride, 
+        available_dates=available_dates, 
+        seat_data=seat_data,
+        seat_tracking=seat_tracking,
+        user=current_user
+    )
+
+
+# Route for payment page
+@bp.route('/payment/<int:ride_id>/<int:seats>/<float:total_price>', methods=['GET'])
+@login_required
+def payment_page(ride_id, seats, total_price):
+    selected_dates = request.args.getlist("selected_dates")
+    email = request.args.get("email", None)
+    ride = publish_ride.query.get_or_404(ride_id)
+    return render_template(
+        "payment.html",
+        ride=ride,
+        seats=seats,
+        total_price=total_price,
+        selected_date=selected_dates,
+        email=email
+    )
+
+
+# Route for process payemnt
+@bp.route("/process_payment", methods=["POST"])
+@login_required  
+def process_payment():
+    try:
+        data = request.json
+        if not data:
+            return jsonify({"success": False, "message": "Invalid request: No data received"}), 400
+        
+        ride_id = data.get("ride_id")
+        seats = data.get("seats")
+        total_price = data.get("total_price")
+        selected_dates = data.get("selected_dates")
+        confirmation_email = data.get("email")
+        use_saved_card = data.get("use_saved_card", False)
+        saved_card_id = int(data.get("saved_card_id", 0)) if data.get("saved_card_id") else None
+
+        # Ensure selected_dates is always a list
+        if not selected_dates or not isinstance(selected_dates, list):
+            return jsonify({"success": False, "message": "No valid selected dates provided"}), 400
+        
+        ride = publish_ride.query.get(ride_id)
+        if not ride:
+            return jsonify({"success": False, "message": "Ride not found"}), 404
+        
+        seats = int(seats)
+        if seats < 1:
+            return jsonify({"success": False, "message": "Select at least one seat"}), 400
+        per_day_price = seats * ride.price_per_seat
+
+        # Handle Payment Method (Saved Card vs. Manual Entry)
+        if use_saved_card:
+            # If using a saved card, validate it
+            saved_card = SavedCard.query.get(saved_card_id)
+            if not saved_card or saved_card.user_id != current_user.id:
+                return jsonify({"success": False, "message": "Invalid saved card selected."}), 400
+            # decrypted_card_number = saved_card.get_card_number()
+        
+        else:
+            # If entering card manually, validate details
+            card_number = data.get("card_number")
+            expiry = data.get("expiry")
+            cardholder_name = data.get("cardholder_name")
+            save_card = data.get("save_card", False)
+
+            # Validation messages for testing
+            if not card_number or not expiry or not cardholder_name:
+                return jsonify({"success": False, "message": "Card details missing."}), 400
+
+            if len(card_number) != 16 or not card_number.isdigit():
+                return "Invalid card number", 400
+            
+            # Save the card if requested
+            if save_card:
+                new_card = SavedCard(
+                    user_id=current_user.id,
+                    expiry_date=expiry,
+                    cardholder_name=cardholder_name,
+                )
+                new_card.set_card_number(card_number)
+                db.session.add(new_card)
+                db.session.commit()
+
+        # get current UK time (timezone-aware)
+        london = london_timezone()
+        aware_now = datetime.now(london)
+        now = aware_now.replace(tzinfo=None)
+
+        # get ride date time to store in book_ride table correctly
+        ride_datetimes = []
+        for selected_date in selected_dates:
+            if ride.commute_times:
+                ride_time_str = ride.commute_times
+                datetime_str = f"{selected_date} {ride_time_str}"
+                ride_datetime = london.localize(datetime.strptime(datetime_str, "%Y-%m-%d %H:%M"))
+            elif ride.date_time:
+                ride_time = ride.date_time.time()
+                datetime_obj = datetime.strptime(selected_date, "%Y-%m-%d")
+                ride_datetime = london.localize(datetime.combine(datetime_obj, ride_time))
+            else:
+                return jsonify({"success": False, "message": "Unable to determine ride time"}), 400
+            ride_datetimes.append((selected_date, ride_datetime))
+
+        # Reserve the seats, then write every booking and payment, in one transaction:
+        # either all selected dates are booked or none are
+        fee_rate = get_platform_fee()
+        for selected_date, ride_datetime in ride_datetimes:
+            if not RideSeatInventory.reserve(ride.id, ride_datetime.date(), seats):
+                db.session.rollback()
+                return jsonify({"success": False, "message": f"No available seats on {selected_date}"}), 409
+
+            new_booking = book_ride(
+                user_id=current_user.id,
+                ride_id=ride.id,
+                status="Booked",
+                total_price=total_price,
+                seats_selected=seats,
+                confirmation_email=confirmation_email,
+                ride_date=ride_datetime,
+            )
+            db.session.add(new_booking)
+            db.session.flush()  # assigns new_booking.id for the payment
+
+            new_payment = Payment(
+                user_id=current_user.id,
+                ride_id=ride.id,
+                book_ride_id=new_booking.id,
+                amount=per_day_price,  
+                status="Success",
+                timestamp=now,
+                platform_fee=fee_rate
+            )
+            db.session.add(new_payment)
+
+        # Queue the booking confirmation email, committed together with the bookings
+        send_booking_confirmation_email(confirmation_email, ride, seats, total_price, selected_dates)
+        db.session.commit()
+        metrics.count("bookings_created_total", len(ride_datetimes))
+        metrics.count("payments_total", len(ride_datetimes), status="Success")
+
+        return jsonify({"success": True, "message": "Payment successful & booking confirmed!", "redirect_url": url_for("booking.dashboard")})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"success": False, "message": "Internal server error", "error": str(e)}), 500
+
+
+# Route to queue the booking confirmation email (sent in the background by app/mailer.py)
+def send_booking_confirmation_email(email, ride, seats, total_price, selected_dates):
+    try:
+        subject = "Booking Confirmation - Your Ride Details"
+        selected_dates_str = ", ".join(selected_dates)
+
+        body = f"""
+        Dear User,
+
+        Thank you for booking your ride. Here are your details:
+
+        📍 From: {ride.from_location}
+        📍 To: {ride.to_location}
+        🚗 Driver: {ride.driver_name}
+        🎟️ Seats Booked: {seats}
+        💰 Total Price: £{total_price}
+        📅 Ride Date(s): {selected_dates_str}
+
+        If you have any issues, please contact support.
+
+        Regards,
+        CatchMyRide
+        """
+
+        queue_email(email, subject, body)
+
+    except Exception as e:
+        print(f"Error queueing email: {e}")
+
+
+# Route for the user dashboard
+# Built from a fixed number of queries: bookings (with rides), published rides,
+# their passengers (with usernames) and one grouped fetch of accepted proposals
+@bp.route('/dashboard')
+@login_required
+def dashboard():
+    # Get upcoming and inactive journeys
+    booked_rides = book_ride.query.options(joinedload(book_ride.ride)).filter_by(user_id=current_user.id).all()
+
+    # Get published rides and their passengers (with usernames) in one query
+    user_published_rides = publish_ride.query.filter_by(driver_id=current_user.id).all()
+    driver_ride_ids = [ride.id for ride in user_published_rides]
+
+    passenger_rows = []
+    if driver_ride_ids:
+        passenger_rows = db.session.query(book_ride, User.username).join(
+            User, User.id == book_ride.user_id
+        ).filter(
+            book_ride.ride_id.in_(driver_ride_ids),
+            book_ride.status != "Canceled"
+        ).order_by(book_ride.ride_date, book_ride.id).all()
+
+    # Accepted proposals for every booking on the page, grouped by booking
+    booking_ids = [booking.id for booking in booked_rides] + [booking.id for booking, _ in passenger_rows]
+    accepted_by_booking = defaultdict(list)
+    if booking_ids:
+        for p in EditProposal.query.filter(
+            EditProposal.booking_id.in_(booking_ids), EditProposal.status == "accepted"
+        ).order_by(EditProposal.timestamp.desc()).all():
+            accepted_by_booking[p.booking_id].append({
+                "pickup": p.proposed_pickup,
+                "time": p.proposed_time,
+                "cost": p.proposed_cost,
+                "timestamp": p.timestamp.strftime('%Y-%m-%d %H:%M')
+            })
+
+    upcoming_journeys = []
+    inactive_journeys = []
+
+    for booking in booked_rides:
+        ride = booking.ride
+        if ride:
+            is_inactive = booking.status in ["Canceled", "done"]
+            price_per_seat = ride.price_per_seat
+            journey_data = {
+                "booking_id": booking.id,
+                "ride_id": ride.id,
+                "from": ride.from_location,
+                "to": ride.to_location,
+                "date": booking.ride_date.strftime('%Y-%m-%d'),
+                "time": ride.commute_times if ride.category == "commuting" else (
+                    ride.date_time.strftime('%H:%M') if ride.date_time else "Not Provided"
+                ),
+                "status": booking.status,
+                "price": price_per_seat,
+                "seats_booked": booking.seats_selected,
+                "category": ride.category
+            }
+
+            journey_data["accepted_proposals"] = accepted_by_booking[booking.id]
+            
+            if is_inactive:
+                inactive_journeys.append(journey_data)
+            else:
+                upcoming_journeys.append(journey_data)
+    
+    # Sort upcoming journeys by date and time
+    upcoming_journeys.sort(key=lambda j: (j["date"], j["time"]))
+
+    # Passengers of each published ride
+    passengers_by_ride = defaultdict(list)
+    for passenger, username in passenger_rows:
+        passengers_by_ride[passenger.ride_id].append((passenger, {
+            "name": username,
+            "email": passenger.confirmation_email,
+            "booking_id": passenger.id,
+            "accepted_proposals": accepted_by_booking[passenger.id]
+        }))
+
+    # Separate one-time and commuting rides
+    published_rides = {"one_time": [], "commuting": []}
+
+    for ride in user_published_rides:
+        if ride.category == "one-time":
+            published_rides["one_time"].append({
+                "ride_id": ride.id,
+                "from": ride.from_location,
+                "to": ride.to_location,
+                "date": ride.date_time.strftime('%Y-%m-%d'),
+                "time": ride.date_time.strftime('%H:%M'),
+                "price": ride.price_per_seat,
+                "passengers": [data for _, data in passengers_by_ride[ride.id]]
+            })
+        else:  # Commuting rides
+            ride_data = {
+                "ride_id": ride.id,
+                "from": ride.from_location,
+                "to": ride.to_location,
+                "time": ride.commute_times,
+                "price": ride.price_per_seat,
+                "dates": {}
+            }
+
+            # Group passengers by ride date
+            for passenger, data in passengers_by_ride[ride.id]:
+                date_str = passenger.ride_date.strftime('%Y-%m-%d')
+                ride_data["dates"].setdefault(date_str, []).append(data)
+            published_rides["commuting"].append(ride_data)
+
+    # earnings logic (pre-aggregated per week, see DriverWeeklyEarnings)
+    weekly_earnings = DriverWeeklyEarnings.query.filter_by(driver_id=current_user.id).order_by(DriverWeeklyEarnings.week).all()
+    total_earnings = sum(week.amount for week in weekly_earnings)
+
+    # Create a list of tuples (week_str, earnings_amount, (start_date, end_date))
+    earnings_list = []
+    for week in weekly_earnings:
+        if round(week.amount, 2) == 0:
+            continue  # every payment in the week was refunded
+        year, week_num = week.week.split("-W")
+        start_date, end_date = get_week_dates(year, week_num)
+        date_range_str = f"{start_date.strftime('%d %b %Y')} to {end_date.strftime('%d %b %Y')}"
+        earnings_list.append((week.week, week.amount, date_range_str))
+
+    return render_template("dashboard.html",
+                            user=current_user,
+                            upcoming_journeys=upcoming_journeys,
+                            inactive_journeys=inactive_journeys,
+                            published_rides=published_rides,
+                            earnings_data=earnings_list,
+                            total_earnings=total_earnings)
+
+
+# Route for deleting a saved card 
+@bp.route("/delete_saved_card/<int:card_id>", methods=["DELETE"])
+@login_required
+def delete_saved_card(card_id):
+    saved_card = SavedCard.query.get(card_id)
+
+    if not saved_card or saved_card.user_id != current_user.id:
+        return jsonify({"success": False, "message": "Card not found or unauthorized"}), 403
+
+    db.session.delete(saved_card)
+    db.session.commit()
+
+    return jsonify({"success": True, "message": "Card deleted successfully"})
+
+
+# Route for cancelling a booking 
+@bp.route("/cancel_booking/<int:booking_id>", methods=["POST"])
+@login_required
+def cancel_booking(booking_id):
+    booking = book_ride.query.get(booking_id)
+
+    # get current UK time (timezone-aware)
+    london = london_timezone()
+    aware_now = datetime.now(london)
+    now = aware_now.replace(tzinfo=None)
+
+    if not booking or booking.user_id != current_user.id:
+        return jsonify({"success": False, "message": "Booking not found"}), 404
+
+    # Mark the booking as canceled, once: a repeated or concurrent cancel matches no row,
+    # so the seats are given back and the payment refunded only by the first one
+    table = book_ride.__table__
+    canceled = db.session.execute(
+        table.update()
+        .where(table.c.id == booking.id, table.c.user_id == current_user.id, table.c.status != "Canceled")
+        .values(status="Canceled", cancellation_timestamp=now)
+    )
+    if canceled.rowcount != 1:
+        db.session.rollback()
+        return jsonify({"success": False, "message": "Booking is already canceled"}), 409
+    PickupRoute.invalidate(db.session.connection(), booking.ride_id)  # the update above skips the booking events
+
+    ride = publish_ride.query.get(booking.ride_id)
+
+    # Find associated payment
+    payment = Payment.query.filter_by(book_ride_id=booking.id).first()
+
+    ride_time = booking.ride_date
+    time_difference = (ride_time - now).total_seconds() / 60  # Convert to minutes
+
+    if time_difference < 15:
+        # User is charged 75% of the fee
+        cancellation_fee = round(payment.amount * 0.75, 2)
+        refund_amount = round(payment.amount - cancellation_fee, 2)
+        # Update payment record
+        if payment:
+            payment.status = "Partially Refunded"
+            payment.refunded = True
+    else:
+        # Full refund
+        refund_amount = payment.amount
+        # Update payment record
+        if payment:
+            payment.status = "Refunded"
+            payment.refunded = True
+
+    # Restore seats for the canceled date
+    RideSeatInventory.release(ride.id, booking.ride_date.date(), booking.seats_selected)
+
+    db.session.commit()
+    remove_from_tracking(current_user.id, ride.id, booking.ride_date.strftime("%Y-%m-%d"))
+    metrics.count("cancellations_total", refund="partial" if time_difference < 15 else "full")
+    metrics.count("refunded_gbp_total", refund_amount)
+
+    return jsonify({"success": True, "message": f"Booking successfully canceled. Refund: £{refund_amount}"}), 200
+
+
+# Route to submit rating
+@bp.route('/api/submit_rating', methods=['POST'])
+@login_required
+def submit_rating():
+    try:
+        data = request.json
+        print("Incoming rating submission:", data)
+
+        ride_id = data.get("ride_id")
+        rating = data.get("rating")
+        ride_date_str = data.get("ride_date")  # for commuting
+
+        if ride_id is None or rating is None:
+            return jsonify({"error": "Missing ride_id or rating"}), 400
+
+        ride = publish_ride.query.get_or_404(ride_id)
+        user_id = current_user.id
+
+        # If commuting, parse ride_date and filter on that day
+        if ride.category == "commuting":
+            if not ride_date_str:
+                return jsonify({"error": "Missing ride_date for commuting ride"}), 400
+            ride_date = datetime.strptime(ride_date_str, "%Y-%m-%d").date()
+            booking_query = book_ride.query.filter(
+                and_(
+                    book_ride.user_id == user_id,
+                    book_ride.ride_id == ride_id,
+                    book_ride.on_date(ride_date)
+                )
+            )
+        else:
+            booking_query = book_ride.query.filter_by(user_id=user_id, ride_id=ride_id)
+
+        booking = booking_query.first()
+        print("Booking:", booking)
+
+        # Check if already rated
+        if ride.category == "commuting":
+            existing = RideRating.query.filter_by(
+                ride_id=ride_id,
+                passenger_id=user_id,
+                ride_date=ride_date
+            ).first()
+        else:
+            existing = RideRating.query.filter_by(
+                ride_id=ride_id,
+                passenger_id=user_id
+            ).first()
+
+        if existing:
+            print("You already rated this ride.")
+            return jsonify({
+                "message": "You already rated this ride.",
+                "redirect_url": url_for("booking.dashboard")
+            })
+
+
+        # Add new rating
+        rating_entry = RideRating(
+            ride_id=ride_id,
+            passenger_id=user_id,
+            rating=rating
+        )
+        if ride.category == "commuting":
+            rating_entry.ride_date = ride_date
+
+        db.session.add(rating_entry)
+
+        if booking:
+            print("Booking found. Marking as done.")
+            booking.status = "done"
+        else:
+            print("No booking found to mark as done.")
+
+        db.session.commit()
+        return jsonify({"message": "Rating submitted successfully!", "redirect_url": url_for("booking.dashboard")})
+
+    except Exception:
+        return jsonify({"error": "Server error occurred."}), 500
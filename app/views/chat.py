@@ -0,0 +1,272 @@
+from flask import Blueprint, current_app, render_template, request, jsonify
+from flask_login import login_required, current_user
+from app import db
+from app.models import User, book_ride, Payment, ChatMessage, EditProposal, UnreadMessageCount
+from datetime import datetime
+from sqlalchemy import literal, tuple_
+from app.realtime import push_chat_item, notify_new_message
+from app.metrics import metrics
+
+
+# Chat between the driver and a passenger, and pickup / time / cost proposals
+bp = Blueprint("chat", __name__)
+
+
+# Route to view the chat
+@bp.route('/chat/<int:booking_id>')
+@login_required
+def chat_view(booking_id):
+    booking = book_ride.query.get_or_404(booking_id)
+    if current_user.id not in [booking.user_id, booking.ride.driver_id]:
+        return "Unauthorized", 403
+
+    passenger = User.query.get(booking.user_id)
+    driver = User.query.get(booking.ride.driver_id)
+
+    ride_title = f"{booking.ride.from_location.split(',')[0]} → {booking.ride.to_location.split(',')[0]}"
+
+    
+    return render_template("chat.html", booking=booking, driver_name=driver.username if driver else "Unknown",
+                            passenger_name=passenger.username if passenger else "Unknown", ride_title=ride_title)
+
+
+# Route to send message 
+@bp.route('/send_message', methods=['POST'])
+@login_required
+def send_message():
+    data = request.get_json()
+    booking_id = data.get("booking_id")
+    message = data.get("message")
+
+    if not message:
+        return jsonify({"error": "Empty message"}), 400
+
+    booking = book_ride.query.get_or_404(booking_id)
+    if current_user.id not in [booking.user_id, booking.ride.driver_id]:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    new_msg = ChatMessage(
+        booking_id=booking_id,
+        sender_username=current_user.username,
+        message=message
+    )
+    db.session.add(new_msg)
+    db.session.commit()
+    metrics.count("chat_messages_total")
+
+    # Push to everyone in the chat, and notify the other party wherever they are on the site
+    push_chat_item(booking, new_msg.to_chat_item())
+    recipient_id = booking.ride.driver_id if current_user.id == booking.user_id else booking.user_id
+    notify_new_message(recipient_id, new_msg)
+
+    return jsonify(new_msg.to_dict()), 200
+
+
+# Page size limits for /get_messages
+CHAT_PAGE_SIZE = 50
+CHAT_MAX_PAGE_SIZE = 200
+
+
+# Read a chat cursor from ?<prefix>_ts=<item ts>&<prefix>_type=<item type>&<prefix>_id=<item id>
+# Without _type/_id the cursor is just the time; raises ValueError on a malformed cursor
+def parse_chat_cursor(prefix):
+    ts = request.args.get(f"{prefix}_ts")
+    if not ts:
+        return None
+    item_type = request.args.get(f"{prefix}_type", "message")
+    if item_type not in ("message", "proposal"):
+        raise ValueError(f"Invalid {prefix}_type")
+    return datetime.fromisoformat(ts), item_type, request.args.get(f"{prefix}_id", type=int)
+
+
+# One page of a booking's chat (messages and proposals), oldest first
+# Both tables are merged and paged in one UNION query ordered by (timestamp, type, id);
+# `since` gives the items after a cursor, `before` the latest `limit` items before one
+def chat_history(booking_id, since=None, before=None, limit=CHAT_PAGE_SIZE):
+    history = db.union_all(
+        db.select(literal("message").label("type"), ChatMessage.id.label("id"), ChatMessage.timestamp.label("timestamp"))
+        .where(ChatMessage.booking_id == booking_id),
+        db.select(literal("proposal").label("type"), EditProposal.id.label("id"), EditProposal.timestamp.label("timestamp"))
+        .where(EditProposal.booking_id == booking_id)
+    ).subquery()
+    key = [history.c.timestamp, history.c.type, history.c.id]
+
+    query = db.select(history.c.type, history.c.id)
+    for cursor, newer in ((since, True), (before, False)):
+        if cursor is None:
+            continue
+        ts, item_type, item_id = cursor
+        if item_id is None:
+            query = query.where(history.c.timestamp > ts if newer else history.c.timestamp < ts)
+        elif newer:
+            query = query.where(tuple_(*key) > tuple_(ts, item_type, item_id))
+        else:
+            query = query.where(tuple_(*key) < tuple_(ts, item_type, item_id))
+
+    if since is not None:
+        rows = db.session.execute(query.order_by(*key).limit(limit)).all()
+    else:
+        rows = db.session.execute(query.order_by(*[column.desc() for column in key]).limit(limit)).all()[::-1]
+
+    message_ids = [row.id for row in rows if row.type == "message"]
+    proposal_ids = [row.id for row in rows if row.type == "proposal"]
+    items = {}
+    if message_ids:
+        items.update({("message", msg.id): msg for msg in ChatMessage.query.filter(ChatMessage.id.in_(message_ids))})
+    if proposal_ids:
+        items.update({("proposal", prop.id): prop for prop in EditProposal.query.filter(EditProposal.id.in_(proposal_ids))})
+    return [items[(row.type, row.id)].to_chat_item() for row in rows]
+
+
+# Route to get messages 
+# Incremental: ?since_ts=&since_type=&since_id= (last item seen) returns only newer items;
+# ?before_ts=&before_type=&before_id= (first item shown) pages back through long chats; ?limit=<n>
+@bp.route('/get_messages/<int:booking_id>')
+@login_required
+def get_messages(booking_id):
+    booking = book_ride.query.get_or_404(booking_id)
+    if current_user.id not in [booking.user_id, booking.ride.driver_id]:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    try:
+        since = parse_chat_cursor("since")
+        before = parse_chat_cursor("before")
+    except ValueError:
+        return jsonify({"error": "Invalid cursor"}), 400
+    limit = request.args.get("limit", CHAT_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, CHAT_MAX_PAGE_SIZE))
+
+    return jsonify(chat_history(booking_id, since=since, before=before, limit=limit))
+
+
+# Route to check for new messages
+# Answers from the per-user unread counter; unchanged counters get a 304 (ETag) without touching the messages
+@bp.route('/check_new_messages')
+@login_required
+def check_new_messages():
+    unread_count, version = UnreadMessageCount.get(current_user.id)
+    etag = f"unread-{current_user.id}-{version}"
+
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    elif not unread_count:
+        response = jsonify({"new": False})
+    else:
+        recent_messages = ChatMessage.query.filter(
+            ChatMessage.received_by(current_user),
+            ChatMessage.unseen()
+        ).order_by(ChatMessage.timestamp.desc()).limit(5).all()
+
+        messages_data = [
+            {
+                "sender": msg.sender_username,
+                "booking_id": msg.booking_id,
+                "message_id": msg.id
+            } for msg in recent_messages
+        ]
+        response = jsonify({"new": bool(messages_data), "count": unread_count, "messages": messages_data})
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+# Route to check if the messae is seen
+@bp.route('/mark_message_seen/<int:message_id>', methods=['POST'])
+@login_required
+def mark_message_seen(message_id):
+    ChatMessage.query.get_or_404(message_id)
+    ChatMessage.mark_seen(current_user, message_ids=[message_id])  # Only the receiver can mark it seen
+    db.session.commit()
+    return jsonify(success=True)
+
+
+# Route to mark many messages seen at once: {"booking_id": <id>} (everything received in that chat)
+# and/or {"message_ids": [...]}
+@bp.route('/mark_messages_seen', methods=['POST'])
+@login_required
+def mark_messages_seen():
+    data = request.get_json(silent=True) or {}
+    booking_id = data.get("booking_id")
+    message_ids = data.get("message_ids")
+
+    if booking_id is None and message_ids is None:
+        return jsonify({"success": False, "error": "booking_id or message_ids is required"}), 400
+    try:
+        booking_id = int(booking_id) if booking_id is not None else None
+        message_ids = [int(message_id) for message_id in message_ids] if message_ids is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid ids"}), 400
+
+    marked = ChatMessage.mark_seen(current_user, message_ids=message_ids, booking_id=booking_id)
+    db.session.commit()
+    return jsonify({"success": True, "marked": marked})
+
+
+# Route to handle edit proposals
+@bp.route('/propose_edit', methods=['POST'])
+@login_required
+def propose_edit():
+    data = request.get_json()
+    booking_id = data.get("booking_id")
+    pickup = data.get("pickup")
+    time = data.get("time")
+    cost = data.get("cost")
+
+    booking = book_ride.query.get_or_404(booking_id)
+
+    if current_user.id not in [booking.user_id, booking.ride.driver_id]:
+        return jsonify({"success": False, "error": "Unauthorized"}), 403
+
+    proposal = EditProposal(
+        booking_id=booking_id,
+        sender=current_user.username,
+        proposed_pickup=pickup or None,
+        proposed_time=time or None,
+        proposed_cost=float(cost) if cost else None,
+    )
+
+    db.session.add(proposal)
+    db.session.commit()
+
+    push_chat_item(booking, proposal.to_chat_item())
+
+    return jsonify({"success": True})
+
+
+# Route to respond to the proposals 
+@bp.route('/respond_proposal', methods=['POST'])
+@login_required
+def respond_proposal():
+    data = request.get_json()
+    proposal_id = data.get("proposal_id")
+    action = data.get("action")  # accept or reject
+
+    proposal = EditProposal.query.get_or_404(proposal_id)
+    booking = book_ride.query.get_or_404(proposal.booking_id)
+
+    # Only the other party can respond
+    if current_user.username == proposal.sender:
+        return jsonify({"success": False, "error": "Cannot respond to your own proposal"}), 403
+
+    if action == "accept":
+        proposal.status = "accepted"
+        if proposal.proposed_pickup:
+            booking.pickup_point = proposal.proposed_pickup
+        if proposal.proposed_time:
+            booking.time = proposal.proposed_time
+        if proposal.proposed_cost is not None:
+            booking.cost = proposal.proposed_cost
+            # Update payment as well
+            payment = Payment.query.filter_by(book_ride_id=booking.id).first()
+            if payment:
+                payment.amount = proposal.proposed_cost * booking.seats_selected
+
+    elif action == "reject":
+        proposal.status = "rejected"
+    else:
+        return jsonify({"success": False, "error": "Invalid action"}), 400
+
+    db.session.commit()
+    push_chat_item(booking, proposal.to_chat_item())
+    return jsonify({"success": True})
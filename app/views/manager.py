@@ -0,0 +1,92 @@
+from flask import Blueprint, render_template, request, jsonify
+from flask_login import login_required
+from app import db
+from app.models import PlatformSetting, PlatformCounter, PlatformDailyRevenue
+from collections import defaultdict
+from app.utils import manager_required, get_week_dates
+
+
+# Manager portal: platform stats and fees
+bp = Blueprint("manager", __name__)
+
+
+# Route for the manager dashboard
+@bp.route('/manager/dashboard')
+@login_required
+@manager_required
+def manager_dashboard():
+    # Counters and daily revenue are kept up to date by model events (see PlatformCounter / PlatformDailyRevenue)
+    total_bookings = PlatformCounter.get("bookings")
+    total_rides_published = PlatformCounter.get("rides_published")
+
+    daily_revenue = PlatformDailyRevenue.query.order_by(PlatformDailyRevenue.day).all()
+
+    # Total platform earnings, and per fee rate
+    total_revenue = sum(row.platform_fees for row in daily_revenue)
+    fee_rate_totals = defaultdict(lambda: [0, 0.0, 0.0])
+    for row in daily_revenue:
+        totals = fee_rate_totals[row.fee_rate]
+        totals[0] += row.payments
+        totals[1] += row.amount
+        totals[2] += row.platform_fees
+    fee_rate_list = [(f"{fee_rate * 100:g}%", payments, round(amount, 2), round(fees, 2))
+                     for fee_rate, (payments, amount, fees) in sorted(fee_rate_totals.items()) if payments]
+
+    # Weekly earnings logic
+    weekly_earnings = defaultdict(float)
+    for row in daily_revenue:
+        weekly_earnings[row.day.strftime("%Y-W%U")] += row.platform_fees
+
+    # Format for table
+    weekly_earnings_list = []
+    for week_str, amount in sorted(weekly_earnings.items()):
+        year, week_num = week_str.split("-W")
+        start_date, end_date = get_week_dates(year, week_num)
+        date_range = f"{start_date.strftime('%d %b %Y')} - {end_date.strftime('%d %b %Y')}"
+        weekly_earnings_list.append((week_str, round(amount, 2), date_range))
+
+    # Extract for chart.js
+    labels = [entry[0] for entry in weekly_earnings_list]
+    values = [entry[1] for entry in weekly_earnings_list]
+    date_ranges = [entry[2] for entry in weekly_earnings_list]
+
+    return render_template(
+        "management/manager_dashboard.html",
+        total_bookings=total_bookings,
+        total_rides_published=total_rides_published,
+        total_revenue=round(total_revenue, 2),
+        fee_rate_totals=fee_rate_list,
+        weekly_earnings=weekly_earnings_list,
+        earnings_chart_labels=labels,
+        earnings_chart_values=values,
+        earnings_chart_dates=date_ranges
+    )
+
+
+# Route to configure fee 
+@bp.route("/manager/configure_fee", methods=["GET", "POST"])
+@login_required
+@manager_required
+def configure_fee():
+    setting = PlatformSetting.query.filter_by(key="platform_fee").first()
+
+    if request.method == "POST":
+        new_value = request.form.get("fee")
+        try:
+            new_fee = float(new_value)
+            if not 0 <= new_fee <= 1:
+                return jsonify({"success": False, "message": "Fee must be between 0 and 1."}), 400
+            else:
+                if setting:
+                    setting.value = str(new_fee)
+                else:
+                    setting = PlatformSetting(key="platform_fee", value=str(new_fee))
+                    db.session.add(setting)
+                db.session.commit()
+                return jsonify({"success": True, "message": "Platform fee updated successfully."})
+        except ValueError:
+            return jsonify({"success": False, "message": "Invalid input. Please enter a number."}), 400
+
+    # If GET request
+    current_fee = float(setting.value) if setting else 0.005
+    return render_template("management/configure_fee.html", current_fee=current_fee)
@@ -0,0 +1,454 @@
+import json
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask_login import login_required, current_user
+from app import db
+from app.models import publish_ride, book_ride, RideSeatInventory
+from datetime import datetime, time
+from sqlalchemy import or_
+from app.utils import london_timezone
+from app.geocoding import geocode, resolve_in_background
+from app.search import search_ride_ids, suggest_locations, search_nearby_rides
+
+
+# Home page, publishing rides and searching for them
+bp = Blueprint("rides", __name__)
+
+
+# Route for home page
+@bp.route('/')
+def home():
+    return render_template('index.html', user=current_user)
+
+
+# Route for publish ride by the driver
+@bp.route('/publish_ride', methods=['GET', 'POST'])
+@login_required
+def publish_ride_view():
+    if request.method == 'POST':
+        from_location = request.form.get('from_location')
+        to_location = request.form.get('to_location')
+        category = request.form.get('category')
+        driver_name = current_user.username
+        price_input = request.form.get('price_per_seat')
+        if not price_input:
+            flash("Price per seat is required.", "danger")
+            return redirect(url_for('rides.publish_ride_view'))
+        
+        try:
+            price_per_seat = float(price_input)
+        except ValueError:
+            flash("Invalid price format.", "danger")
+            return redirect(url_for('rides.publish_ride_view'))
+
+         # Validation messages for testing
+        if not from_location or not to_location or not category or not request.form.get('price_per_seat'):
+            return jsonify({"error": "All fields are required."}), 400
+
+        if price_per_seat < 1:
+            return jsonify({"error": "Price per seat must be at least 1."}), 400
+
+        available_seats = int(request.form.get('available_seats', 0))
+        if available_seats < 1:
+            return jsonify({"error": "Available seats must be at least 1."}), 400
+        
+        # Initialize variables
+        date_time = None
+        recurrence_dates = None
+        commute_times = None
+        available_seats_per_date = None
+        available_seats = None  
+        
+        if category == "one-time":
+            date_time_str = request.form.get('date_time')
+            available_seats = int(request.form.get('available_seats', 0))  
+            
+            if not date_time_str:
+                flash("Please select a valid Date & Time for one-time rides.", "danger")
+                return redirect(url_for('rides.publish_ride_view'))
+            try:
+                date_time = datetime.strptime(date_time_str, "%Y-%m-%d %H:%M")
+            except ValueError:
+                flash("Invalid Date & Time format!", "danger")
+                return redirect(url_for('rides.publish_ride_view'))
+            
+            available_seats_per_date = json.dumps({date_time.strftime("%Y-%m-%d"): available_seats})
+            print(f"Storing available_seats_per_date: {available_seats_per_date}")
+
+        else:  # **Commuting Ride (Multiple Recurring Days & Times)**
+            recurrence_dates_list = request.form.getlist('recurrence_dates')
+            commute_times_list = request.form.getlist('commute_times')
+            available_seats = int(request.form.get('available_seats', 0))  
+            
+            if not recurrence_dates_list or not commute_times_list:
+                flash("Please select at least one commute day and time.", "danger")
+                return redirect(url_for('rides.publish_ride_view'))
+            
+            recurrence_dates = ",".join(recurrence_dates_list)
+            commute_times = ",".join(commute_times_list)
+            # Split the recurrence_dates string properly
+            recurrence_dates_list = [date.strip() for date in recurrence_dates.split(",")]
+            # Ensure each date is stored as a separate key
+            seats_dict = {date: available_seats for date in recurrence_dates_list}
+            available_seats_per_date = json.dumps(seats_dict)  
+        
+        # Coordinates picked in the autocomplete, otherwise from the geocode cache; addresses that
+        # aren't cached yet are geocoded in the background once the ride is saved
+        from_lat, from_lon = get_form_coordinates("from_location", from_location)
+        to_lat, to_lon = get_form_coordinates("to_location", to_location)
+
+        # Save the Ride
+        new_ride = publish_ride(
+            driver_id=current_user.id,
+            driver_name=driver_name,
+            from_location=from_location,
+            to_location=to_location,
+            date_time=date_time,
+            available_seats_per_date=available_seats_per_date,  # Only for commuting rides
+            price_per_seat=price_per_seat,
+            category=category,
+            recurrence_dates=recurrence_dates,
+            commute_times=commute_times,
+            is_available=True,
+            from_lat=from_lat,
+            from_lon=from_lon,
+            to_lat=to_lat,
+            to_lon=to_lon
+        )
+        db.session.add(new_ride)
+        db.session.commit()
+        if from_lat is None or to_lat is None:
+            resolve_in_background(new_ride.id)
+        flash("Your ride has been published successfully!", "success")
+        return redirect(url_for('rides.view_journeys'))
+    
+    return render_template('publish_ride.html', user=current_user)
+
+
+# Helper for /publish_ride: coordinates from the hidden <field>_lat / <field>_lon inputs, or cached ones
+def get_form_coordinates(field, address):
+    try:
+        lat = float(request.form.get(f"{field}_lat", ""))
+        lon = float(request.form.get(f"{field}_lon", ""))
+        if -90 <= lat <= 90 and -180 <= lon <= 180:
+            return lat, lon
+    except ValueError:
+        pass
+    return geocode(address, cached_only=True)
+
+
+# Page size limits for /view_journeys
+JOURNEYS_PAGE_SIZE = 20
+JOURNEYS_MAX_PAGE_SIZE = 100
+
+
+# Route for viewing ride by the passenger/user
+# Paginated by ride id (keyset): ?cursor=<last ride id seen>&page_size=<n>
+@bp.route('/view_journeys')
+def view_journeys():
+
+    # get current UK time (timezone-aware)
+    london = london_timezone()
+    aware_now = datetime.now(london)
+    now = aware_now.replace(tzinfo=None)
+
+    db.session.commit()  
+    db.session.expire_all()  
+
+    cursor = request.args.get("cursor", 0, type=int)
+    page_size = request.args.get("page_size", JOURNEYS_PAGE_SIZE, type=int)
+    page_size = max(1, min(page_size, JOURNEYS_MAX_PAGE_SIZE))
+
+    # Past one-time rides and rides with no seats left on any future date are excluded in SQL
+    rides = publish_ride.query.filter(
+        publish_ride.id > cursor,
+        or_(publish_ride.category != "one-time", publish_ride.date_time >= now),
+        RideSeatInventory.has_seats(1, from_date=now.date())
+    ).order_by(publish_ride.id).limit(page_size + 1).all()
+
+    # One extra row tells us whether there is another page
+    next_cursor = None
+    if len(rides) > page_size:
+        rides = rides[:page_size]
+        next_cursor = rides[-1].id
+
+    seat_maps = RideSeatInventory.seats_for_rides([ride.id for ride in rides], from_date=now.date())
+    journeys = []
+
+    for ride in rides:
+        seat_data = seat_maps.get(ride.id, {})
+
+        # Filter out today's date from commuting rides once the commute has left (for display only)
+        if ride.category == "commuting":
+            filtered_seats = {}
+            commute_times = []
+            try:
+                commute_times = [datetime.strptime(t.strip(), "%H:%M").time() for t in ride.commute_times.split(",") if t.strip()]
+            except Exception as e:
+                print(f"error: Failed to parse commute_times: {ride.commute_times} — {e}")
+
+            earliest_time = min(commute_times) if commute_times else time(0, 0)
+
+            for date, seats in seat_data.items():
+                try:
+                    dt = datetime.combine(datetime.strptime(date, "%Y-%m-%d").date(), earliest_time)
+                    if dt >= now:
+                        filtered_seats[date] = seats
+                except Exception as e:
+                    print(f"error: Could not parse datetime for {date}: {e}")
+            seat_data = filtered_seats
+
+        # Skip journeys where no future dates have seats left
+        if not any(seats > 0 for seats in seat_data.values()):
+            continue
+
+        ride.seat_tracking = seat_data
+        journeys.append(ride)
+    
+    booked_journey_ids = set()
+    
+    if current_user.is_authenticated and journeys:
+        booked_journey_ids = {
+            ride_id for (ride_id,) in db.session.query(book_ride.ride_id).filter(
+                book_ride.user_id == current_user.id,
+                book_ride.ride_id.in_([journey.id for journey in journeys])
+            ).distinct()
+        }
+    
+    for journey in journeys:
+        journey.user_has_booked = journey.id in booked_journey_ids
+    
+    return render_template('view_journeys.html', journeys=journeys, user=current_user,
+                           next_cursor=next_cursor, page_size=page_size)
+
+
+# Route to get available dates
+@bp.route('/api/get_available_dates/<int:ride_id>', methods=['GET'])
+def get_available_dates(ride_id):
+    # get current UK time (timezone-aware)
+    london = london_timezone()
+    aware_now = datetime.now(london)
+    now = aware_now.replace(tzinfo=None)
+
+    ride = publish_ride.query.get_or_404(ride_id)
+    # ensure recurrence_dates exists and is not empty
+    if not ride.recurrence_dates or ride.recurrence_dates.strip() == "":
+        return jsonify({"available_dates": []})
+    
+    commute_time = ride.commute_times.strip() if ride.commute_times else None
+    
+    # every date after today, and today only if time is after current time
+    available_dates = []
+    for date_str in ride.recurrence_dates.split(","):
+        date_str = date_str.strip()
+        try:
+            combined_dt = datetime.strptime(f"{date_str} {commute_time}", "%Y-%m-%d %H:%M")
+            if combined_dt > now:
+                available_dates.append(date_str)
+        except ValueError:
+            continue
+    return jsonify({"available_dates": available_dates})
+
+
+# Route to get available seats
+@bp.route('/api/get_available_seats/<int:ride_id>', methods=['GET', 'POST'])
+def get_available_seats(ride_id):
+
+    # get current UK time (timezone-aware)
+    london = london_timezone()
+    aware_now = datetime.now(london)
+    now = aware_now.replace(tzinfo=None)
+
+    ride = publish_ride.query.get_or_404(ride_id)
+
+    if request.method == 'POST':
+        data = request.json  
+        selected_dates = data.get("selected_dates", [])
+        if isinstance(selected_dates, str):
+            selected_dates = [date.strip() for date in selected_dates.split(",") if date.strip()]
+    else:
+        selected_dates = request.args.get("selected_dates", "").split(",")
+    
+    requested_dates = []
+    for date in selected_dates:
+        try:
+            requested_dates.append(datetime.strptime(date.strip(), "%Y-%m-%d").date())
+        except ValueError:
+            continue
+    seat_tracking = RideSeatInventory.seats_by_date(ride.id, dates=requested_dates)
+
+    # Filter out past dates and only include selected ones
+    filtered_seats = {}
+
+    for date in selected_dates:
+        if date in seat_tracking:
+            try:
+                # Combine the date with the earliest commute time (default to 00:00)
+                commute_time = ride.commute_times.strip().split(",")[0] if ride.commute_times else "00:00"
+                commute_dt = datetime.strptime(f"{date} {commute_time}", "%Y-%m-%d %H:%M")
+                if commute_dt >= now:
+                    filtered_seats[date] = seat_tracking[date]
+            except Exception as e:
+                print(f"Failed to parse commute time for {date}: {e}")
+    print(filtered_seats)
+
+    return jsonify({"available_seats": filtered_seats})
+
+
+# Route for searching a journey
+@bp.route('/filter_journeys', methods=['GET'])
+def filter_journeys():
+    from_location = request.args.get("from", "").strip()
+    to_location = request.args.get("to", "").strip()
+    date = request.args.get("date", "").strip()
+    category = request.args.get("category", "").strip()
+    max_price = request.args.get("price", "").strip()
+    passengers = int(request.args.get("passengers", 1))
+
+    query_filters = []
+
+    # Locations are matched through the full-text location index (ILIKE where the database has none)
+    ranked_ids = search_ride_ids(from_location, to_location) if from_location or to_location else None
+    if ranked_ids is not None:
+        query_filters.append(publish_ride.id.in_(ranked_ids))
+    else:
+        if from_location:
+            query_filters.append(publish_ride.from_location.ilike(f"%{from_location}%"))
+        if to_location:
+            query_filters.append(publish_ride.to_location.ilike(f"%{to_location}%"))
+    if max_price:
+        query_filters.append(publish_ride.price_per_seat <= float(max_price))
+
+    journeys = []
+
+    # Seat availability is checked against the seat inventory in SQL (on the searched date if given)
+    search_date = None
+    if date:
+        try:
+            search_date = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            return render_template('view_journeys.html', journeys=journeys, user=current_user)
+    query_filters.append(RideSeatInventory.has_seats(passengers, on_date=search_date))
+
+    # One-Time Rides Query
+    if not category or category == "one-time":
+        one_time_rides = publish_ride.query.filter(
+            *query_filters,
+            publish_ride.category == "one-time",
+            publish_ride.is_available == True
+        ).all()
+        seat_maps = RideSeatInventory.seats_for_rides([ride.id for ride in one_time_rides])
+
+        for ride in one_time_rides:
+            journeys.append({
+                "id": ride.id,
+                "from_location": ride.from_location,
+                "to_location": ride.to_location,
+                "date_time": ride.date_time,
+                "seat_tracking": seat_maps[ride.id],
+                "price_per_seat": ride.price_per_seat,
+                "category": ride.category,
+                "driver_name": ride.driver_name,
+                "user_has_booked": False,
+                "recurrence_dates": None,
+                "commute_times": None
+            })
+
+    # Commuting Rides Query
+    if not category or category == "commuting":
+        commuting_rides = publish_ride.query.filter(
+            *query_filters,
+            publish_ride.category == "commuting",
+            publish_ride.is_available == True
+        ).all()
+        seat_maps = RideSeatInventory.seats_for_rides([ride.id for ride in commuting_rides])
+
+        for ride in commuting_rides:
+            journeys.append({
+                "id": ride.id,
+                "from_location": ride.from_location,
+                "to_location": ride.to_location,
+                "date_time": None,
+                "seat_tracking": seat_maps[ride.id],
+                "price_per_seat": ride.price_per_seat,
+                "category": ride.category,
+                "driver_name": ride.driver_name,
+                "user_has_booked": False,
+                "recurrence_dates": ride.recurrence_dates,
+                "commute_times": ride.commute_times
+            })
+
+    # Best location matches first
+    if ranked_ids:
+        rank = {ride_id: position for position, ride_id in enumerate(ranked_ids)}
+        journeys.sort(key=lambda journey: rank.get(journey["id"], len(rank)))
+
+    return render_template('view_journeys.html', journeys=journeys, user=current_user)
+
+
+# Radius limits for /api/search_nearby (metres)
+NEARBY_DEFAULT_RADIUS = 1000
+NEARBY_MAX_RADIUS = 20000
+
+
+# Route for searching rides by pickup/dropoff radius
+# ?from_lat=&from_lon=&to_lat=&to_lon=&radius=<metres>[&date=YYYY-MM-DD][&passengers=n]
+@bp.route('/api/search_nearby', methods=['GET'])
+def search_nearby():
+    try:
+        from_point = (float(request.args["from_lat"]), float(request.args["from_lon"]))
+        to_point = (float(request.args["to_lat"]), float(request.args["to_lon"]))
+        radius = float(request.args.get("radius", NEARBY_DEFAULT_RADIUS))
+        passengers = int(request.args.get("passengers", 1))
+        date = request.args.get("date", "").strip()
+        search_date = datetime.strptime(date, "%Y-%m-%d").date() if date else None
+    except (KeyError, ValueError):
+        return jsonify({"error": "from_lat, from_lon, to_lat and to_lon are required numbers"}), 400
+
+    if not 0 < radius <= NEARBY_MAX_RADIUS:
+        return jsonify({"error": f"Radius must be between 0 and {NEARBY_MAX_RADIUS} metres"}), 400
+
+    # get current UK time (timezone-aware)
+    london = london_timezone()
+    now = datetime.now(london).replace(tzinfo=None)
+
+    query_filters = [
+        publish_ride.is_available == True,
+        or_(publish_ride.category != "one-time", publish_ride.date_time >= now),
+        RideSeatInventory.has_seats(passengers, on_date=search_date, from_date=now.date())
+    ]
+    matches = search_nearby_rides(from_point, to_point, radius, query_filters)
+
+    return jsonify({"rides": [
+        {
+            "id": ride.id,
+            "from_location": ride.from_location,
+            "to_location": ride.to_location,
+            "category": ride.category,
+            "date_time": ride.date_time.strftime("%Y-%m-%d %H:%M") if ride.date_time else None,
+            "recurrence_dates": ride.recurrence_dates,
+            "commute_times": ride.commute_times,
+            "price_per_seat": ride.price_per_seat,
+            "driver_name": ride.driver_name,
+            "pickup_distance_m": round(pickup_m),
+            "dropoff_distance_m": round(dropoff_m),
+            "detour_m": round(pickup_m + dropoff_m)
+        }
+        for ride, pickup_m, dropoff_m in matches
+    ]})
+
+
+# Route for location typeahead in the search banner
+@bp.route('/api/location_suggestions', methods=['GET'])
+def location_suggestions():
+    search_text = request.args.get("q", "").strip()
+    field = request.args.get("field", "from")
+
+    if len(search_text) < 2 or field not in ("from", "to"):
+        return jsonify({"suggestions": []})
+
+    return jsonify({"suggestions": suggest_locations(search_text, field=field)})
+
+
+# Helper Function to Get Coordinates (cached, see app/geocoding.py)
+def get_coordinates_from_address(address):
+    return geocode(address)
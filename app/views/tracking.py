@@ -0,0 +1,434 @@
+from flask import Blueprint, render_template, request, jsonify
+from flask_login import login_required, current_user
+from app import db
+from app.models import User, publish_ride, book_ride
+from datetime import datetime
+from sqlalchemy import not_
+from app.realtime import push_location, push_ride_status, check_geofences, tracking_role
+from app.geofence import geofence_engine, build_ride_fences, ensure_ride_fences
+from app.routing import get_pickup_route
+from app.location_store import location_store, location_ride_key
+from app.proximity import proximity
+
+
+# Pickup pages, live location tracking and journey status
+bp = Blueprint("tracking", __name__)
+
+
+# The current user's role in a tracked ride, checked like joining its room (app/realtime.py):
+# "driver", "passenger" (booked, on that date for commuting rides) or None for anyone else
+def ride_role(ride_key):
+    return tracking_role(publish_ride.query.get(ride_key[0]), ride_key[1])
+
+
+@bp.route('/view_pickup/<int:ride_id>', methods=['GET'])
+@login_required
+def view_pickup(ride_id):
+    ride = publish_ride.query.get_or_404(ride_id)
+    driver = User.query.get(ride.driver_id)
+
+    booking = book_ride.query.filter_by(ride_id=ride_id, user_id=current_user.id).first()
+    is_passenger = booking is not None
+    is_driver = (ride.driver_id == current_user.id)
+
+    passenger = None
+    if is_passenger:
+        passenger = User.query.get(booking.user_id)
+
+    if is_passenger and not is_driver:
+        ride_date = booking.ride_date.strftime("%Y-%m-%d") if booking.ride_date else "N/A"
+        return render_template("pickup_passenger.html", ride_id=ride_id, ride=ride,
+                               driver_name=driver.username if driver else "Unknown",
+                               passenger_name=passenger.username if passenger else None,
+                               ride_status=booking.status, ride_date=ride_date)
+
+    elif is_driver and not is_passenger:
+        passenger_bookings = book_ride.query.filter(book_ride.ride_id == ride_id, not_(book_ride.status == 'Canceled')).all()
+        passenger_names = [User.query.get(pb.user_id).username for pb in passenger_bookings]
+
+        # Default to "Booked"
+        ride_status = "Booked"
+
+        # Safely prioritize the most accurate status
+        for pb in passenger_bookings:
+            if pb.status == "done":
+                ride_status = "done"
+                break
+            elif pb.status == "ongoing" and ride_status != "done":
+                ride_status = "ongoing"
+                # but only if no "done" detected
+
+        print("Final ride_status being passed:", ride_status)
+
+        # To extract date for one-time
+        ride_date = ride.date_time.strftime("%Y-%m-%d") if ride.date_time else "N/A"
+
+        return render_template("pickup_driver.html", ride_id=ride_id, ride=ride,
+                            ride_status=ride_status,
+                            driver_name=driver.username if driver else "Unknown",
+                            passenger_names=passenger_names,  ride_date=ride_date)
+
+    elif is_passenger and is_driver:
+        # Edge case: Treat it like a driver only since a driver wouldn’t need to track themselves
+        passenger_bookings = book_ride.query.filter(book_ride.ride_id == ride_id, not_(book_ride.status == 'Canceled')).all()
+        passenger_names = [User.query.get(pb.user_id).username for pb in passenger_bookings]
+        
+        ride_status = "Booked"
+        for pb in passenger_bookings:
+            if pb.status == "done":
+                ride_status = "done"
+                break
+            elif pb.status == "ongoing":
+                ride_status = "ongoing"
+
+        ride_date = booking.ride_date.strftime("%Y-%m-%d") if booking.ride_date else "N/A"
+
+        return render_template("pickup_driver.html", ride_id=ride_id, ride=ride,
+                            ride_status=ride_status,
+                            driver_name=driver.username if driver else "Unknown",
+                            passenger_names=passenger_names,
+                            ride_date=ride_date)
+
+    else:
+        return "<h3><strong>Unauthorized access to this ride</strong></h3>", 403
+
+
+# API to get pickup location for a ride
+@bp.route('/api/get_pickup_location/<int:ride_id>', methods=['GET'])
+@login_required
+def get_pickup_location(ride_id):
+    ride = publish_ride.query.get_or_404(ride_id)
+    return jsonify({"from_location": ride.from_location}), 200
+
+
+# Passenger Updates Their Location
+@bp.route('/api/track_passenger_location', methods=['POST'])
+@login_required
+def track_passenger_location():
+    data = request.json
+    ride_id = data.get("ride_id")
+    lat = data.get("latitude")
+    lon = data.get("longitude")
+    ride_date = data.get("ride_date")  # For commuting rides
+    user_id = current_user.id          # Get current user ID
+
+    if not ride_id or not lat or not lon:
+        return jsonify({"error": "Invalid data"}), 400
+    try:
+        ride_key = location_ride_key(ride_id, ride_date)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid data"}), 400
+    if ride_role(ride_key) is None:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    location_store.set_passenger(*ride_key, user_id, current_user.username, lat, lon)
+    push_location(ride_key, {"passenger": {current_user.username: [lat, lon]}})
+    check_geofences(ride_key, "passenger", lat, lon)
+
+    return jsonify({"message": "Passenger location updated"}), 200
+
+
+# Driver Updates Their Location
+@bp.route('/api/track_driver_location', methods=['POST'])
+@login_required
+def track_driver_location():
+    data = request.json
+    ride_id = data.get("ride_id")
+    lat = data.get("latitude")
+    lon = data.get("longitude")
+    ride_date = data.get("ride_date")  
+
+    if not ride_id or not lat or not lon:
+        return jsonify({"error": "Invalid data"}), 400
+
+    try:
+        ride_key = location_ride_key(ride_id, ride_date)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid data"}), 400
+    if ride_role(ride_key) != "driver":
+        return jsonify({"error": "Only the driver can update the driver location"}), 403
+
+    location_store.set_driver(*ride_key, lat, lon)
+    push_location(ride_key, {"driver": [lat, lon]})
+    check_geofences(ride_key, "driver", lat, lon)
+
+    return jsonify({"message": "Driver location updated"}), 200
+
+
+# Route to get live location
+@bp.route('/api/get_live_locations/<int:ride_id>', methods=['GET'])
+@login_required
+def get_live_locations(ride_id):
+    # Passenger locations for one-time ride (username -> location)
+    driver_loc, passenger_locs = location_store.get_ride(*location_ride_key(ride_id))
+
+    # Distance / ETA to each passenger, and whether any of them is within 100 meters
+    distances = proximity(driver_loc, passenger_locs)
+
+    return jsonify({
+        "passenger": passenger_locs,
+        "driver": driver_loc,
+        "nearby": any(result["nearby"] for result in distances.values()),
+        "proximity": distances
+    })
+
+
+# API to track if passenger reached pickup point
+@bp.route('/api/check_arrival', methods=['POST'])
+@login_required
+def check_arrival():
+    data = request.json
+    try:
+        ride_key = location_ride_key(data.get("ride_id"), data.get("ride_date"))
+        user_lat, user_lon = float(data.get("latitude")), float(data.get("longitude"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid data"}), 400
+
+    ride = publish_ride.query.get_or_404(ride_key[0])
+    role = tracking_role(ride, ride_key[1])
+    if role is None:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    # The ride's geofences are built once (app/geofence.py), not geocoded / measured from scratch on every poll
+    if not any(fence.name == "pickup" for fence in ensure_ride_fences(ride_key, ride)):
+        return jsonify({"error": "Invalid pickup location"}), 400
+
+    check_geofences(ride_key, role, user_lat, user_lon)
+    if geofence_engine.state(ride_key, current_user.id, "pickup") == "arrived":  # Within 50 meters
+        return jsonify({"arrived": True, "message": "You have arrived at the pickup location!"})
+    else:
+        return jsonify({"arrived": False, "message": "Keep moving towards the pickup location."})
+
+
+# Route for Journey Status
+@bp.route("/api/start_journey", methods=["POST"])
+@login_required
+def start_journey():
+    data = request.get_json()
+    ride_id = data.get("ride_id")
+    ride_date_str = data.get("ride_date")
+
+    if not ride_id:
+        return jsonify({"error": "Missing ride ID"}), 400
+
+    ride = publish_ride.query.get_or_404(ride_id)
+
+    if ride.driver_id != current_user.id:
+        return jsonify({"error": "Only the driver can start the journey"}), 403
+
+    # One-time ride: no date needed
+    if ride.category == "one-time":
+        bookings = book_ride.query.filter_by(
+            ride_id=ride_id
+        ).all()
+    else:
+        # Commuting ride: ride_date is required
+        if not ride_date_str:
+            return jsonify({"error": "Missing ride date for commuting ride"}), 400
+
+        try:
+            ride_date = datetime.strptime(ride_date_str, "%Y-%m-%d").date()
+        except:
+            return jsonify({"error": "Invalid date format"}), 400
+
+        bookings = book_ride.query.filter(
+            book_ride.ride_id == ride_id,
+            book_ride.on_date(ride_date)
+        ).all()
+
+    for booking in bookings:
+        booking.status = "ongoing"
+
+    db.session.commit()
+    build_ride_fences(ride, location_ride_key(ride_id, ride_date_str))
+    push_ride_status(location_ride_key(ride_id, ride_date_str), "ongoing")
+    return jsonify({"message": "Journey started!"}), 200
+
+
+# Route for updating passenger pickup location
+@bp.route('/api/update_passenger_pickup_location', methods=['POST'])
+@login_required
+def update_passenger_pickup_location():
+    data = request.json
+    ride_id = data.get('ride_id')
+    lat = data.get('latitude')
+    lon = data.get('longitude')
+
+    # Validate inputs
+    if ride_id is None or lat is None or lon is None:
+        return jsonify({"error": "Missing ride_id or coordinates."}), 400
+
+    # Update the passenger's live location directly
+    try:
+        ride_key = location_ride_key(ride_id, data.get("ride_date"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid ride_id."}), 400
+    if ride_role(ride_key) is None:
+        return jsonify({"error": "Unauthorized"}), 403
+    location_store.set_passenger(*ride_key, current_user.id, current_user.username, lat, lon)
+    push_location(ride_key, {"passenger": {current_user.username: [lat, lon]}})
+    return jsonify({"message": "Pickup location updated."}), 200
+
+
+# Route for the commuting journeys
+@bp.route('/view_pickup_commute/<int:ride_id>/<date>', methods=['GET'])
+@login_required
+def view_pickup_commute(ride_id, date):
+    ride = publish_ride.query.get_or_404(ride_id)
+    driver = User.query.get(ride.driver_id)
+
+    # Convert date string to datetime.date
+    try:
+        ride_date_obj = datetime.strptime(date, "%Y-%m-%d").date()
+    except ValueError:
+        return "<h3><strong>Invalid date format</strong></h3>", 400
+
+    # Check if user is a passenger for this date
+    booking = book_ride.query.filter(
+        book_ride.ride_id == ride_id,
+        book_ride.user_id == current_user.id,
+        book_ride.on_date(ride_date_obj)
+    ).first()
+
+    is_passenger = booking is not None
+    is_driver = ride.driver_id == current_user.id
+
+    # Detect ride status
+    if is_driver:
+        # For drivers: determine status based on bookings
+        bookings = book_ride.query.filter(
+            book_ride.ride_id == ride_id,
+            book_ride.on_date(ride_date_obj)
+        ).all()
+
+        ride_status = "Booked"  # default status
+        for b in bookings:
+            if b.status == "ongoing":
+                ride_status = "ongoing"
+                break
+            elif b.status == "done":
+                ride_status = "done"
+    elif is_passenger:
+        ride_status = booking.status if booking else "Booked" # directly from passenger's booking
+    else:
+        return "<h3><strong>Unauthorized access to this ride</strong></h3>", 403
+
+    # For displaying multiple passenger names (for driver view), in pickup order
+    passenger_names = []
+    pickup_route = None
+    if is_driver:
+        pickup_route = get_pickup_route(ride, ride_date_obj.strftime("%Y-%m-%d"))
+        passenger_names = [stop["username"] for stop in pickup_route["stops"]]
+
+    template = "pickup_driver.html" if is_driver else "pickup_passenger.html"
+    return render_template(
+        template,
+        ride_id=ride_id,
+        ride_date=date,
+        ride=ride,
+        driver_name=driver.username,
+        passenger_names=passenger_names,
+        pickup_route=pickup_route,
+        ride_status=ride_status  
+    )
+
+
+# Route for the driver's pickup order on one date of a ride (see app/routing.py)
+@bp.route('/api/pickup_route/<int:ride_id>/<string:ride_date>', methods=['GET'])
+@login_required
+def get_pickup_order(ride_id, ride_date):
+    ride = publish_ride.query.get_or_404(ride_id)
+    if ride.driver_id != current_user.id:
+        return jsonify({"error": "Only the driver can see the pickup order"}), 403
+    try:
+        ride_date = datetime.strptime(ride_date, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        return jsonify({"error": "Invalid date format"}), 400
+    return jsonify(get_pickup_route(ride, ride_date))
+
+
+@bp.route('/api/get_commute_live_locations/<int:ride_id>/<string:ride_date>', methods=['GET'])
+@login_required
+def get_commute_live_locations(ride_id, ride_date):
+    driver_loc, passenger_loc = location_store.get_ride(*location_ride_key(ride_id, ride_date))
+
+    if not passenger_loc and not driver_loc:
+        return jsonify({"error": "No location data available"}), 404
+
+    # Distance / ETA to each passenger, and whether any of them is nearby
+    distances = proximity(driver_loc, passenger_loc)
+
+    return jsonify({
+        "passenger": passenger_loc,  # now a dict of username -> location
+        "driver": driver_loc,
+        "nearby": any(result["nearby"] for result in distances.values()),
+        "proximity": distances
+    })
+
+
+# Booking Rating Routes
+@bp.route("/api/finish_journey", methods=["POST"])
+@login_required
+def finish_journey():
+    data = request.get_json()
+    ride_id = data.get("ride_id")
+    ride_date_str = data.get("ride_date")  # Optional for one-time
+
+    if not ride_id:
+        return jsonify({"error": "Missing ride ID"}), 400
+
+    ride = publish_ride.query.get_or_404(ride_id)
+
+    if ride.driver_id != current_user.id:
+        return jsonify({"error": "Only the driver can finish the journey"}), 403
+
+    if ride.category == "commuting":
+        if not ride_date_str:
+            return jsonify({"error": "Missing ride date for commuting ride"}), 400
+        try:
+            ride_date = datetime.strptime(ride_date_str, "%Y-%m-%d").date()
+        except:
+            return jsonify({"error": "Invalid date format"}), 400
+
+        # Update only bookings for this date
+        bookings = book_ride.query.filter(
+            book_ride.ride_id == ride_id,
+            book_ride.on_date(ride_date)
+        ).all()
+    else:
+        bookings = book_ride.query.filter_by(ride_id=ride_id).all()
+
+    for booking in bookings:
+        booking.status = "done"
+
+    db.session.commit()
+    geofence_engine.drop(location_ride_key(ride_id, ride_date_str))
+    push_ride_status(location_ride_key(ride_id, ride_date_str), "done")
+    return jsonify({"message": "Journey marked as finished."}), 200
+
+
+# Route to check the ride status (booked, ongoing and done)
+@bp.route('/api/ride_status', methods=['POST'])
+@login_required
+def check_ride_status():
+    data = request.get_json()
+    ride_id = data.get('ride_id')
+    ride_date_str = data.get('ride_date')
+    
+    if not ride_id:
+        return jsonify({'error': 'Missing ride_id'}), 400
+
+    ride = publish_ride.query.get_or_404(ride_id)
+
+    if ride.category == "commuting":
+        if not ride_date_str:
+            return jsonify({'error': 'Missing ride_date for commuting'}), 400
+        ride_date = datetime.strptime(ride_date_str, '%Y-%m-%d').date()
+        booking = book_ride.query.filter_by(user_id=current_user.id, ride_id=ride_id).filter(book_ride.on_date(ride_date)).first()
+    else:
+        booking = book_ride.query.filter_by(user_id=current_user.id, ride_id=ride_id).first()
+
+    if not booking:
+        return jsonify({'status': 'none'}), 200
+
+    return jsonify({'status': booking.status}), 200
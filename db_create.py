@@ -1,8 +1,6 @@
-from config import SQLALCHEMY_DATABASE_URI
-from app import app, db
-import os.path
-from app.models import User, publish_ride, book_ride
+from app import create_app, db
 
-# Create all database tables
+# Create all database tables directly from the models (flask db upgrade is the usual way)
+app = create_app()
 with app.app_context():
     db.create_all()
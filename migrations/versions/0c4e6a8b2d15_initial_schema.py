@@ -0,0 +1,157 @@
+"""initial schema: the tables the app created with db.create_all() before they were migrated
+
+Revision ID: 0c4e6a8b2d15
+Revises:
+Create Date: 2026-10-17 16:05:12.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c4e6a8b2d15'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The app used to build its tables with db.create_all() on start, so databases from before the
+    # migrations already have these; the later revisions create everything they add themselves
+    # (a database whose newer tables were also made by create_all() needs `flask db stamp` instead)
+    if 'user' in sa.inspect(op.get_bind()).get_table_names():
+        return
+
+    op.create_table(
+        'user',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=150), nullable=False),
+        sa.Column('password_hash', sa.String(length=200), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('is_manager', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('username'),
+        sa.UniqueConstraint('email')
+    )
+    op.create_table(
+        'platform_setting',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.String(length=50), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('key')
+    )
+    op.create_table(
+        'publish_ride',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('driver_id', sa.Integer(), nullable=False),
+        sa.Column('driver_name', sa.String(length=100), nullable=False),
+        sa.Column('from_location', sa.String(length=200), nullable=False),
+        sa.Column('to_location', sa.String(length=200), nullable=False),
+        sa.Column('date_time', sa.DateTime(), nullable=True),
+        sa.Column('available_seats_per_date', sa.JSON(), nullable=True),
+        sa.Column('price_per_seat', sa.Float(), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('recurrence_dates', sa.String(length=255), nullable=True),
+        sa.Column('commute_times', sa.String(length=255), nullable=True),
+        sa.Column('is_available', sa.Boolean(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.ForeignKeyConstraint(['driver_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'saved_card',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('encrypted_card_number', sa.String(length=500), nullable=False),
+        sa.Column('expiry_date', sa.String(length=5), nullable=False),
+        sa.Column('cardholder_name', sa.String(length=100), nullable=False),
+        sa.Column('last_four_digits', sa.String(length=4), nullable=False),
+        sa.Column('is_default', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'passenger_rides',
+        sa.Column('passenger_id', sa.Integer(), nullable=False),
+        sa.Column('ride_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['passenger_id'], ['user.id']),
+        sa.ForeignKeyConstraint(['ride_id'], ['publish_ride.id']),
+        sa.PrimaryKeyConstraint('passenger_id', 'ride_id')
+    )
+    op.create_table(
+        'book_ride',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('ride_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('total_price', sa.Float(), nullable=False),
+        sa.Column('seats_selected', sa.Integer(), nullable=False),
+        sa.Column('confirmation_email', sa.String(length=150), nullable=False),
+        sa.Column('ride_date', sa.DateTime(), nullable=True),
+        sa.Column('cancellation_timestamp', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.ForeignKeyConstraint(['ride_id'], ['publish_ride.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'ride_rating',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ride_id', sa.Integer(), nullable=False),
+        sa.Column('passenger_id', sa.Integer(), nullable=False),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.Column('ride_date', sa.Date(), nullable=True),
+        sa.ForeignKeyConstraint(['ride_id'], ['publish_ride.id']),
+        sa.ForeignKeyConstraint(['passenger_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('ride_id', 'passenger_id', 'ride_date', name='unique_rating_per_day')
+    )
+    op.create_table(
+        'payment',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('ride_id', sa.Integer(), nullable=False),
+        sa.Column('book_ride_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('platform_fee', sa.Float(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.Column('refunded', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.ForeignKeyConstraint(['ride_id'], ['publish_ride.id']),
+        sa.ForeignKeyConstraint(['book_ride_id'], ['book_ride.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'chat_message',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('booking_id', sa.Integer(), nullable=False),
+        sa.Column('sender_username', sa.String(length=100), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.Column('seen_by_receiver', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['booking_id'], ['book_ride.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'edit_proposal',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('booking_id', sa.Integer(), nullable=False),
+        sa.Column('sender', sa.String(length=80), nullable=False),
+        sa.Column('proposed_pickup', sa.String(length=255), nullable=True),
+        sa.Column('proposed_time', sa.String(length=20), nullable=True),
+        sa.Column('proposed_cost', sa.Float(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['booking_id'], ['book_ride.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    for table in ('edit_proposal', 'chat_message', 'payment', 'ride_rating', 'book_ride',
+                  'passenger_rides', 'saved_card', 'publish_ride', 'platform_setting', 'user'):
+        op.drop_table(table)
@@ -0,0 +1,72 @@
+"""ride seat inventory table, backfilled from publish_ride.available_seats_per_date
+
+Revision ID: a1c3e5f7b901
+Revises: 0c4e6a8b2d15
+Create Date: 2026-10-17 09:12:44.118204
+
+"""
+import json
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c3e5f7b901'
+down_revision = '0c4e6a8b2d15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    op.create_table(
+        'ride_seat_inventory',
+        sa.Column('ride_id', sa.Integer(), nullable=False),
+        sa.Column('ride_date', sa.Date(), nullable=False),
+        sa.Column('seats_left', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ride_id'], ['publish_ride.id']),
+        sa.PrimaryKeyConstraint('ride_id', 'ride_date')
+    )
+    op.create_index('ix_ride_seat_inventory_date_seats', 'ride_seat_inventory',
+                    ['ride_date', 'seats_left'], unique=False)
+
+    inventory = sa.table(
+        'ride_seat_inventory',
+        sa.column('ride_id', sa.Integer),
+        sa.column('ride_date', sa.Date),
+        sa.column('seats_left', sa.Integer)
+    )
+
+    # Backfill from the JSON seat map
+    rides = bind.execute(sa.text("SELECT id, available_seats_per_date FROM publish_ride")).fetchall()
+
+    rows = []
+    for ride_id, raw_seats in rides:
+        if not raw_seats:
+            continue
+        seat_map = raw_seats
+        # The column holds JSON, and older rows hold a JSON string inside it
+        while isinstance(seat_map, str):
+            try:
+                seat_map = json.loads(seat_map)
+            except (json.JSONDecodeError, TypeError):
+                seat_map = None
+        if not isinstance(seat_map, dict):
+            continue
+        for date_str, seats in seat_map.items():
+            try:
+                ride_date = datetime.strptime(date_str.strip(), "%Y-%m-%d").date()
+                rows.append({"ride_id": ride_id, "ride_date": ride_date, "seats_left": int(seats)})
+            except (ValueError, TypeError, AttributeError):
+                continue
+
+    if rows:
+        op.bulk_insert(inventory, rows)
+
+
+def downgrade():
+    op.drop_index('ix_ride_seat_inventory_date_seats', table_name='ride_seat_inventory')
+    op.drop_table('ride_seat_inventory')
@@ -0,0 +1,39 @@
+"""full-text location index for ride search
+
+Revision ID: b2d4f6a8c013
+Revises: a1c3e5f7b901
+Create Date: 2026-10-17 11:40:02.530917
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2d4f6a8c013'
+down_revision = 'a1c3e5f7b901'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # FTS5 is SQLite only; other databases keep using ILIKE in filter_journeys
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS ride_location_fts "
+        "USING fts5(from_location, to_location, "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+    )
+    op.execute("DELETE FROM ride_location_fts")
+    op.execute(
+        "INSERT INTO ride_location_fts (rowid, from_location, to_location) "
+        "SELECT id, from_location, to_location FROM publish_ride"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute("DROP TABLE IF EXISTS ride_location_fts")
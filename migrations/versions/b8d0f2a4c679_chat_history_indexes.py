@@ -0,0 +1,33 @@
+"""(booking_id, timestamp) indexes for the chat history
+
+Revision ID: b8d0f2a4c679
+Revises: a7c9e1f3b568
+Create Date: 2026-10-17 20:41:08.305517
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8d0f2a4c679'
+down_revision = 'a7c9e1f3b568'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('chat_message', 'ix_chat_message_booking_timestamp'),
+    ('edit_proposal', 'ix_edit_proposal_booking_timestamp'),
+]
+
+
+def upgrade():
+    for table, index in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(index, ['booking_id', 'timestamp'], unique=False)
+
+
+def downgrade():
+    for table, index in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(index)
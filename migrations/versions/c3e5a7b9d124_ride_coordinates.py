@@ -0,0 +1,43 @@
+"""ride origin/destination coordinates and R*Tree route index
+
+Revision ID: c3e5a7b9d124
+Revises: b2d4f6a8c013
+Create Date: 2026-10-17 14:05:31.902446
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e5a7b9d124'
+down_revision = 'b2d4f6a8c013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('publish_ride', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('from_lat', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('from_lon', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('to_lat', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('to_lon', sa.Float(), nullable=True))
+
+    # R*Tree is SQLite only; other databases filter the coordinate columns directly
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS ride_route_rtree USING rtree("
+            "id, min_from_lat, max_from_lat, min_from_lon, max_from_lon, "
+            "min_to_lat, max_to_lat, min_to_lon, max_to_lon)"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS ride_route_rtree")
+
+    with op.batch_alter_table('publish_ride', schema=None) as batch_op:
+        batch_op.drop_column('to_lon')
+        batch_op.drop_column('to_lat')
+        batch_op.drop_column('from_lon')
+        batch_op.drop_column('from_lat')
@@ -0,0 +1,47 @@
+"""per-user unread message counts, backfilled from chat_message
+
+Revision ID: c9e1a3b5d780
+Revises: b8d0f2a4c679
+Create Date: 2026-10-17 21:10:52.640128
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e1a3b5d780'
+down_revision = 'b8d0f2a4c679'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    op.create_table(
+        'unread_messages',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('unread_count', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+    # Same rule as app.models.chat_recipient_id: a message from the passenger goes to the driver, anything else to the passenger
+    bind.execute(sa.text(
+        "INSERT INTO unread_messages (user_id, unread_count, version) "
+        "SELECT recipient_id, COUNT(*), 1 FROM ("
+        "  SELECT CASE WHEN chat_message.sender_username = passenger.username "
+        "         THEN publish_ride.driver_id ELSE book_ride.user_id END AS recipient_id "
+        "  FROM chat_message "
+        "  JOIN book_ride ON book_ride.id = chat_message.booking_id "
+        "  JOIN publish_ride ON publish_ride.id = book_ride.ride_id "
+        "  JOIN \"user\" AS passenger ON passenger.id = book_ride.user_id "
+        "  WHERE chat_message.seen_by_receiver IS NULL OR chat_message.seen_by_receiver = :false"
+        ") AS unread GROUP BY recipient_id"
+    ), {"false": False})
+
+
+def downgrade():
+    op.drop_table('unread_messages')
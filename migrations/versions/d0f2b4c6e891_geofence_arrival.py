@@ -0,0 +1,43 @@
+"""geofence arrivals recorded by the tracking geofence engine
+
+Revision ID: d0f2b4c6e891
+Revises: c9e1a3b5d780
+Create Date: 2026-10-17 23:05:14.318207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd0f2b4c6e891'
+down_revision = 'c9e1a3b5d780'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'geofence_arrival',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('ride_id', sa.Integer(), nullable=False),
+        sa.Column('ride_date', sa.String(length=10), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.Column('fence', sa.String(length=20), nullable=False),
+        sa.Column('distance', sa.Float(), nullable=False),
+        sa.Column('arrived_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['ride_id'], ['publish_ride.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('ride_id', 'ride_date', 'user_id', 'fence', name='uq_geofence_arrival')
+    )
+    with op.batch_alter_table('geofence_arrival', schema=None) as batch_op:
+        batch_op.create_index('ix_geofence_arrival_arrived_at', ['arrived_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('geofence_arrival', schema=None) as batch_op:
+        batch_op.drop_index('ix_geofence_arrival_arrived_at')
+
+    op.drop_table('geofence_arrival')
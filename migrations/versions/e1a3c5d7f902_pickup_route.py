@@ -0,0 +1,34 @@
+"""cached pickup order per ride and date
+
+Revision ID: e1a3c5d7f902
+Revises: d0f2b4c6e891
+Create Date: 2026-10-18 00:12:40.905116
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1a3c5d7f902'
+down_revision = 'd0f2b4c6e891'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows are computed on demand
+    op.create_table(
+        'pickup_route',
+        sa.Column('ride_id', sa.Integer(), nullable=False),
+        sa.Column('ride_date', sa.String(length=10), nullable=False),
+        sa.Column('stops', sa.Text(), nullable=False),
+        sa.Column('total_distance', sa.Float(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['ride_id'], ['publish_ride.id']),
+        sa.PrimaryKeyConstraint('ride_id', 'ride_date')
+    )
+
+
+def downgrade():
+    op.drop_table('pickup_route')
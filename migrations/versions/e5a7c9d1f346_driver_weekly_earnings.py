@@ -0,0 +1,61 @@
+"""driver weekly earnings rollup, backfilled from payment
+
+Revision ID: e5a7c9d1f346
+Revises: d4f6b8c0e235
+Create Date: 2026-10-17 18:47:55.210338
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a7c9d1f346'
+down_revision = 'd4f6b8c0e235'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+
+    op.create_table(
+        'driver_weekly_earnings',
+        sa.Column('driver_id', sa.Integer(), nullable=False),
+        sa.Column('week', sa.String(length=8), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['driver_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('driver_id', 'week')
+    )
+
+    # Same rules as app.models.driver_earning
+    totals = {}
+    rows = bind.execute(sa.text(
+        "SELECT publish_ride.driver_id, payment.amount, payment.platform_fee, payment.status, payment.timestamp "
+        "FROM payment JOIN publish_ride ON publish_ride.id = payment.ride_id"
+    ))
+    for driver_id, amount, fee, status, timestamp in rows:
+        fee = 0.005 if fee is None else fee
+        if status == "Success":
+            earning = amount * (1 - fee)
+        elif status == "Partially Refunded":
+            earning = amount * 0.75 * (1 - fee)
+        else:
+            continue
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        key = (driver_id, timestamp.strftime("%Y-W%U"))
+        totals[key] = totals.get(key, 0.0) + earning
+
+    if totals:
+        op.bulk_insert(
+            sa.table('driver_weekly_earnings', sa.column('driver_id', sa.Integer),
+                     sa.column('week', sa.String), sa.column('amount', sa.Float)),
+            [{"driver_id": driver_id, "week": week, "amount": amount} for (driver_id, week), amount in totals.items()]
+        )
+
+
+def downgrade():
+    op.drop_table('driver_weekly_earnings')
@@ -0,0 +1,38 @@
+"""indexes on the booking, payment and ride foreign keys, matched to the query shapes
+
+Revision ID: f2b4d6e8a013
+Revises: e1a3c5d7f902
+Create Date: 2026-10-18 01:03:27.552841
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b4d6e8a013'
+down_revision = 'e1a3c5d7f902'
+branch_labels = None
+depends_on = None
+
+
+# chat_message / edit_proposal booking_id are already covered by their (booking_id, timestamp) indexes,
+# ride_rating (ride_id, passenger_id, ride_date) by its unique constraint
+INDEXES = [
+    ('book_ride', 'ix_book_ride_ride_date', ['ride_id', 'ride_date']),
+    ('book_ride', 'ix_book_ride_user_ride_date', ['user_id', 'ride_id', 'ride_date']),
+    ('payment', 'ix_payment_book_ride', ['book_ride_id']),
+    ('payment', 'ix_payment_ride_timestamp', ['ride_id', 'timestamp']),
+    ('publish_ride', 'ix_publish_ride_driver_date', ['driver_id', 'date_time']),
+]
+
+
+def upgrade():
+    for table, index, columns in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.create_index(index, columns, unique=False)
+
+
+def downgrade():
+    for table, index, columns in INDEXES:
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(index)
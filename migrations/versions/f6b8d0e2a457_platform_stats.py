@@ -0,0 +1,55 @@
+"""platform stats for the manager dashboard, backfilled from booking, ride and payment
+
+Revision ID: f6b8d0e2a457
+Revises: e5a7c9d1f346
+Create Date: 2026-10-17 19:32:10.418226
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6b8d0e2a457'
+down_revision = 'e5a7c9d1f346'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    op.create_table(
+        'platform_counter',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('value', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table(
+        'platform_daily_revenue',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('fee_rate', sa.Float(), nullable=False),
+        sa.Column('payments', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('platform_fees', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'fee_rate')
+    )
+
+    bind.execute(sa.text(
+        "INSERT INTO platform_counter (name, value) "
+        "SELECT 'bookings', COUNT(*) FROM book_ride UNION ALL "
+        "SELECT 'rides_published', COUNT(*) FROM publish_ride"
+    ))
+
+    # Same rules as app.models.platform_revenue
+    bind.execute(sa.text(
+        "INSERT INTO platform_daily_revenue (day, fee_rate, payments, amount, platform_fees) "
+        "SELECT DATE(timestamp), COALESCE(platform_fee, 0.005), COUNT(*), SUM(amount), "
+        "SUM(amount * COALESCE(platform_fee, 0.005)) FROM payment "
+        "WHERE status = 'Success' AND (refunded IS NULL OR refunded = :false) "
+        "GROUP BY DATE(timestamp), COALESCE(platform_fee, 0.005)"
+    ), {"false": False})
+
+
+def downgrade():
+    op.drop_table('platform_daily_revenue')
+    op.drop_table('platform_counter')
@@ -0,0 +1,22 @@
+import os
+
+# Tests never talk to smtp.gmail.com, and queued email is only sent when a test dispatches it
+os.environ.setdefault("MAIL_BACKEND", "console")
+os.environ.setdefault("MAIL_DISPATCHER_THREAD", "0")
+
+# Saved cards are encrypted with a throwaway key instead of creating instance/card_keys
+from cryptography.fernet import Fernet
+os.environ.setdefault("CARD_KEYS", Fernet.generate_key().decode())
+
+# ...and never geocode through nominatim.openstreetmap.org: unknown addresses simply have no coordinates
+# (tests that need coordinates install their own stub with geocoding.set_geocoder)
+os.environ.setdefault("GEOCODE_IN_BACKGROUND", "0")
+
+
+class OfflineGeocoder:
+    def geocode(self, address):
+        return None
+
+
+from app import geocoding
+geocoding.set_geocoder(OfflineGeocoder())
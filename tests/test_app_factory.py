@@ -0,0 +1,101 @@
+import sys
+import os
+import json
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+# Startup budgets in seconds, well above what a laptop needs, so only a regression trips them
+IMPORT_BUDGET = 3.0
+CREATE_APP_BUDGET = 5.0
+
+# Modules that must not load until they are used
+DEFERRED_MODULES = ["app.views", "app.views.booking", "geopy", "pytz", "flask_mail"]
+
+# ---------------------- HELPERS ----------------------
+
+# Run code in a fresh interpreter against its own database and return what it prints as JSON
+def run_python(code, tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'factory.db'}", MAIL_DISPATCHER_THREAD="0")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+# -------------------- TEST CASES --------------------
+
+# Test 1: Importing the package builds no app and defers the views and heavy libraries; startup stays in budget
+def test_startup_is_lazy_and_fast(tmp_path):
+    startup = run_python(f"""
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+loaded_on_import = [name for name in {DEFERRED_MODULES!r} if name in sys.modules]
+flask_app = app.create_app()
+created = time.perf_counter()
+print(json.dumps({{"import": imported - started, "create_app": created - imported,
+                  "loaded_on_import": loaded_on_import, "has_app": "app" in vars(app)}}))
+""", tmp_path)
+
+    assert startup["loaded_on_import"] == [] and not startup["has_app"]
+    assert startup["import"] < IMPORT_BUDGET
+    assert startup["create_app"] < CREATE_APP_BUDGET
+
+# Test 2: create_app registers the blueprints and leaves the schema to the migrations
+def test_create_app_registers_blueprints_without_creating_tables(tmp_path):
+    created = run_python("""
+import json, sys
+from sqlalchemy import inspect
+from app import create_app, db
+flask_app = create_app(TESTING=True)
+with flask_app.app_context():
+    tables = inspect(db.engine).get_table_names()
+print(json.dumps({"blueprints": sorted(flask_app.blueprints), "tables": tables, "testing": flask_app.config["TESTING"],
+                  "login": flask_app.url_map.bind("localhost").build("auth.login"),
+                  "geopy": "geopy" in sys.modules}))
+""", tmp_path)
+    assert created["blueprints"] == ["auth", "booking", "chat", "commands", "manager", "metrics", "rides", "tracking"]
+    assert created["tables"] == [] and created["testing"] is True
+    assert created["login"] == "/login"
+    assert not created["geopy"]
+
+# Test 3: flask db upgrade on an empty database builds the same schema as the models
+def test_migrations_build_the_model_schema(tmp_path):
+    diff = run_python("""
+import json
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from flask_migrate import upgrade
+from app import create_app, db
+flask_app = create_app()
+with flask_app.app_context():
+    upgrade()
+    with db.engine.connect() as connection:
+        diff = compare_metadata(MigrationContext.configure(connection), db.metadata)
+# The search index virtual tables (app/search.py) are created by hand, outside the models
+print(json.dumps([str(change) for change in diff
+                  if not (change[0] == "remove_table" and change[1].name.startswith(("ride_location_fts", "ride_route_rtree")))]))
+""", tmp_path)
+    assert diff == []
+
+# Test 4: flask seed-demo-data fills a migrated database once, with the rollups kept by the model events
+def test_seed_demo_data(tmp_path):
+    seeded = run_python("""
+import json
+from flask_migrate import upgrade
+from app import create_app, db
+from app.models import User, publish_ride, book_ride, Payment, ChatMessage, EditProposal, SavedCard, RideSeatInventory, PlatformCounter
+flask_app = create_app()
+with flask_app.app_context():
+    upgrade()
+    runner = flask_app.test_cli_runner()
+    outputs = [runner.invoke(args=["seed-demo-data"]).output for _ in range(2)]
+    counts = [model.query.count() for model in (User, publish_ride, book_ride, Payment, ChatMessage, EditProposal, SavedCard)]
+    print(json.dumps({"outputs": outputs, "counts": counts, "inventory": RideSeatInventory.query.count(),
+                      "bookings_counter": db.session.get(PlatformCounter, "bookings").value,
+                      "card": SavedCard.query.one().get_card_number()[-4:]}))
+""", tmp_path)
+    assert seeded["outputs"][0].startswith("Added the demo users") and "nothing added" in seeded["outputs"][1]
+    assert seeded["counts"] == [3, 2, 4, 4, 6, 2, 1]
+    assert seeded["inventory"] == 4 and seeded["bookings_counter"] == 4 and seeded["card"] == "1234"
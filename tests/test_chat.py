@@ -0,0 +1,238 @@
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from app import app, db, socketio
+from app.models import User, publish_ride, book_ride, ChatMessage, EditProposal, UnreadMessageCount
+from werkzeug.security import generate_password_hash
+
+# ---------------------- FIXTURES ----------------------
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.create_all()
+        with app.test_client() as client:
+            yield client
+        db.session.remove()
+        db.drop_all()
+
+def login_as(client, user_id):
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+
+def create_user(name):
+    user = User(username=f"{name}_{datetime.now().strftime('%f')}", email=f"{name}{datetime.now().strftime('%f')}@gmail.com",
+                password_hash=generate_password_hash("test"))
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+@pytest.fixture
+def chat_booking(client):
+    driver = create_user("driver")
+    passenger = create_user("passenger")
+    ride = publish_ride(driver_id=driver.id, driver_name=driver.username, from_location="Leeds", to_location="York",
+                        category="one-time", date_time=datetime(2030, 5, 1, 9, 0),
+                        available_seats_per_date='{"2030-05-01": 3}', price_per_seat=5.0)
+    db.session.add(ride)
+    db.session.commit()
+    booking = book_ride(user_id=passenger.id, ride_id=ride.id, ride_date=datetime(2030, 5, 1, 9, 0),
+                        status="Booked", total_price=5.0, seats_selected=1, confirmation_email=passenger.email)
+    db.session.add(booking)
+    db.session.commit()
+    return driver, passenger, booking
+
+# Each call runs in its own app context, so Flask-Login doesn't reuse the previous caller's user (cached on g)
+def as_user(action, *args, **kwargs):
+    with app.app_context():
+        return action(*args, **kwargs)
+
+def socket_for(user_id):
+    http_client = app.test_client()
+    login_as(http_client, user_id)
+    return as_user(socketio.test_client, app, flask_test_client=http_client), http_client
+
+def join(socket, booking_id):
+    return as_user(socket.emit, "join_chat", {"booking_id": booking_id}, callback=True)
+
+def post(http_client, url, payload):
+    return as_user(http_client.post, url, json=payload)
+
+def received(socket, event):
+    return [packet["args"][0] for packet in socket.get_received() if packet["name"] == event]
+
+# -------------------- TEST CASES --------------------
+
+# Test 1: Anonymous users can't open a chat socket
+def test_socket_requires_login(client):
+    socket = as_user(socketio.test_client, app, flask_test_client=app.test_client())
+    assert not socket.is_connected()
+
+# Test 2: Only the passenger and the driver can join a booking's chat room
+def test_join_chat_authorization(client, chat_booking):
+    driver, passenger, booking = chat_booking
+    stranger = create_user("stranger")
+
+    socket, _ = socket_for(passenger.id)
+    assert join(socket, booking.id) == {"success": True}
+
+    socket, _ = socket_for(stranger.id)
+    assert join(socket, booking.id)["success"] is False
+
+# Test 3: send_message pushes the message to the chat room and a notification to the receiver
+def test_send_message_is_pushed(client, chat_booking):
+    driver, passenger, booking = chat_booking
+    passenger_socket, _ = socket_for(passenger.id)
+    join(passenger_socket, booking.id)
+    passenger_socket.get_received()
+
+    _, driver_http = socket_for(driver.id)
+    response = post(driver_http, "/send_message", {"booking_id": booking.id, "message": "Running 5 minutes late"})
+    assert response.status_code == 200
+
+    events = passenger_socket.get_received()
+    items = [packet["args"][0] for packet in events if packet["name"] == "chat_item"]
+    notifications = [packet["args"][0] for packet in events if packet["name"] == "new_message"]
+    assert items[0]["type"] == "message" and items[0]["message"] == "Running 5 minutes late"
+    assert notifications[0]["booking_id"] == booking.id
+    assert items[0]["id"] == ChatMessage.query.filter_by(booking_id=booking.id).one().id
+
+# Test 4: Proposals are pushed when created and again when answered
+def test_proposal_events_are_pushed(client, chat_booking):
+    driver, passenger, booking = chat_booking
+    driver_socket, driver_http = socket_for(driver.id)
+    join(driver_socket, booking.id)
+
+    _, passenger_http = socket_for(passenger.id)
+    post(passenger_http, "/propose_edit", {"booking_id": booking.id, "pickup": "Leeds Station"})
+    proposal = EditProposal.query.filter_by(booking_id=booking.id).one()
+
+    post(driver_http, "/respond_proposal", {"proposal_id": proposal.id, "action": "accept"})
+
+    items = received(driver_socket, "chat_item")
+    assert [(item["type"], item["status"]) for item in items] == [("proposal", "pending"), ("proposal", "accepted")]
+    assert items[0]["pickup"] == "Leeds Station"
+
+# Test 5: The HTTP history uses the same item format as the pushed events
+def test_get_messages_fallback(client, chat_booking):
+    driver, passenger, booking = chat_booking
+    _, passenger_http = socket_for(passenger.id)
+    post(passenger_http, "/send_message", {"booking_id": booking.id, "message": "Hello"})
+
+    history = as_user(passenger_http.get, f"/get_messages/{booking.id}").get_json()
+    assert history == [ChatMessage.query.filter_by(booking_id=booking.id).one().to_chat_item()]
+
+def add_history(booking, sender, count, start=datetime(2030, 5, 1, 8, 0, 0)):
+    # Alternate messages and proposals, a few seconds apart (all within the same minute)
+    for index in range(count):
+        timestamp = start + timedelta(seconds=index * 5)
+        if index % 2:
+            db.session.add(EditProposal(booking_id=booking.id, sender=sender, proposed_pickup=f"Stop {index}", timestamp=timestamp))
+        else:
+            db.session.add(ChatMessage(booking_id=booking.id, sender_username=sender, message=f"Message {index}", timestamp=timestamp))
+    db.session.commit()
+
+def cursor_params(prefix, item):
+    return {f"{prefix}_ts": item["ts"], f"{prefix}_type": item["type"], f"{prefix}_id": item["id"]}
+
+# Test 6: Messages and proposals are merged by their exact time, and since_* returns only newer items
+def test_get_messages_since_cursor(client, chat_booking):
+    driver, passenger, booking = chat_booking
+    add_history(booking, driver.username, 6)
+    _, passenger_http = socket_for(passenger.id)
+
+    history = as_user(passenger_http.get, f"/get_messages/{booking.id}").get_json()
+    assert [item["type"] for item in history] == ["message", "proposal"] * 3
+    assert [item["ts"] for item in history] == sorted(item["ts"] for item in history)
+
+    newer = as_user(passenger_http.get, f"/get_messages/{booking.id}", query_string=cursor_params("since", history[3])).get_json()
+    assert newer == history[4:]
+
+    latest = as_user(passenger_http.get, f"/get_messages/{booking.id}", query_string=cursor_params("since", history[-1])).get_json()
+    assert latest == []
+
+# Test 7: limit returns the latest items and before_* pages back through the rest
+def test_get_messages_backwards_pagination(client, chat_booking):
+    driver, passenger, booking = chat_booking
+    add_history(booking, driver.username, 7)
+    _, passenger_http = socket_for(passenger.id)
+
+    page = as_user(passenger_http.get, f"/get_messages/{booking.id}", query_string={"limit": 3}).get_json()
+    assert [item.get("message") or item.get("pickup") for item in page] == ["Message 4", "Stop 5", "Message 6"]
+
+    query = dict(cursor_params("before", page[0]), limit=3)
+    earlier = as_user(passenger_http.get, f"/get_messages/{booking.id}", query_string=query).get_json()
+    assert [item.get("message") or item.get("pickup") for item in earlier] == ["Stop 1", "Message 2", "Stop 3"]
+
+    query = dict(cursor_params("before", earlier[0]), limit=3)
+    first = as_user(passenger_http.get, f"/get_messages/{booking.id}", query_string=query).get_json()
+    assert [item["message"] for item in first] == ["Message 0"]
+
+# Test 8: A malformed cursor is rejected
+def test_get_messages_invalid_cursor(client, chat_booking):
+    driver, passenger, booking = chat_booking
+    _, passenger_http = socket_for(passenger.id)
+    response = as_user(passenger_http.get, f"/get_messages/{booking.id}", query_string={"since_ts": "yesterday"})
+    assert response.status_code == 400
+
+# Test 9: check_new_messages reads the unread counter and answers unchanged polls with 304
+def test_unread_counter_and_etag(client, chat_booking):
+    driver, passenger, booking = chat_booking
+    _, driver_http = socket_for(driver.id)
+    _, passenger_http = socket_for(passenger.id)
+
+    post(driver_http, "/send_message", {"booking_id": booking.id, "message": "On my way"})
+    post(driver_http, "/send_message", {"booking_id": booking.id, "message": "Outside now"})
+    assert UnreadMessageCount.get(passenger.id)[0] == 2
+    assert UnreadMessageCount.get(driver.id)[0] == 0
+
+    response = as_user(passenger_http.get, "/check_new_messages")
+    assert response.status_code == 200
+    assert response.get_json()["count"] == 2
+    assert len(response.get_json()["messages"]) == 2
+    etag = response.headers["ETag"]
+
+    # Nothing changed: empty 304
+    response = as_user(passenger_http.get, "/check_new_messages", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    # A new message changes the ETag
+    post(driver_http, "/send_message", {"booking_id": booking.id, "message": "Blue car"})
+    response = as_user(passenger_http.get, "/check_new_messages", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.get_json()["count"] == 3
+
+# Test 10: One mark_messages_seen call clears a whole chat, only for its receiver, and matches a rebuild
+def test_bulk_mark_seen(client, chat_booking):
+    driver, passenger, booking = chat_booking
+    stranger = create_user("stranger")
+    _, driver_http = socket_for(driver.id)
+    _, passenger_http = socket_for(passenger.id)
+    _, stranger_http = socket_for(stranger.id)
+
+    for text in ("One", "Two", "Three"):
+        post(driver_http, "/send_message", {"booking_id": booking.id, "message": text})
+    post(passenger_http, "/send_message", {"booking_id": booking.id, "message": "Thanks"})
+
+    # Not a participant, and not the receiver: nothing changes
+    assert post(stranger_http, "/mark_messages_seen", {"booking_id": booking.id}).get_json()["marked"] == 0
+    assert post(driver_http, "/mark_messages_seen", {"message_ids": [
+        msg.id for msg in ChatMessage.query.filter_by(sender_username=driver.username)
+    ]}).get_json()["marked"] == 0
+
+    response = post(passenger_http, "/mark_messages_seen", {"booking_id": booking.id})
+    assert response.get_json() == {"success": True, "marked": 3}
+    assert UnreadMessageCount.get(passenger.id)[0] == 0
+    assert UnreadMessageCount.get(driver.id)[0] == 1
+    assert as_user(passenger_http.get, "/check_new_messages").get_json() == {"new": False}
+
+    assert post(passenger_http, "/mark_messages_seen", {}).status_code == 400
+
+    counts = {user.id: UnreadMessageCount.get(user.id)[0] for user in (driver, passenger)}
+    UnreadMessageCount.rebuild()
+    assert {user.id: UnreadMessageCount.get(user.id)[0] for user in (driver, passenger)} == counts
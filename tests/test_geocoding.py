@@ -0,0 +1,110 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from datetime import datetime, timedelta
+from app import app, db
+from app.models import GeocodeCacheEntry, publish_ride, User
+from app import geocoding
+
+# ---------------------- FIXTURES ----------------------
+
+# Local geocoder stub: no network, counts upstream calls
+class StubGeocoder:
+    def __init__(self, places):
+        self.places = places
+        self.calls = []
+
+    def geocode(self, address):
+        self.calls.append(address)
+        return self.places.get(address.strip().lower())
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            yield client
+            db.session.remove()
+            db.drop_all()
+
+@pytest.fixture
+def stub_geocoder(client):
+    stub = StubGeocoder({"leeds station": (53.7950, -1.5476)})
+    original = geocoding.geocoder
+    geocoding.set_geocoder(stub)
+    yield stub
+    geocoding.set_geocoder(original)
+
+# -------------------- TEST CASES --------------------
+
+# Test 1: Repeated lookups of the same (differently written) address hit the upstream geocoder once
+def test_geocode_cached_in_memory(stub_geocoder):
+    assert geocoding.geocode("Leeds Station") == (53.7950, -1.5476)
+    assert geocoding.geocode("  leeds   STATION ") == (53.7950, -1.5476)
+    assert len(stub_geocoder.calls) == 1
+
+# Test 2: Results persist in the geocode_cache table across an LRU reset
+def test_geocode_cached_in_database(stub_geocoder):
+    geocoding.geocode("Leeds Station")
+    geocoding.lru_cache.clear()
+    assert geocoding.geocode("Leeds Station") == (53.7950, -1.5476)
+    assert len(stub_geocoder.calls) == 1
+    assert GeocodeCacheEntry.query.get("leeds station").lat == 53.7950
+
+# Test 3: Unknown addresses are cached as negative results
+def test_geocode_negative_cache(stub_geocoder):
+    assert geocoding.geocode("Nowhere Lane") == (None, None)
+    assert geocoding.geocode("Nowhere Lane") == (None, None)
+    assert len(stub_geocoder.calls) == 1
+
+# Test 4: Expired entries are looked up again
+def test_geocode_ttl_expiry(stub_geocoder):
+    geocoding.geocode("Leeds Station")
+    entry = GeocodeCacheEntry.query.get("leeds station")
+    entry.updated_at = datetime.utcnow() - timedelta(seconds=app.config["GEOCODE_CACHE_TTL"] + 1)
+    db.session.commit()
+    geocoding.lru_cache.clear()
+
+    geocoding.geocode("Leeds Station")
+    assert len(stub_geocoder.calls) == 2
+
+# Test 5: Publishing a ride never waits on the geocoder: uncached addresses are resolved afterwards
+def test_publish_ride_geocodes_locations(client, stub_geocoder):
+    client.post("/register", json={
+        "username": "user123",
+        "email": "user123@gmail.com",
+        "password": "Test@1234",
+        "confirm_password": "Test@1234"
+    })
+    client.post("/login", json={"email": "user123@gmail.com", "password": "Test@1234"})
+    def publish():
+        client.post("/publish_ride", data={
+            "from_location": "Leeds Station",
+            "to_location": "Leeds Station",
+            "category": "one-time",
+            "date_time": "2030-10-18 15:00",
+            "available_seats": "2",
+            "price_per_seat": "6.0"
+        })
+        return publish_ride.query.order_by(publish_ride.id.desc()).first()
+
+    ride = publish()
+    assert (ride.from_lat, ride.from_lon) == (None, None) and stub_geocoder.calls == []
+    assert geocoding.resolve_ride_coordinates() == 1
+    assert (ride.from_lat, ride.from_lon) == (53.7950, -1.5476)
+    assert len(stub_geocoder.calls) == 1
+
+    # Once the address is cached, the next ride gets its coordinates straight away
+    assert (publish().to_lat, len(stub_geocoder.calls)) == (53.7950, 1)
+
+# Test 6: Caching a lookup neither commits nor rolls back the caller's unit of work
+def test_geocode_leaves_caller_transaction_alone(stub_geocoder):
+    db.session.add(User(username="half_built", email="half_built@gmail.com", password_hash="x"))
+    assert geocoding.geocode("Leeds Station") == (53.7950, -1.5476)
+    assert db.session.new  # still pending, not committed by the cache write
+    db.session.rollback()
+
+    assert User.query.filter_by(username="half_built").first() is None
+    assert GeocodeCacheEntry.query.get("leeds station").lat == 53.7950
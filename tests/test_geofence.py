@@ -0,0 +1,159 @@
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from geopy.distance import geodesic
+from app import app, db, socketio
+from app.models import User, publish_ride, book_ride, GeofenceArrival
+from app.geofence import Geofence, GeofenceEngine, geofence_engine, ensure_ride_fences
+from app.location_store import location_store
+from werkzeug.security import generate_password_hash
+
+PICKUP = (53.8008, -1.5491)
+DROPOFF = (53.9590, -1.0815)
+
+# ---------------------- FIXTURES ----------------------
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.create_all()
+        location_store.clear()
+        geofence_engine.clear()
+        with app.test_client() as client:
+            yield client
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def ride_with_passenger(client):
+    driver = User(username="fence_driver", email="fence_driver@gmail.com", password_hash=generate_password_hash("x"))
+    passenger = User(username="fence_rider", email="fence_rider@gmail.com", password_hash=generate_password_hash("x"))
+    db.session.add_all([driver, passenger])
+    db.session.commit()
+    ride = publish_ride(driver_id=driver.id, driver_name=driver.username, from_location="Leeds", to_location="York",
+                        category="one-time", date_time=datetime(2030, 5, 1, 8, 0),
+                        available_seats_per_date='{"2030-05-01": 3}', price_per_seat=5.0,
+                        from_lat=PICKUP[0], from_lon=PICKUP[1], to_lat=DROPOFF[0], to_lon=DROPOFF[1])
+    db.session.add(ride)
+    db.session.commit()
+    db.session.add(book_ride(user_id=passenger.id, ride_id=ride.id, ride_date=datetime(2030, 5, 1, 8, 0),
+                             status="Booked", total_price=5.0, seats_selected=1, confirmation_email=passenger.email))
+    db.session.commit()
+    return driver, passenger, ride
+
+def client_for(user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+    return client
+
+# Each request runs in its own app context, so Flask-Login doesn't reuse the previous caller's user (cached on g)
+def as_user(action, *args, **kwargs):
+    with app.app_context():
+        return action(*args, **kwargs)
+
+def point_at(metres, bearing=0, origin=PICKUP):
+    point = geodesic(meters=metres).destination(origin, bearing)
+    return point.latitude, point.longitude
+
+def events_for(engine, ride_key, user_id, metres):
+    return [(fence.name, state) for fence, state, _ in engine.update(ride_key, user_id, *point_at(metres))]
+
+# -------------------- TEST CASES --------------------
+
+# Test 1: Nearby / arrived fire once, when the state changes, with a margin before leaving a zone
+def test_engine_transitions():
+    engine = GeofenceEngine(cell_size=0.01, ttl=3600)
+    engine.set_fences((1, None), [Geofence((1, None), "pickup", *PICKUP, nearby_radius=250, arrival_radius=50)])
+
+    assert events_for(engine, (1, None), 7, 2000) == []
+    assert events_for(engine, (1, None), 7, 200) == [("pickup", "nearby")]
+    assert events_for(engine, (1, None), 7, 150) == []
+    assert events_for(engine, (1, None), 7, 30) == [("pickup", "arrived")]
+    assert events_for(engine, (1, None), 7, 55) == []  # jitter just outside the radius
+    assert engine.state((1, None), 7, "pickup") == "arrived"
+    assert events_for(engine, (1, None), 7, 100) == []
+    assert engine.state((1, None), 7, "pickup") == "nearby"
+    assert events_for(engine, (1, None), 7, 400) == []
+    assert engine.state((1, None), 7, "pickup") is None
+
+    # Participants and rides are tracked separately
+    assert events_for(engine, (1, None), 8, 10) == [("pickup", "arrived")]
+    assert events_for(engine, (2, None), 7, 10) == []
+
+# Test 2: Fences are found through every grid cell they overlap, and dropped with their ride
+def test_engine_grid():
+    engine = GeofenceEngine(cell_size=0.001, ttl=3600)
+    fence = Geofence((1, "2030-05-01"), "pickup", *PICKUP, nearby_radius=250, arrival_radius=50)
+    engine.set_fences((1, "2030-05-01"), [fence])
+    assert sum(fence in fences for fences in engine.grid.values()) > 4
+
+    # On a bearing that crosses several cells the fence is still found
+    for bearing in (0, 45, 90, 135, 180, 225, 270, 315):
+        assert engine.update((1, "2030-05-01"), bearing, *point_at(240, bearing))[0][1] == "nearby"
+
+    engine.drop((1, "2030-05-01"))
+    assert not engine.grid and not engine.states
+    assert engine.update((1, "2030-05-01"), 1, *PICKUP) == []
+
+# Test 3: check_arrival uses the ride's fences and the first arrival is recorded
+def test_check_arrival_records_arrival(ride_with_passenger):
+    driver, passenger, ride = ride_with_passenger
+    passenger_http = client_for(passenger.id)
+
+    far = point_at(300)
+    response = as_user(passenger_http.post, "/api/check_arrival", json={"ride_id": ride.id, "latitude": far[0], "longitude": far[1]})
+    assert response.get_json()["arrived"] is False
+
+    for _ in range(3):
+        near = point_at(20)
+        response = as_user(passenger_http.post, "/api/check_arrival", json={"ride_id": ride.id, "latitude": near[0], "longitude": near[1]})
+        assert response.get_json()["arrived"] is True
+
+    arrivals = GeofenceArrival.query.all()
+    assert [(arrival.user_id, arrival.role, arrival.fence) for arrival in arrivals] == [(passenger.id, "passenger", "pickup")]
+    assert arrivals[0].ride_date == "" and 15 < arrivals[0].distance < 25
+
+    response = as_user(passenger_http.post, "/api/check_arrival", json={"ride_id": ride.id, "latitude": "x", "longitude": 1})
+    assert response.status_code == 400
+
+# Test 4: Tracking updates push each geofence transition once to the ride's room
+def test_tracking_pushes_geofence_events(ride_with_passenger):
+    driver, passenger, ride = ride_with_passenger
+    driver_http = client_for(driver.id)
+    passenger_socket = as_user(socketio.test_client, app, flask_test_client=client_for(passenger.id))
+    as_user(passenger_socket.emit, "join_tracking", {"ride_id": ride.id, "ride_date": "2030-05-01"}, callback=True)
+
+    for metres in (200, 150, 20, 25):
+        lat, lon = point_at(metres)
+        as_user(driver_http.post, "/api/track_driver_location", json={"ride_id": ride.id, "ride_date": "2030-05-01",
+                                                                      "latitude": lat, "longitude": lon})
+
+    events = [packet["args"][0] for packet in passenger_socket.get_received() if packet["name"] == "geofence"]
+    assert [(event["fence"], event["event"], event["role"], event["username"]) for event in events] == [
+        ("pickup", "nearby", "driver", "fence_driver"),
+        ("pickup", "arrived", "driver", "fence_driver"),
+    ]
+
+    # Finishing the journey drops the ride's fences
+    as_user(driver_http.post, "/api/finish_journey", json={"ride_id": ride.id, "ride_date": "2030-05-01"})
+    assert not geofence_engine.has_fences((ride.id, "2030-05-01"))
+
+# Test 5: A ride without coordinates gets no fences stored, so they are built once its coordinates are known
+def test_ride_without_coordinates_is_built_later(ride_with_passenger):
+    driver, passenger, ride = ride_with_passenger
+    ride.from_location, ride.to_location = "Nowhere Street", "Nowhere Lane"
+    ride.from_lat = ride.from_lon = ride.to_lat = ride.to_lon = None
+    db.session.commit()
+
+    assert ensure_ride_fences((ride.id, None)) == []
+    assert not geofence_engine.has_fences((ride.id, None))
+
+    ride.from_lat, ride.from_lon = PICKUP
+    db.session.commit()
+    assert [fence.name for fence in ensure_ride_fences((ride.id, None))] == ["pickup"]
+    assert geofence_engine.has_fences((ride.id, None))
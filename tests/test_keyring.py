@@ -0,0 +1,109 @@
+import sys
+import os
+import stat
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from cryptography.fernet import Fernet
+from flask import Flask
+from app import app, db, keyring
+from app.models import User, SavedCard
+from werkzeug.security import generate_password_hash
+
+OLD_KEY = Fernet.generate_key().decode()
+NEW_KEY = Fernet.generate_key().decode()
+
+# ---------------------- FIXTURES ----------------------
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.create_all()
+        # A local app.db can hold saved cards encrypted under a key that is long gone
+        SavedCard.query.delete()
+        app_keyring = app.extensions["card_keyring"]
+        with app.test_client() as client:
+            yield client
+        app.extensions["card_keyring"] = app_keyring
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def user(client):
+    user = User(username="card_owner", email="card_owner@gmail.com", password_hash=generate_password_hash("x"))
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+def bare_app(**config):
+    flask_app = Flask(__name__)
+    flask_app.config.update(config)
+    return flask_app
+
+def save_card(user, number):
+    card = SavedCard(user_id=user.id, expiry_date="12/30", cardholder_name="Card Owner")
+    card.set_card_number(number)
+    db.session.add(card)
+    return card
+
+# -------------------- TEST CASES --------------------
+
+# Test 1: Without CARD_KEYS a key file is created once, privately, and every worker reads the same key
+def test_key_file_shared_by_workers(tmp_path):
+    path = tmp_path / "keys" / "card_keys"
+    worker_a, worker_b = bare_app(CARD_KEY_FILE=str(path)), bare_app(CARD_KEY_FILE=str(path))
+    keyring.init_app(worker_a)
+    keyring.init_app(worker_b)
+
+    assert keyring.load_keys(worker_a) == keyring.load_keys(worker_b) and len(keyring.load_keys(worker_a)) == 1
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+    token = worker_a.extensions["card_keyring"].encrypt(b"4444555566667777")
+    assert worker_b.extensions["card_keyring"].decrypt(token) == b"4444555566667777"
+
+# Test 2: The first key encrypts and every key decrypts
+def test_card_keys_rotation_order():
+    flask_app = bare_app(CARD_KEYS=f"{NEW_KEY}, {OLD_KEY}")
+    keyring.init_app(flask_app)
+    cipher = flask_app.extensions["card_keyring"]
+
+    assert cipher.decrypt(Fernet(OLD_KEY).encrypt(b"1111")) == b"1111"
+    assert Fernet(NEW_KEY).decrypt(cipher.encrypt(b"2222")) == b"2222"
+    assert keyring.parse_keys(f"# keys\n{NEW_KEY}\n\n{OLD_KEY}\n") == [NEW_KEY, OLD_KEY]
+
+# Test 3: rotate-card-keys re-encrypts every card with the new key, in batches, and reports unreadable ones
+def test_rotate_card_keys_command(user):
+    app.extensions["card_keyring"] = keyring.build_keyring([OLD_KEY])
+    numbers = ["1111222233334444", "5555666677778888", "9999000011112222"]
+    cards = [save_card(user, number) for number in numbers]
+    broken = SavedCard(user_id=user.id, encrypted_card_number="not-a-token", expiry_date="12/30",
+                       cardholder_name="Card Owner", last_four_digits="0000")
+    db.session.add(broken)
+    db.session.commit()
+
+    app.extensions["card_keyring"] = keyring.build_keyring([NEW_KEY, OLD_KEY])
+    result = app.test_cli_runner().invoke(args=["rotate-card-keys", "--batch-size", "2"])
+    assert result.exit_code == 0, result.output
+    assert "Re-encrypted 3 saved cards, 1 could not be decrypted with any key" in result.output
+
+    db.session.expire_all()
+    assert [Fernet(NEW_KEY).decrypt(card.encrypted_card_number.encode()).decode() for card in cards] == numbers
+    assert [card.get_card_number() for card in cards] == numbers
+
+# Test 4: --new-key adds a key in front of the key file and the cards move to it
+def test_rotate_card_keys_new_key(user, tmp_path, monkeypatch):
+    path = tmp_path / "card_keys"
+    path.write_text(OLD_KEY + "\n")
+    monkeypatch.setitem(app.config, "CARD_KEYS", None)
+    monkeypatch.setitem(app.config, "CARD_KEY_FILE", str(path))
+    keyring.init_app(app)
+    card = save_card(user, "1234567812345678")
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(args=["rotate-card-keys", "--new-key"])
+    assert result.exit_code == 0, result.output
+    keys = keyring.parse_keys(path.read_text())
+    assert len(keys) == 2 and keys[1] == OLD_KEY
+
+    db.session.expire_all()
+    assert Fernet(keys[0]).decrypt(card.encrypted_card_number.encode()) == b"1234567812345678"
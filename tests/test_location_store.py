@@ -0,0 +1,256 @@
+import sys
+import os
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from app import app, db, socketio
+from sqlalchemy import event
+from app.models import User, publish_ride, book_ride, Payment
+from app.location_store import MemoryLocationStore, SQLiteLocationStore, location_store
+from werkzeug.security import generate_password_hash
+
+# ---------------------- FIXTURES ----------------------
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.create_all()
+        location_store.clear()
+        with app.test_client() as client:
+            yield client
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryLocationStore(ttl=60, max_rides=3)
+    return SQLiteLocationStore(str(tmp_path / "live_locations.db"), ttl=60)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(time, "monotonic", fake)
+    monkeypatch.setattr(time, "time", fake)
+    return fake
+
+def client_for(user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+    return client
+
+# Each request runs in its own app context, so Flask-Login doesn't reuse the previous caller's user (cached on g)
+def as_user(action, *args, **kwargs):
+    with app.app_context():
+        return action(*args, **kwargs)
+
+# -------------------- TEST CASES --------------------
+
+# Test 1: Fixes are grouped per (ride, date) bucket
+def test_store_buckets(store, clock):
+    store.set_driver(1, "2030-05-01", 53.80, -1.55)
+    store.set_passenger(1, "2030-05-01", 7, "alice", 53.81, -1.56)
+    store.set_passenger(1, "2030-05-02", 8, "bob", 53.90, -1.60)
+    store.set_passenger(2, None, 9, "carol", 51.50, -0.12)
+
+    assert store.get_ride(1, "2030-05-01") == ((53.80, -1.55), {"alice": (53.81, -1.56)})
+    assert store.get_ride(1, "2030-05-02") == (None, {"bob": (53.90, -1.60)})
+    assert store.get_ride(2, None) == (None, {"carol": (51.50, -0.12)})
+    assert store.get_ride(3, None) == (None, {})
+
+# Test 2: Fixes expire after the TTL, updated fixes don't (stats() counts live rides and positions)
+def test_store_ttl(store, clock):
+    store.set_driver(1, None, 53.80, -1.55)
+    store.set_passenger(1, None, 7, "alice", 53.81, -1.56)
+    assert store.stats() == (1, 2)
+    clock.now += 45
+    store.set_passenger(1, None, 7, "alice", 53.82, -1.57)
+    clock.now += 30
+
+    assert store.get_ride(1, None) == (None, {"alice": (53.82, -1.57)})
+    assert store.stats() == (1, 1)
+    clock.now += 60
+    assert store.get_ride(1, None) == (None, {})
+    assert store.stats() == (0, 0)
+
+# Test 3: The memory store keeps at most max_rides rides, dropping the least recently updated
+def test_memory_store_bound(clock):
+    store = MemoryLocationStore(ttl=60, max_rides=3)
+    for ride_id in range(1, 5):
+        store.set_driver(ride_id, None, 53.8, -1.5)
+        clock.now += 1
+    store.set_driver(2, None, 53.9, -1.6)
+    store.set_driver(5, None, 53.8, -1.5)
+
+    assert list(store.buckets) == [(4, None), (2, None), (5, None)]
+
+# Test 4: Tracking endpoints write to the store and the live location endpoint reads the ride's bucket
+def test_tracking_endpoints(client):
+    driver = User(username="tracker_driver", email="tracker_driver@gmail.com", password_hash=generate_password_hash("x"))
+    passenger = User(username="tracker_rider", email="tracker_rider@gmail.com", password_hash=generate_password_hash("x"))
+    db.session.add_all([driver, passenger])
+    db.session.commit()
+    ride = publish_ride(driver_id=driver.id, driver_name=driver.username, from_location="Leeds", to_location="York",
+                        category="commuting", date_time=datetime(2030, 5, 1, 8, 0),
+                        available_seats_per_date='{"2030-05-01": 3}', price_per_seat=5.0)
+    db.session.add(ride)
+    db.session.commit()
+    db.session.add(book_ride(user_id=passenger.id, ride_id=ride.id, ride_date=datetime(2030, 5, 1, 8, 0),
+                             status="Booked", total_price=5.0, seats_selected=1, confirmation_email=passenger.email))
+    db.session.commit()
+
+    driver_http = client_for(driver.id)
+    passenger_http = client_for(passenger.id)
+    as_user(driver_http.post, "/api/track_driver_location", json={"ride_id": str(ride.id), "ride_date": "2030-05-01",
+                                                                  "latitude": 53.8000, "longitude": -1.5500})
+    as_user(passenger_http.post, "/api/track_passenger_location", json={"ride_id": str(ride.id), "ride_date": "2030-05-01",
+                                                                        "latitude": 53.8003, "longitude": -1.5502})
+
+    # The poll itself doesn't query the database (the only statement loads the logged-in user)
+    statements = []
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        data = as_user(passenger_http.get, f"/api/get_commute_live_locations/{ride.id}/2030-05-01").get_json()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert len(statements) == 1 and "FROM user" in statements[0].replace('"', "")
+
+    assert data["driver"] == [53.8, -1.55]
+    assert data["passenger"] == {"tracker_rider": [53.8003, -1.5502]}
+    assert data["nearby"] is True
+    assert data["proximity"]["tracker_rider"]["nearby"] is True and data["proximity"]["tracker_rider"]["distance"] < 100
+
+    assert as_user(passenger_http.get, f"/api/get_commute_live_locations/{ride.id}/2030-05-02").status_code == 404
+    assert as_user(passenger_http.post, "/api/track_passenger_location", json={"ride_id": "abc", "latitude": 1, "longitude": 1}).status_code == 400
+
+@pytest.fixture
+def tracked_ride(client):
+    driver = User(username="stream_driver", email="stream_driver@gmail.com", password_hash=generate_password_hash("x"))
+    passenger = User(username="stream_rider", email="stream_rider@gmail.com", password_hash=generate_password_hash("x"))
+    stranger = User(username="stream_stranger", email="stream_stranger@gmail.com", password_hash=generate_password_hash("x"))
+    db.session.add_all([driver, passenger, stranger])
+    db.session.commit()
+    ride = publish_ride(driver_id=driver.id, driver_name=driver.username, from_location="Leeds", to_location="York",
+                        category="commuting", date_time=datetime(2030, 5, 1, 8, 0),
+                        available_seats_per_date='{"2030-05-01": 3, "2030-05-02": 3}', price_per_seat=5.0)
+    db.session.add(ride)
+    db.session.commit()
+    db.session.add(book_ride(user_id=passenger.id, ride_id=ride.id, ride_date=datetime(2030, 5, 1, 8, 0),
+                             status="Booked", total_price=5.0, seats_selected=1, confirmation_email=passenger.email))
+    db.session.commit()
+    return driver, passenger, stranger, ride
+
+def socket_for(user_id):
+    http_client = client_for(user_id)
+    return as_user(socketio.test_client, app, flask_test_client=http_client), http_client
+
+def emit(socket, event, payload):
+    return as_user(socket.emit, event, payload, callback=True)
+
+def received(socket, event):
+    return [packet["args"][0] for packet in socket.get_received() if packet["name"] == event]
+
+# Test 5: Only the driver and the passengers booked on that date can join a ride's tracking room
+def test_join_tracking_authorization(tracked_ride):
+    driver, passenger, stranger, ride = tracked_ride
+    location_store.set_driver(ride.id, "2030-05-01", 53.80, -1.55)
+
+    driver_socket, _ = socket_for(driver.id)
+    passenger_socket, _ = socket_for(passenger.id)
+    stranger_socket, _ = socket_for(stranger.id)
+
+    reply = emit(passenger_socket, "join_tracking", {"ride_id": ride.id, "ride_date": "2030-05-01"})
+    assert reply == {"success": True, "role": "passenger", "driver": [53.80, -1.55], "passenger": {}, "nearby": False,
+                     "proximity": {}}
+    assert emit(driver_socket, "join_tracking", {"ride_id": ride.id, "ride_date": "2030-05-01"})["role"] == "driver"
+
+    assert emit(passenger_socket, "join_tracking", {"ride_id": ride.id, "ride_date": "2030-05-02"})["success"] is False
+    assert emit(stranger_socket, "join_tracking", {"ride_id": ride.id, "ride_date": "2030-05-01"})["success"] is False
+    assert emit(stranger_socket, "location_update", {"ride_id": ride.id, "ride_date": "2030-05-01",
+                                                     "latitude": 53.8, "longitude": -1.55})["success"] is False
+
+# Test 6: Location updates on the socket are stored and pushed to the ride's room as deltas
+def test_location_updates_are_pushed(tracked_ride):
+    driver, passenger, stranger, ride = tracked_ride
+    driver_socket, _ = socket_for(driver.id)
+    passenger_socket, passenger_http = socket_for(passenger.id)
+    for socket in (driver_socket, passenger_socket):
+        emit(socket, "join_tracking", {"ride_id": ride.id, "ride_date": "2030-05-01"})
+        socket.get_received()
+
+    emit(driver_socket, "location_update", {"ride_id": ride.id, "ride_date": "2030-05-01", "latitude": 53.8000, "longitude": -1.5500})
+    # Everyone in the room gets the delta, the sender included (it redraws from the same events)
+    assert received(passenger_socket, "location") == [{"driver": [53.8, -1.55], "nearby": False, "proximity": {}}]
+    assert received(driver_socket, "location") == [{"driver": [53.8, -1.55], "nearby": False, "proximity": {}}]
+
+    emit(passenger_socket, "location_update", {"ride_id": ride.id, "ride_date": "2030-05-01", "latitude": 53.8003, "longitude": -1.5502})
+    [update] = received(driver_socket, "location")
+    assert update["passenger"] == {"stream_rider": [53.8003, -1.5502]} and update["nearby"] is True
+    assert update["proximity"]["stream_rider"]["nearby"] is True
+    assert location_store.get_ride(ride.id, "2030-05-01") == ((53.8, -1.55), {"stream_rider": (53.8003, -1.5502)})
+
+    # Clients still on the HTTP endpoints are pushed to the room too
+    as_user(passenger_http.post, "/api/track_passenger_location", json={"ride_id": str(ride.id), "ride_date": "2030-05-01",
+                                                                        "latitude": 53.9, "longitude": -1.6})
+    [update] = received(driver_socket, "location")
+    assert update["passenger"] == {"stream_rider": [53.9, -1.6]} and update["nearby"] is False
+
+# Test 7: Starting and finishing the journey pushes the status to everyone tracking the ride
+def test_journey_status_is_pushed(tracked_ride):
+    driver, passenger, stranger, ride = tracked_ride
+    _, driver_http = socket_for(driver.id)
+    passenger_socket, _ = socket_for(passenger.id)
+    emit(passenger_socket, "join_tracking", {"ride_id": ride.id, "ride_date": "2030-05-01"})
+
+    as_user(driver_http.post, "/api/start_journey", json={"ride_id": ride.id, "ride_date": "2030-05-01"})
+    as_user(driver_http.post, "/api/finish_journey", json={"ride_id": ride.id, "ride_date": "2030-05-01"})
+    assert received(passenger_socket, "ride_status") == [{"status": "ongoing"}, {"status": "done"}]
+
+# Test 8: The HTTP tracking endpoints only take positions from the ride's driver and its passengers on that date
+def test_tracking_endpoints_authorization(tracked_ride):
+    driver, passenger, stranger, ride = tracked_ride
+    stranger_http, passenger_http = client_for(stranger.id), client_for(passenger.id)
+    position = {"ride_id": ride.id, "ride_date": "2030-05-01", "latitude": 53.8, "longitude": -1.55}
+
+    for endpoint in ("track_passenger_location", "track_driver_location", "check_arrival", "update_passenger_pickup_location"):
+        assert as_user(stranger_http.post, f"/api/{endpoint}", json=position).status_code == 403
+    assert as_user(passenger_http.post, "/api/track_driver_location", json=position).status_code == 403
+    assert as_user(passenger_http.post, "/api/track_passenger_location", json=dict(position, ride_date="2030-05-02")).status_code == 403
+    assert location_store.get_ride(ride.id, "2030-05-01") == (None, {})
+
+    assert as_user(passenger_http.post, "/api/track_passenger_location", json=position).status_code == 200
+
+# Test 9: A passenger who cancels stops getting the ride's positions and can no longer send theirs
+def test_canceled_passenger_leaves_tracking(tracked_ride):
+    driver, passenger, stranger, ride = tracked_ride
+    booking = book_ride.query.filter_by(user_id=passenger.id).one()
+    db.session.add(Payment(user_id=passenger.id, ride_id=ride.id, book_ride_id=booking.id, amount=5.0, status="Success"))
+    db.session.commit()
+    driver_socket, _ = socket_for(driver.id)
+    passenger_socket, passenger_http = socket_for(passenger.id)
+    for socket in (driver_socket, passenger_socket):
+        emit(socket, "join_tracking", {"ride_id": ride.id, "ride_date": "2030-05-01"})
+
+    # Cancelled on this process: the passenger's sockets are taken out of the room right away
+    assert as_user(passenger_http.post, f"/cancel_booking/{booking.id}").status_code == 200
+    passenger_socket.get_received()
+    emit(driver_socket, "location_update", {"ride_id": ride.id, "ride_date": "2030-05-01", "latitude": 53.8, "longitude": -1.55})
+    assert received(passenger_socket, "location") == []
+
+    # The role cached at join is checked again, e.g. when the cancel went through another process
+    reply = emit(passenger_socket, "location_update", {"ride_id": ride.id, "ride_date": "2030-05-01", "latitude": 53.9, "longitude": -1.6})
+    assert reply == {"success": False, "error": "Unauthorized"}
+    assert location_store.get_ride(ride.id, "2030-05-01")[1] == {}
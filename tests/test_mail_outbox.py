@@ -0,0 +1,127 @@
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from app import app, db
+from app.models import User, OutboundEmail
+from app.mailer import queue_email, dispatch_pending, dispatcher, FileBackend
+
+# ---------------------- FIXTURES ----------------------
+
+DATA = {
+    "username": "mailuser",
+    "email": "mailuser@gmail.com",
+    "password": "password123#",
+    "confirm_password": "password123#"
+}
+
+@pytest.fixture
+def client(tmp_path):
+    app.config["MAIL_FILE_DIR"] = str(tmp_path)
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+            OutboundEmail.query.delete()
+            db.session.commit()
+            yield client
+            db.session.remove()
+            db.drop_all()
+
+class FailingBackend:
+    def deliver(self, emails):
+        return {email.id: "connection refused" for email in emails}
+
+# -------------------- TEST CASES --------------------
+
+# Test 1: Password reset is queued in the outbox instead of being sent inside the request
+def test_password_reset_is_queued(client):
+    client.post("/register", json=DATA)
+    response = client.post("/forgot-password", json={"email": DATA["email"]})
+    assert response.status_code == 200
+
+    email = OutboundEmail.query.one()
+    assert email.status == "pending"
+    assert email.get_recipients() == [DATA["email"]]
+    assert "/reset-password/" in email.body
+
+# Test 2: The file backend writes queued emails to disk and marks them sent
+def test_dispatch_with_file_backend(client, tmp_path):
+    queue_email("rider@gmail.com", "Booking Confirmation", "See you soon")
+    db.session.commit()
+
+    assert dispatch_pending(FileBackend()) == 1
+    email = OutboundEmail.query.one()
+    assert email.status == "sent" and email.attempts == 1
+    with open(tmp_path / f"{email.id}.eml") as f:
+        assert "Booking Confirmation" in f.read()
+
+    # Nothing left to send
+    assert dispatch_pending(FileBackend()) == 0
+
+# Test 3: Failed deliveries back off exponentially and give up after MAIL_MAX_ATTEMPTS
+def test_dispatch_retry_backoff(client):
+    queue_email(["rider@gmail.com"], "Password Reset Request", "link")
+    db.session.commit()
+
+    assert dispatch_pending(FailingBackend()) == 1
+    email = OutboundEmail.query.one()
+    assert email.status == "pending" and email.attempts == 1
+    assert email.last_error == "connection refused"
+    assert email.next_attempt_at > datetime.utcnow() + timedelta(seconds=app.config["MAIL_RETRY_BASE"] - 5)
+
+    # Not due yet
+    assert dispatch_pending(FailingBackend()) == 0
+
+    for attempt in range(2, app.config["MAIL_MAX_ATTEMPTS"] + 1):
+        email.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        assert dispatch_pending(FailingBackend()) == 1
+        assert email.attempts == attempt
+    assert email.status == "failed"
+
+# Test 4: A rolled back transaction leaves nothing in the outbox
+def test_rolled_back_email_is_not_sent(client):
+    queue_email("rider@gmail.com", "Booking Confirmation", "See you soon")
+    db.session.rollback()
+    assert OutboundEmail.query.count() == 0
+
+# Test 5: The dispatcher thread sends the email once the request's transaction commits
+def test_dispatcher_thread_sends_after_commit(client, tmp_path):
+    app.config.update(MAIL_DISPATCHER_THREAD=True, MAIL_BACKEND="file")
+    try:
+        client.post("/register", json=DATA)
+        response = client.post("/forgot-password", json={"email": DATA["email"]})
+        assert response.status_code == 200
+
+        deadline = time.monotonic() + 5
+        while not os.listdir(tmp_path) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert len(os.listdir(tmp_path)) == 1
+    finally:
+        dispatcher.stop()
+        app.config.update(MAIL_DISPATCHER_THREAD=False, MAIL_BACKEND="console")
+
+    db.session.expire_all()
+    assert OutboundEmail.query.one().status == "sent"
+
+# Test 6: The standalone mail worker logs a failed dispatch and keeps polling
+def test_mail_worker_survives_errors(client, monkeypatch, caplog):
+    import app.commands as commands
+    import app.mailer as mailer
+    outcomes = iter([RuntimeError("database is locked"), False, KeyboardInterrupt()])
+    def dispatch():
+        outcome = next(outcomes)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+    monkeypatch.setattr(mailer, "dispatch_pending", dispatch)
+    monkeypatch.setattr(commands, "sleep", lambda seconds: None)
+
+    result = app.test_cli_runner().invoke(args=["mail-worker"])
+    assert result.exit_code == 1  # Ctrl+C (click reports it as Aborted!)
+    assert next(outcomes, "done") == "done"  # polled again after the error, until interrupted
+    assert "Mail worker error" in caplog.text and "database is locked" in caplog.text
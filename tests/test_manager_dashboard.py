@@ -6,7 +6,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 import pytest
 from app import app, db
-from app.models import User, publish_ride, book_ride
+from app.models import User, publish_ride, book_ride, Payment, PlatformCounter, PlatformDailyRevenue, rebuild_platform_stats
 from werkzeug.security import generate_password_hash
 
 # ---------------------- FIXTURES ----------------------
@@ -143,4 +143,55 @@ def test_weekly_income_chart_present(client):
     login_as(client, manager.id)
     res = client.get("/manager/dashboard")
     assert res.status_code == 200
-    assert b"chart" in res.data.lower() or b"earnings_chart_values" in res.data or b"<canvas" in res.data
\ No newline at end of file
+    assert b"chart" in res.data.lower() or b"earnings_chart_values" in res.data or b"<canvas" in res.data
+
+# Test 10: Dashboard stats follow bookings and payments (per fee rate, refunds excluded) and match a rebuild
+def test_platform_stats_rollup(client):
+    manager = create_manager_user()
+    user, ride = create_normal_user_and_ride()
+    bookings_before = PlatformCounter.get("bookings")
+    rides_before = PlatformCounter.get("rides_published")
+
+    booking = book_ride(user_id=user.id, ride_id=ride.id, ride_date=datetime(2030, 3, 5).date(),
+                        status="Booked", total_price=100.0, seats_selected=1, confirmation_email=user.email)
+    db.session.add(booking)
+    db.session.commit()
+    assert PlatformCounter.get("bookings") == bookings_before + 1
+
+    payments = [
+        Payment(user_id=user.id, ride_id=ride.id, book_ride_id=booking.id, amount=100.0,
+                status="Success", timestamp=datetime(2030, 3, 5, 12, 0), platform_fee=0.01),
+        Payment(user_id=user.id, ride_id=ride.id, book_ride_id=booking.id, amount=200.0,
+                status="Success", timestamp=datetime(2030, 3, 5, 13, 0), platform_fee=0.02),
+        Payment(user_id=user.id, ride_id=ride.id, book_ride_id=booking.id, amount=50.0,
+                status="Success", timestamp=datetime(2030, 3, 6, 9, 0), platform_fee=0.01),
+        Payment(user_id=user.id, ride_id=ride.id, book_ride_id=booking.id, amount=80.0,
+                status="Success", timestamp=datetime(2030, 3, 5, 14, 0), platform_fee=0.0),
+    ]
+    db.session.add_all(payments)
+    db.session.commit()
+
+    day = PlatformDailyRevenue.query.get((datetime(2030, 3, 5).date(), 0.01))
+    assert day.payments == 1 and round(day.platform_fees, 2) == 1.0
+    assert round(PlatformDailyRevenue.query.get((datetime(2030, 3, 5).date(), 0.02)).platform_fees, 2) == 4.0
+    # A 0 fee is its own rate, not the default one
+    zero_fee = PlatformDailyRevenue.query.get((datetime(2030, 3, 5).date(), 0.0))
+    assert zero_fee.payments == 1 and zero_fee.platform_fees == 0.0
+
+    # Refunded payments no longer count towards platform revenue
+    payments[2].refunded = True
+    db.session.commit()
+    assert PlatformDailyRevenue.query.get((datetime(2030, 3, 6).date(), 0.01)).payments == 0
+
+    incremental = {(row.day, row.fee_rate): round(row.platform_fees, 6)
+                   for row in PlatformDailyRevenue.query.all() if row.payments}
+    rebuild_platform_stats()
+    rebuilt = {(row.day, row.fee_rate): round(row.platform_fees, 6) for row in PlatformDailyRevenue.query.all()}
+    assert incremental == rebuilt
+    assert PlatformCounter.get("rides_published") == rides_before
+
+    login_as(client, manager.id)
+    res = client.get("/manager/dashboard")
+    assert res.status_code == 200
+    assert b"2030-W09" in res.data
+    assert b"Platform Earnings Per Fee Rate" in res.data
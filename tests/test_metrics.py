@@ -0,0 +1,123 @@
+import sys
+import os
+import threading
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from app import app, db
+from app.models import User, publish_ride, book_ride, Payment
+from app.metrics import Metrics
+from app.location_store import location_store
+from werkzeug.security import generate_password_hash
+
+# ---------------------- FIXTURES ----------------------
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.create_all()
+        location_store.clear()
+        with app.test_client() as client:
+            yield client
+        location_store.clear()
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def booking(client):
+    passenger = User(username="metrics_rider", email="metrics_rider@gmail.com", password_hash=generate_password_hash("Test@1234"))
+    driver = User(username="metrics_driver", email="metrics_driver@gmail.com", password_hash=generate_password_hash("x"))
+    db.session.add_all([passenger, driver])
+    db.session.commit()
+    ride = publish_ride(from_location="Leeds", to_location="York", category="one-time",
+                        date_time=datetime.now() + timedelta(days=2), available_seats_per_date={},
+                        price_per_seat=10.0, driver_id=driver.id, driver_name=driver.username)
+    db.session.add(ride)
+    db.session.commit()
+    booking = book_ride(user_id=passenger.id, ride_id=ride.id, seats_selected=1, status="Booked", total_price=10.0,
+                        ride_date=datetime.now() + timedelta(days=2), confirmation_email=passenger.email)
+    db.session.add(booking)
+    db.session.commit()
+    db.session.add(Payment(user_id=passenger.id, ride_id=ride.id, book_ride_id=booking.id, amount=10.0, status="Success"))
+    db.session.commit()
+    client.post("/login", json={"email": "metrics_rider@gmail.com", "password": "Test@1234"})
+    return booking.id
+
+# The /metrics samples as {"name{labels}": value}
+def scrape(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+# -------------------- TEST CASES --------------------
+
+# Test 1: Counts from several threads add up, and histograms are rendered with cumulative buckets
+def test_per_thread_counters_add_up():
+    registry = Metrics(buckets=(0.1, 1.0))
+
+    def work():
+        for _ in range(1000):
+            registry.count("chat_messages_total")
+        registry.observe("http_request_duration_seconds", 0.5, endpoint="rides.home")
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    registry.count("payments_total", status='Partially "Refunded"')
+    text = registry.render()
+
+    assert "catchmyride_chat_messages_total 8000" in text
+    assert 'catchmyride_http_request_duration_seconds_bucket{endpoint="rides.home",le="0.1"} 0' in text
+    assert 'catchmyride_http_request_duration_seconds_bucket{endpoint="rides.home",le="1.0"} 8' in text
+    assert 'catchmyride_http_request_duration_seconds_bucket{endpoint="rides.home",le="+Inf"} 8' in text
+    assert 'catchmyride_http_request_duration_seconds_sum{endpoint="rides.home"} 4' in text
+    assert 'catchmyride_payments_total{status="Partially \\"Refunded\\""} 1' in text
+    # The worker threads have finished, so their shards were folded away; only this thread's is left
+    assert [shard.thread for shard in registry.shards] == [threading.current_thread()]
+
+# Test 2: Requests are counted and timed per endpoint, with their SQL statements and the in-flight gauge
+def test_request_metrics(booking, client):
+    before = scrape(client)
+    client.get("/dashboard")
+    client.get("/no-such-page")
+    after = scrape(client)
+
+    def delta(name):
+        return after.get(name, 0) - before.get(name, 0)
+
+    assert delta('catchmyride_http_requests_total{endpoint="booking.dashboard",method="GET",status="200"}') == 1
+    assert delta('catchmyride_http_requests_total{endpoint="unmatched",method="GET",status="404"}') == 1
+    assert delta('catchmyride_http_request_duration_seconds_count{endpoint="booking.dashboard"}') == 1
+    assert delta('catchmyride_db_queries_total{endpoint="booking.dashboard"}') >= 1
+    assert after["catchmyride_http_requests_in_progress"] == 1  # the scrape itself
+
+# Test 3: Cancellations, refunds, chat messages and live tracking positions are reported
+def test_business_counters(booking, client):
+    before = scrape(client)
+    assert client.post(f"/cancel_booking/{booking}").status_code == 200
+    assert client.post("/send_message", json={"booking_id": booking, "message": "On my way"}).status_code == 200
+    location_store.set_driver(1, None, 53.80, -1.55)
+    location_store.set_passenger(1, None, 7, "metrics_rider", 53.81, -1.56)
+    after = scrape(client)
+
+    assert after['catchmyride_cancellations_total{refund="full"}'] - before.get('catchmyride_cancellations_total{refund="full"}', 0) == 1
+    assert after["catchmyride_refunded_gbp_total"] - before.get("catchmyride_refunded_gbp_total", 0) == 10.0
+    assert after["catchmyride_chat_messages_total"] - before.get("catchmyride_chat_messages_total", 0) == 1
+    assert after["catchmyride_live_tracking_rides"] == 1 and after["catchmyride_live_locations"] == 2
+
+# Test 4: With METRICS_TOKEN set, /metrics needs the bearer token
+def test_metrics_token(client, monkeypatch):
+    monkeypatch.setitem(app.config, "METRICS_TOKEN", "s3cret")
+
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer s3cret"}).status_code == 200
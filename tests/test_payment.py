@@ -224,7 +224,7 @@ def test_booking_dashboard_and_email(client, setup_ride_and_user):
     }
 
     # Patch the email function to avoid sending real email
-    with patch("app.views.send_booking_confirmation_email") as mock_send_email:
+    with patch("app.views.booking.send_booking_confirmation_email") as mock_send_email:
         response = client.post("/process_payment", json=payload)
         assert response.status_code == 200
         assert response.json["success"] is True
@@ -4,12 +4,13 @@ from datetime import datetime
 from unittest.mock import patch
 from flask import url_for
 import json
+import threading
 
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 import pytest
 from app import app, db
-from app.models import User, publish_ride, SavedCard, book_ride
+from app.models import User, publish_ride, SavedCard, book_ride, RideSeatInventory
 
 # ---------------------- FIXTURES ----------------------
 
@@ -124,14 +125,13 @@ def test_commuting_invalid_seat_date(client, setup_commuting_ride):
     }
     response = client.post("/process_payment", json=payload)
 
-    assert response.status_code == 200
-    assert response.json["success"] is True
-    assert "Payment successful" in response.json["message"]
+    # Not enough seats on one date: nothing is booked, on any date
+    assert response.status_code == 409
+    assert response.json["success"] is False
+    assert "No available seats" in response.json["message"]
 
-    # Optionally verify that seats have been reduced to zero (depending on your logic)
-    updated_ride = publish_ride.query.get(ride.id)
-    updated_seats = json.loads(updated_ride.available_seats_per_date)
-    assert updated_seats["2025-12-02"] == 0
+    assert RideSeatInventory.seats_by_date(ride.id) == {"2025-12-01": 4, "2025-12-02": 3, "2025-12-03": 5}
+    assert book_ride.query.filter_by(confirmation_email="fail@commute.com").count() == 0
 
 # Test 4: Verifies for booking confirmation email sent after successful booking of the ride
 def test_commuting_booking_and_email(client, setup_commuting_ride):
@@ -150,7 +150,7 @@ def test_commuting_booking_and_email(client, setup_commuting_ride):
         "save_card": False
     }
 
-    with patch("app.views.send_booking_confirmation_email") as mock_send_email:
+    with patch("app.views.booking.send_booking_confirmation_email") as mock_send_email:
         response = client.post("/process_payment", json=payload)
         assert response.status_code == 200
         assert response.json["success"] is True
@@ -187,3 +187,42 @@ def test_commuting_ride_displayed_on_dashboard(client, setup_commuting_ride):
     assert b"Bath" in dashboard_response.data  
 
 
+
+# Test 6: Parallel payments for one ride never sell more seats than are left
+def test_concurrent_payments_do_not_oversell(client, setup_commuting_ride):
+    ride = setup_commuting_ride
+    user_id = ride.driver_id
+    ride_id = ride.id
+    attempts = 10  # 4 seats left on 2025-12-01
+    barrier = threading.Barrier(attempts)
+    statuses = []
+
+    def pay(index):
+        with app.test_client() as thread_client:
+            with thread_client.session_transaction() as sess:
+                sess["_user_id"] = str(user_id)
+            barrier.wait()
+            response = thread_client.post("/process_payment", json={
+                "ride_id": ride_id,
+                "seats": 1,
+                "total_price": 10,
+                "selected_dates": ["2025-12-01"],
+                "email": f"race{index}@commute.com",
+                "card_number": "1111222233334444",
+                "expiry": "12/29",
+                "cardholder_name": "Race Tester",
+                "save_card": False
+            })
+            statuses.append(response.status_code)
+
+    with patch("app.views.booking.send_booking_confirmation_email"):
+        threads = [threading.Thread(target=pay, args=(index,)) for index in range(attempts)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert sorted(statuses) == [200] * 4 + [409] * 6
+    db.session.expire_all()
+    assert RideSeatInventory.seats_by_date(ride_id)["2025-12-01"] == 0
+    assert book_ride.query.filter(book_ride.confirmation_email.like("race%@commute.com")).count() == 4
@@ -0,0 +1,74 @@
+import sys
+import os
+import logging
+import pstats
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from flask import Flask
+from sqlalchemy import event, text
+from app import db, profiling
+
+# ---------------------- FIXTURES ----------------------
+
+# A small app with its own in-memory database, so profiling can be switched on without touching the main app
+def make_app(**config):
+    flask_app = Flask(__name__)
+    flask_app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", **config)
+    db.init_app(flask_app)
+    profiling.init_app(flask_app)
+
+    @flask_app.route("/queries/<int:count>")
+    def run_queries(count):
+        for number in range(count):
+            db.session.execute(text("SELECT :number"), {"number": number}).scalar()
+        return "ok"
+
+    return flask_app
+
+@pytest.fixture
+def profiled_app(tmp_path):
+    return make_app(PROFILING=True, PROFILING_SLOW_MS=10000, PROFILING_MAX_QUERIES=5, PROFILING_DIR=str(tmp_path))
+
+# -------------------- TEST CASES --------------------
+
+# Test 1: Each response carries the request's query count and database / app / total time
+def test_server_timing_header(profiled_app):
+    response = profiled_app.test_client().get("/queries/3")
+    timing = response.headers["Server-Timing"]
+
+    assert timing.startswith('db;desc="3 queries";dur=')
+    assert "app;dur=" in timing and "total;dur=" in timing
+
+# Test 2: A request over the query budget is logged with its repeated statement
+def test_request_over_budget_is_logged(profiled_app, caplog):
+    client = profiled_app.test_client()
+    with caplog.at_level(logging.WARNING, logger=profiled_app.logger.name):
+        client.get("/queries/5")
+        assert caplog.records == []
+        client.get("/queries/6")
+
+    message = caplog.records[-1].getMessage()
+    assert message.startswith("Slow request GET /queries/6 -> 200:") and "6 queries" in message
+    assert "6 x     SELECT ?" in message
+
+# Test 3: Sampled requests are profiled with cProfile and written to PROFILING_DIR
+def test_sampled_requests_dump_profiles(tmp_path):
+    flask_app = make_app(PROFILING=True, PROFILING_SAMPLE_RATE=1.0, PROFILING_DIR=str(tmp_path / "profiles"))
+    flask_app.test_client().get("/queries/2")
+
+    [dump] = os.listdir(tmp_path / "profiles")
+    assert dump.startswith(tuple("0123456789")) and "-GET-run_queries-" in dump and dump.endswith(".prof")
+    functions = {name for _, _, name in pstats.Stats(str(tmp_path / "profiles" / dump)).stats}
+    assert "run_queries" in functions
+
+# Test 4: With PROFILING off no hook or engine event is registered
+def test_profiling_off_registers_nothing():
+    flask_app = make_app(PROFILING=False)
+    response = flask_app.test_client().get("/queries/2")
+
+    assert "Server-Timing" not in response.headers
+    assert profiling.start_request_profile not in flask_app.before_request_funcs.get(None, [])
+    with flask_app.app_context():
+        assert not event.contains(db.engine, "before_cursor_execute", profiling.before_cursor_execute)
@@ -0,0 +1,53 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from geopy.distance import geodesic
+from app.proximity import haversine_many, proximity, passengers_nearby, geodesic_nearby, benchmark
+
+DRIVER = (53.8008, -1.5491)
+
+# -------------------- TEST CASES --------------------
+
+# Test 1: The vectorized haversine is within the sphere's error of geopy's geodesic
+def test_haversine_matches_geodesic():
+    points = np.array(DRIVER) + np.random.default_rng(1).normal(scale=0.05, size=(50, 2))
+    distances = haversine_many(DRIVER, points)
+    expected = np.array([geodesic(tuple(point), DRIVER).meters for point in points])
+    assert np.all(np.abs(distances - expected) <= expected * 0.0056)
+
+# Test 2: Nearby flags agree with the geopy loop, including passengers right at the radius
+def test_nearby_flags_match_geodesic_loop():
+    rng = np.random.default_rng(2)
+    passengers = {}
+    for i in range(200):
+        # Points 95-105 m away in random directions: the haversine alone gets some of these wrong
+        bearing = rng.uniform(0, 360)
+        point = geodesic(meters=rng.uniform(95, 105)).destination(DRIVER, bearing)
+        passengers[f"p{i}"] = (point.latitude, point.longitude)
+    assert sorted(passengers_nearby(DRIVER, passengers)) == sorted(geodesic_nearby(DRIVER, passengers))
+
+# Test 3: Every passenger gets a distance, an ETA and a nearby flag
+def test_proximity_per_passenger():
+    near = geodesic(meters=40).destination(DRIVER, 90)
+    far = geodesic(meters=2500).destination(DRIVER, 180)
+    result = proximity(DRIVER, {"near": (near.latitude, near.longitude), "far": (far.latitude, far.longitude)},
+                       radius=100, speed_kmh=36)
+
+    assert result["near"]["nearby"] is True and abs(result["near"]["distance"] - 40) < 1
+    assert result["far"]["nearby"] is False and abs(result["far"]["distance"] - 2500) < 15
+    assert abs(result["far"]["eta"] - 250) <= 2  # 2.5 km at 10 m/s
+
+# Test 4: No driver position or no passengers means no results
+def test_proximity_without_positions():
+    assert proximity(None, {"a": DRIVER}) == {}
+    assert proximity(DRIVER, {}) == {}
+    assert proximity(DRIVER, {"a": None}) == {}
+
+# Test 5: The microbenchmark times both implementations
+def test_benchmark_runs():
+    results = benchmark(counts=(1, 8), repeats=1)
+    assert [count for count, _, _ in results] == [1, 8]
+    assert all(loop > 0 and batched > 0 for _, loop, batched in results)
@@ -0,0 +1,76 @@
+import sys
+import os
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from sqlalchemy import not_
+from sqlalchemy.engine import make_url
+from app import app, db
+from app.models import publish_ride, book_ride, Payment, ChatMessage, EditProposal, RideRating
+
+DAY = date(2030, 5, 1)
+
+# The plans are read from SQLite's EXPLAIN QUERY PLAN
+pytestmark = pytest.mark.skipif(make_url(app.config["SQLALCHEMY_DATABASE_URI"]).get_backend_name() != "sqlite",
+                                reason="query plans are checked on SQLite")
+
+# ---------------------- FIXTURES ----------------------
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.create_all()
+        with app.test_client() as client:
+            yield client
+        db.session.remove()
+        db.drop_all()
+
+# SQLite's plan for a query: one detail line per step, e.g. "SEARCH book_ride USING INDEX ix_... (ride_id=?)"
+def query_plan(query):
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = compiled.construct_params()
+    rows = db.session.connection().exec_driver_sql(
+        "EXPLAIN QUERY PLAN " + str(compiled), tuple(params[name] for name in compiled.positiontup)
+    ).all()
+    return [row[-1] for row in rows]
+
+# The hot queries of the views, with the table each one must reach through an index
+HOT_QUERIES = {
+    "start/finish_journey: a ride's bookings on a date": (
+        "book_ride", lambda: book_ride.query.filter(book_ride.ride_id == 1, book_ride.on_date(DAY))),
+    "view_pickup: a ride's passengers": (
+        "book_ride", lambda: book_ride.query.filter(book_ride.ride_id == 1, not_(book_ride.status == "Canceled"))),
+    "view_pickup_commute / ride_status: a user's booking of a ride on a date": (
+        "book_ride", lambda: book_ride.query.filter(book_ride.user_id == 1, book_ride.ride_id == 1, book_ride.on_date(DAY))),
+    "dashboard: a user's bookings": (
+        "book_ride", lambda: book_ride.query.filter_by(user_id=1)),
+    "dashboard: a driver's rides": (
+        "publish_ride", lambda: publish_ride.query.filter_by(driver_id=1)),
+    "cancel_booking / respond_proposal: a booking's payment": (
+        "payment", lambda: Payment.query.filter_by(book_ride_id=1)),
+    "earnings: a ride's payments": (
+        "payment", lambda: Payment.query.filter(Payment.ride_id == 1).order_by(Payment.timestamp)),
+    "chat: a booking's messages": (
+        "chat_message", lambda: ChatMessage.query.filter_by(booking_id=1).order_by(ChatMessage.timestamp)),
+    "chat: a booking's proposals": (
+        "edit_proposal", lambda: EditProposal.query.filter_by(booking_id=1).order_by(EditProposal.timestamp)),
+    "submit_rating: existing rating": (
+        "ride_rating", lambda: RideRating.query.filter_by(ride_id=1, passenger_id=1, ride_date=DAY)),
+}
+
+# -------------------- TEST CASES --------------------
+
+# Test 1: Every hot query searches its table through an index instead of scanning it
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def test_hot_query_uses_index(client, name):
+    table, build = HOT_QUERIES[name]
+    plan = query_plan(build())
+    assert any(line.startswith(f"SEARCH {table} USING") for line in plan), plan
+    assert not any(line.startswith(f"SCAN {table}") for line in plan), plan
+
+# Test 2: on_date() is a half-open range over the whole day
+def test_on_date_range(client):
+    plan = query_plan(book_ride.query.filter(book_ride.ride_id == 1, book_ride.on_date(DAY)))
+    assert any("ride_date>? AND ride_date<?" in line for line in plan), plan
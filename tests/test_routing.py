@@ -0,0 +1,152 @@
+import sys
+import os
+import time
+import itertools
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+import numpy as np
+from app import app, db, geocoding
+from app.models import User, publish_ride, book_ride, EditProposal, PickupRoute
+from app.routing import optimize_order, route_matrix, path_length, heuristic_order
+from werkzeug.security import generate_password_hash
+
+ORIGIN = (53.8008, -1.5491)       # Leeds
+DESTINATION = (53.9590, -1.0815)  # York
+
+# ---------------------- FIXTURES ----------------------
+
+# Local geocoder stub: no network
+class StubGeocoder:
+    def __init__(self, places):
+        self.places = places
+
+    def geocode(self, address):
+        return self.places.get(address.strip().lower())
+
+@pytest.fixture
+def client():
+    with app.app_context():
+        db.create_all()
+        with app.test_client() as client:
+            yield client
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def stub_geocoder(client):
+    original = geocoding.geocoder
+    geocoding.set_geocoder(StubGeocoder({
+        "route test headingley": (53.8190, -1.5800),
+        "route test seacroft": (53.8200, -1.4600),
+        "route test garforth": (53.7950, -1.3880),
+    }))
+    yield
+    geocoding.set_geocoder(original)
+
+def client_for(user_id):
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(user_id)
+    return client
+
+# Each request runs in its own app context, so Flask-Login doesn't reuse the previous caller's user (cached on g)
+def as_user(action, *args, **kwargs):
+    with app.app_context():
+        return action(*args, **kwargs)
+
+def random_stops(count, seed):
+    offsets = np.random.default_rng(seed).normal(scale=0.05, size=(count, 2))
+    return [(ORIGIN[0] + dlat, ORIGIN[1] + dlon) for dlat, dlon in offsets]
+
+# -------------------- TEST CASES --------------------
+
+# Test 1: Up to the exact limit the order is the shortest of all permutations
+def test_exact_order_is_optimal():
+    for seed in range(5):
+        stops = random_stops(7, seed)
+        order, length = optimize_order(ORIGIN, stops, DESTINATION, exact_limit=8)
+        distances = route_matrix(ORIGIN, stops, DESTINATION)
+        best = min(path_length(distances, [0] + [i + 1 for i in perm] + [8]) for perm in itertools.permutations(range(7)))
+        assert sorted(order) == list(range(7))
+        assert length == pytest.approx(best)
+
+# Test 2: Without a destination the path may end anywhere
+def test_open_ended_order():
+    stops = [(53.80, -1.50), (53.80, -1.40), (53.80, -1.45)]
+    order, _ = optimize_order((53.80, -1.55), stops)
+    assert order == [0, 2, 1]
+
+# Test 3: Larger rides use nearest-neighbour + 2-opt: never worse than nearest-neighbour alone, and fast
+def test_heuristic_order():
+    stops = random_stops(60, 42)
+    distances = route_matrix(ORIGIN, stops, DESTINATION)
+
+    remaining, path = set(range(1, 61)), [0]
+    while remaining:
+        path.append(min(remaining, key=lambda stop: distances[path[-1]][stop]))
+        remaining.remove(path[-1])
+    nearest_neighbour = path_length(distances, path + [61])
+
+    started = time.perf_counter()
+    order, length = optimize_order(ORIGIN, stops, DESTINATION)
+    assert time.perf_counter() - started < 1
+    assert sorted(order) == list(range(60))
+    assert length <= nearest_neighbour
+
+    # 2-opt leaves no improving reversal
+    assert heuristic_order(distances, 60) == [stop + 1 for stop in order]
+
+# Test 4: The driver gets the cached pickup order, recomputed after a booking or a proposal changes
+def test_pickup_route_cached_and_invalidated(stub_geocoder):
+    driver = User(username="route_driver", email="route_driver@gmail.com", password_hash=generate_password_hash("x"))
+    riders = [User(username=f"route_rider_{i}", email=f"route_rider_{i}@gmail.com", password_hash=generate_password_hash("x"))
+              for i in range(3)]
+    db.session.add_all([driver] + riders)
+    db.session.commit()
+    ride = publish_ride(driver_id=driver.id, driver_name=driver.username, from_location="Leeds", to_location="York",
+                        category="commuting", date_time=datetime(2030, 5, 1, 8, 0),
+                        available_seats_per_date='{"2030-05-01": 4}', price_per_seat=5.0,
+                        from_lat=ORIGIN[0], from_lon=ORIGIN[1], to_lat=DESTINATION[0], to_lon=DESTINATION[1])
+    db.session.add(ride)
+    db.session.commit()
+    bookings = [book_ride(user_id=rider.id, ride_id=ride.id, ride_date=datetime(2030, 5, 1, 8, 0), status="Booked",
+                          total_price=5.0, seats_selected=1, confirmation_email=rider.email) for rider in riders]
+    db.session.add_all(bookings)
+    db.session.commit()
+    for booking, pickup in zip(bookings, ["Route test Garforth", "Route test Headingley", "Route test Seacroft"]):
+        db.session.add(EditProposal(booking_id=booking.id, sender=driver.username, proposed_pickup=pickup, status="accepted"))
+    db.session.commit()
+
+    driver_http = client_for(driver.id)
+    route = as_user(driver_http.get, f"/api/pickup_route/{ride.id}/2030-05-01").get_json()
+    # Headingley is west of the Leeds origin, then east through Seacroft and Garforth towards York
+    assert [stop["username"] for stop in route["stops"]] == ["route_rider_1", "route_rider_2", "route_rider_0"]
+    assert route["stops"][0]["pickup"] == "Route test Headingley"
+    assert route["total_distance"] > sum(stop["leg"] for stop in route["stops"])  # plus the last leg to York
+    assert db.session.get(PickupRoute, (ride.id, "2030-05-01")) is not None
+
+    # A new accepted pickup invalidates the cached order
+    db.session.add(EditProposal(booking_id=bookings[1].id, sender=driver.username, proposed_pickup="Route test Garforth",
+                                status="accepted", timestamp=datetime(2031, 1, 1)))
+    db.session.commit()
+    db.session.expire_all()
+    assert db.session.get(PickupRoute, (ride.id, "2030-05-01")) is None
+    route = as_user(driver_http.get, f"/api/pickup_route/{ride.id}/2030-05-01").get_json()
+    assert [stop["username"] for stop in route["stops"]][0] == "route_rider_2"
+
+    # So does a cancellation
+    bookings[2].status = "Canceled"
+    db.session.commit()
+    route = as_user(driver_http.get, f"/api/pickup_route/{ride.id}/2030-05-01").get_json()
+    assert sorted(stop["username"] for stop in route["stops"]) == ["route_rider_0", "route_rider_1"]
+
+    # Only the driver can see it
+    assert as_user(client_for(riders[0].id).get, f"/api/pickup_route/{ride.id}/2030-05-01").status_code == 403
+
+    # The driver's pickup page lists the passengers in that order
+    first, second = [stop["username"] for stop in route["stops"]]
+    page = as_user(driver_http.get, f"/view_pickup_commute/{ride.id}/2030-05-01").get_data(as_text=True)
+    assert "Pickup order" in page and page.index(first) < page.index(second)
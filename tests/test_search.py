@@ -129,3 +129,69 @@ def test_search_one_time_only(client, register_and_login_user):
     assert b"Leeds" in response.data
     assert b"York" in response.data
     assert b"one-time" in response.data
+
+# Test 7: Search matches location words by prefix through the location index
+def test_search_location_prefix(client, register_and_login_user):
+    client.post("/publish_ride", data={
+        "from_location": "Leeds City Centre, Leeds",
+        "to_location": "Manchester Piccadilly, Manchester",
+        "category": "one-time",
+        "date_time": "2030-10-18 15:00",
+        "available_seats": "2",
+        "price_per_seat": "6.0"
+    })
+    response = client.get("/filter_journeys", query_string={"from": "leeds cit", "to": "picca"})
+    assert response.status_code == 200
+    assert b"Manchester Piccadilly" in response.data
+
+    response = client.get("/filter_journeys", query_string={"from": "York"})
+    assert b"Manchester Piccadilly" not in response.data
+
+# Test 8: Typeahead suggestions for the search banner
+def test_location_suggestions(client, register_and_login_user):
+    client.post("/publish_ride", data={
+        "from_location": "Headingley, Leeds",
+        "to_location": "York Station, York",
+        "category": "one-time",
+        "date_time": "2030-10-18 15:00",
+        "available_seats": "2",
+        "price_per_seat": "6.0"
+    })
+    response = client.get("/api/location_suggestions", query_string={"q": "head", "field": "from"})
+    assert response.json["suggestions"] == ["Headingley, Leeds"]
+
+    response = client.get("/api/location_suggestions", query_string={"q": "head", "field": "to"})
+    assert response.json["suggestions"] == []
+
+# Test 9: Nearby search matches rides by pickup/dropoff radius, closest detour first
+def test_search_nearby_radius(client, register_and_login_user):
+    for from_location, from_lat, from_lon in [
+        ("Leeds City Centre", "53.7997", "-1.5492"),
+        ("Leeds Station", "53.7950", "-1.5476"),
+        ("Bradford", "53.7960", "-1.7594")
+    ]:
+        client.post("/publish_ride", data={
+            "from_location": from_location,
+            "from_location_lat": from_lat,
+            "from_location_lon": from_lon,
+            "to_location": "York",
+            "to_location_lat": "53.9576",
+            "to_location_lon": "-1.0827",
+            "category": "one-time",
+            "date_time": "2030-10-18 15:00",
+            "available_seats": "2",
+            "price_per_seat": "6.0"
+        })
+
+    response = client.get("/api/search_nearby", query_string={
+        "from_lat": 53.7952, "from_lon": -1.5478, "to_lat": 53.9580, "to_lon": -1.0830, "radius": 1000
+    })
+    assert response.status_code == 200
+    rides = response.json["rides"]
+    assert [ride["from_location"] for ride in rides] == ["Leeds Station", "Leeds City Centre"]
+    assert rides[0]["detour_m"] <= rides[1]["detour_m"]
+
+# Test 10: Nearby search without coordinates
+def test_search_nearby_missing_coordinates(client):
+    response = client.get("/api/search_nearby", query_string={"from_lat": 53.79})
+    assert response.status_code == 400
@@ -0,0 +1,117 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+from datetime import date
+from app import app, db
+from app.models import User, publish_ride, book_ride, RideSeatInventory
+
+# ---------------------- FIXTURES ----------------------
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def register_and_login_user(client):
+    client.post("/register", json={
+        "username": "user123",
+        "email": "user123@gmail.com",
+        "password": "Test@1234",
+        "confirm_password": "Test@1234"
+    })
+    client.post("/login", json={"email": "user123@gmail.com", "password": "Test@1234"})
+
+@pytest.fixture
+def commuting_ride(client, register_and_login_user):
+    client.post("/publish_ride", data={
+        "from_location": "Leeds",
+        "to_location": "York",
+        "category": "commuting",
+        "recurrence_dates": ["2030-05-01", "2030-05-02"],
+        "commute_times": ["08:00"],
+        "available_seats": "3",
+        "price_per_seat": "6.0"
+    })
+    return publish_ride.query.order_by(publish_ride.id.desc()).first()
+
+# -------------------- TEST CASES --------------------
+
+# Test 1: Publishing a ride seeds one inventory row per date
+def test_inventory_seeded_on_publish(commuting_ride):
+    rows = RideSeatInventory.query.filter_by(ride_id=commuting_ride.id).all()
+    assert {(row.ride_date, row.seats_left) for row in rows} == {
+        (date(2030, 5, 1), 3),
+        (date(2030, 5, 2), 3)
+    }
+
+# Test 2: Search filters on seats left for the searched date in SQL
+def test_search_uses_inventory(client, commuting_ride):
+    inventory = RideSeatInventory.query.get((commuting_ride.id, date(2030, 5, 1)))
+    inventory.seats_left = 1
+    db.session.commit()
+
+    response = client.get("/filter_journeys", query_string={
+        "from": "Leeds", "to": "York", "date": "2030-05-01", "passengers": 2
+    })
+    assert b"York" not in response.data
+
+    response = client.get("/filter_journeys", query_string={
+        "from": "Leeds", "to": "York", "date": "2030-05-02", "passengers": 2
+    })
+    assert b"York" in response.data
+
+# Test 3: Payment decrements and cancellation restores the inventory row
+def test_payment_and_cancel_update_inventory(client, commuting_ride):
+    response = client.post("/process_payment", json={
+        "ride_id": commuting_ride.id,
+        "seats": 2,
+        "total_price": 12,
+        "selected_dates": ["2030-05-01"],
+        "email": "user123@gmail.com",
+        "card_number": "1234567812345678",
+        "expiry": "12/30",
+        "cardholder_name": "User",
+        "save_card": False
+    })
+    assert response.json["success"] is True
+    assert RideSeatInventory.seats_by_date(commuting_ride.id)["2030-05-01"] == 1
+
+    booking = book_ride.query.filter_by(ride_id=commuting_ride.id).first()
+    client.post(f"/cancel_booking/{booking.id}")
+    assert RideSeatInventory.seats_by_date(commuting_ride.id)["2030-05-01"] == 3
+
+# Test 4: Cancelling twice gives the seats back once, and only the passenger can cancel
+def test_cancel_twice_releases_seats_once(client, commuting_ride):
+    response = client.post("/process_payment", json={
+        "ride_id": commuting_ride.id,
+        "seats": 2,
+        "total_price": 12,
+        "selected_dates": ["2030-05-01"],
+        "email": "user123@gmail.com",
+        "card_number": "1234567812345678",
+        "expiry": "12/30",
+        "cardholder_name": "User",
+        "save_card": False
+    })
+    assert response.json["success"] is True
+    booking = book_ride.query.filter_by(ride_id=commuting_ride.id).first()
+
+    client.post("/logout")
+    client.post("/register", json={"username": "other_user", "email": "other_user@gmail.com",
+                                   "password": "Test@1234", "confirm_password": "Test@1234"})
+    client.post("/login", json={"email": "other_user@gmail.com", "password": "Test@1234"})
+    assert client.post(f"/cancel_booking/{booking.id}").status_code == 404
+    assert RideSeatInventory.seats_by_date(commuting_ride.id)["2030-05-01"] == 1
+
+    with client.session_transaction() as sess:
+        sess["_user_id"] = str(booking.user_id)
+    assert client.post(f"/cancel_booking/{booking.id}").status_code == 200
+    assert client.post(f"/cancel_booking/{booking.id}").status_code == 409
+    assert RideSeatInventory.seats_by_date(commuting_ride.id)["2030-05-01"] == 3
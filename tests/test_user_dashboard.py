@@ -6,7 +6,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 import pytest
 from app import app, db
-from app.models import User, publish_ride, book_ride, Payment
+from app.models import User, publish_ride, book_ride, Payment, EditProposal, DriverWeeklyEarnings
+from sqlalchemy import event
 from werkzeug.security import generate_password_hash
 
 # ---------------------- FIXTURES ----------------------
@@ -201,4 +202,94 @@ def test_driver_income_summary_shown(client):
     login_as(client, user.id) 
     res = client.get("/dashboard")
     assert res.status_code == 200 
-    assert b"Total Earnings" in res.data or b"Weekly Income" in res.data
\ No newline at end of file
+    assert b"Total Earnings" in res.data or b"Weekly Income" in res.data
+
+# Helper for Test 8: a commuting ride with `dates` x `passengers` bookings, each with an accepted proposal
+def create_commuting_ride_with_passengers(driver, dates, passengers):
+    ride = publish_ride(
+        driver_id=driver.id,
+        driver_name=driver.username,
+        from_location="QueryFrom",
+        to_location="QueryTo",
+        category="commuting",
+        recurrence_dates=",".join(f"2030-01-{day + 1:02d}" for day in range(dates)),
+        commute_times="09:00",
+        price_per_seat=5.0
+    )
+    db.session.add(ride)
+    db.session.commit()
+
+    for index in range(passengers):
+        passenger = User(
+            username=f"passenger_{ride.id}_{index}",
+            email=f"passenger_{ride.id}_{index}@example.com",
+            password_hash="x"
+        )
+        db.session.add(passenger)
+        db.session.commit()
+        for day in range(dates):
+            booking = book_ride(
+                user_id=passenger.id,
+                ride_id=ride.id,
+                ride_date=datetime(2030, 1, day + 1, 9, 0),
+                status="Booked",
+                total_price=5.0,
+                seats_selected=1,
+                confirmation_email=passenger.email
+            )
+            db.session.add(booking)
+            db.session.commit()
+            db.session.add(EditProposal(booking_id=booking.id, sender=passenger.username,
+                                        proposed_pickup="Gate", status="accepted"))
+    db.session.commit()
+
+def count_dashboard_queries(client):
+    db.session.expire_all()  # start each page load from an empty identity map
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        res = client.get("/dashboard")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    assert res.status_code == 200
+    return len(statements)
+
+# Test 8: Verifies that the dashboard query count does not grow with dates and passengers
+def test_dashboard_query_count_constant(client):
+    driver = create_user_and_bookings()
+    create_commuting_ride_with_passengers(driver, dates=1, passengers=1)
+    login_as(client, driver.id)
+    small = count_dashboard_queries(client)
+
+    create_commuting_ride_with_passengers(driver, dates=10, passengers=4)
+    large = count_dashboard_queries(client)
+
+    assert large == small
+
+# Test 9: Verifies that the weekly earnings rollup follows payments, refunds and rebuilds
+def test_driver_weekly_earnings_rollup(client):
+    driver = create_user_and_bookings()
+    ride = create_booked_ride(driver)
+    booking = book_ride.query.filter_by(ride_id=ride.id).first()
+
+    payment = Payment(user_id=driver.id, ride_id=ride.id, book_ride_id=booking.id, amount=100.0,
+                      status="Success", timestamp=datetime(2030, 3, 5, 12, 0), platform_fee=0.01)
+    db.session.add(payment)
+    db.session.commit()
+    assert round(DriverWeeklyEarnings.query.get((driver.id, "2030-W09")).amount, 2) == 99.0
+
+    # A partial refund leaves the driver 75% of their share
+    payment.status = "Partially Refunded"
+    db.session.commit()
+    db.session.expire_all()
+    assert round(DriverWeeklyEarnings.query.get((driver.id, "2030-W09")).amount, 2) == 74.25
+
+    # Rebuilding from the payments table gives the same totals
+    DriverWeeklyEarnings.rebuild()
+    assert round(DriverWeeklyEarnings.query.get((driver.id, "2030-W09")).amount, 2) == 74.25
+
+    login_as(client, driver.id)
+    res = client.get("/dashboard")
+    assert b"2030-W09" in res.data
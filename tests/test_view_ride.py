@@ -6,7 +6,7 @@ from datetime import datetime
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import app, db
-from app.models import User, publish_ride, book_ride
+from app.models import User, publish_ride, book_ride, RideSeatInventory
 from flask import session
 
 # ---------------------- FIXTURES ----------------------
@@ -165,7 +165,8 @@ def test_view_journeys_hide_fully_booked_ride(client, register_and_login):
 
     # Fully book the ride manually
     ride = publish_ride.query.filter_by(category="one-time").first()
-    ride.available_seats_per_date = json.dumps({"2025-12-01": 0})
+    for inventory in ride.seat_inventory:
+        inventory.seats_left = 0
     db.session.commit()
     db.session.expire_all()
 
@@ -188,14 +189,33 @@ def test_view_journeys_hide_fully_booked_commuting(client, register_and_login):
     client.post("/publish_ride", data=commuting_data)
 
     ride = publish_ride.query.filter_by(category="commuting").first()
-    ride.available_seats_per_date = json.dumps({
-        "2025-12-01": 0,
-        "2025-12-02": 0
-    })
+    for inventory in ride.seat_inventory:
+        inventory.seats_left = 0
     db.session.commit()
     db.session.expire_all()
 
     response = client.get("/view_journeys")
     html = response.data.decode("utf-8").lower()
 
-    assert "from: leeds" not in html and "to: sheffield" not in html
\ No newline at end of file
+    assert "from: leeds" not in html and "to: sheffield" not in html
+
+# Test 10: Verifies for keyset pagination of journeys with page_size and cursor
+def test_view_journeys_pagination(client, register_and_login):
+    for destination in ["Durham", "Hull", "Wakefield"]:
+        client.post("/publish_ride", data={
+            "from_location": "Leeds",
+            "to_location": destination,
+            "category": "one-time",
+            "date_time": "2030-06-01 09:00",
+            "available_seats": "2",
+            "price_per_seat": "5"
+        })
+
+    first_page = client.get("/view_journeys", query_string={"page_size": 2}).data.decode("utf-8")
+    assert "Durham" in first_page and "Hull" in first_page and "Wakefield" not in first_page
+    assert "cursor=" in first_page
+
+    last_ride = publish_ride.query.filter_by(to_location="Hull").first()
+    second_page = client.get("/view_journeys", query_string={"page_size": 2, "cursor": last_ride.id}).data.decode("utf-8")
+    assert "Wakefield" in second_page and "Durham" not in second_page
+    assert "cursor=" not in second_page